@@ -14,11 +14,17 @@
 
 """The Scheduler Stats extension"""
 
+import oslo_messaging
+
 from cinder.api import common
 from cinder.api import extensions
 from cinder.api import microversions as mv
 from cinder.api.openstack import wsgi
 from cinder.api.views import scheduler_stats as scheduler_stats_view
+from cinder.common import constants
+from cinder import exception
+from cinder.i18n import _
+from cinder import objects
 from cinder.policies import scheduler_stats as policy
 from cinder.scheduler import rpcapi
 from cinder import utils
@@ -61,6 +67,30 @@ class SchedulerStatsController(wsgi.Controller):
 
         return self._view_builder.pools(req, pools, detail)
 
+    @wsgi.Controller.api_version(mv.SCHEDULER_STAGE_STATS)
+    def get_stage_stats(self, req):
+        """Show the latency statistics of the scheduling stages."""
+        context = req.environ['cinder.context']
+        context.authorize(policy.GET_STAGE_STATS_POLICY)
+
+        host = req.params.get('host')
+        if host:
+            filters = {'host': host, 'binary': constants.SCHEDULER_BINARY,
+                       'is_up': True}
+            if not objects.ServiceList.get_all(context, filters):
+                msg = _("Can't find scheduler service: %s") % host
+                raise exception.NotFound(msg)
+        try:
+            stats = self.scheduler_api.get_stage_stats(context, host=host)
+        except oslo_messaging.MessagingTimeout:
+            msg = _("No scheduler service answered the request.")
+            if host:
+                msg = _("Scheduler service %s didn't answer the "
+                        "request.") % host
+            raise exception.NotFound(msg)
+
+        return self._view_builder.stage_stats(req, stats)
+
 
 class Scheduler_stats(extensions.ExtensionDescriptor):
     """Scheduler stats support."""
@@ -74,7 +104,8 @@ class Scheduler_stats(extensions.ExtensionDescriptor):
         res = extensions.ResourceExtension(
             Scheduler_stats.alias,
             SchedulerStatsController(),
-            collection_actions={"get_pools": "GET"})
+            collection_actions={"get_pools": "GET",
+                                "get_stage_stats": "GET"})
 
         resources.append(res)
 
@@ -181,6 +181,10 @@ TRANSFER_ENCRYPTED_VOLUME = '3.70'
 
 EXTEND_VOLUME_COMPLETION = '3.71'
 
+VOLUME_CREATE_COUNT = '3.72'
+
+SCHEDULER_STAGE_STATS = '3.73'
+
 
 def get_mv_header(version):
     """Gets a formatted HTTP microversion header.
@@ -157,13 +157,15 @@ REST_API_VERSION_HISTORY = """
     * 3.69 - Allow null value for shared_targets
     * 3.70 - Support encrypted volume transfers
     * 3.71 - Support 'os-extend_volume_completion' volume action
+    * 3.72 - Support creating several volumes with the 'count' parameter
+    * 3.73 - Add the scheduler-stats get_stage_stats action
 """
 
 # The minimum and maximum versions of the API supported
 # The default api version request is defined to be the
 # minimum version of the API supported.
 _MIN_API_VERSION = "3.0"
-_MAX_API_VERSION = "3.71"
+_MAX_API_VERSION = "3.73"
 UPDATED = "2023-08-31T00:00:00Z"
 
 
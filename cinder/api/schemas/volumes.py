@@ -83,6 +83,11 @@ create_volume_v347['properties']['volume']['properties'][
 create_volume_v353 = copy.deepcopy(create_volume_v347)
 create_volume_v353['properties']['volume']['additionalProperties'] = False
 
+create_volume_v372 = copy.deepcopy(create_volume_v353)
+create_volume_v372['properties']['volume']['properties'][
+    'count'] = {'type': ['integer', 'string'], 'pattern': '^[1-9][0-9]*$',
+                'minimum': 1}
+
 update = {
     'type': 'object',
     'properties': {
@@ -356,7 +356,10 @@ class VolumeController(wsgi.Controller):
                        mv.VOLUME_CREATE_FROM_BACKUP,
                        mv.get_prior_version(mv.SUPPORT_VOLUME_SCHEMA_CHANGES))
     @validation.schema(schema.create_volume_v353,
-                       mv.SUPPORT_VOLUME_SCHEMA_CHANGES)
+                       mv.SUPPORT_VOLUME_SCHEMA_CHANGES,
+                       mv.get_prior_version(mv.VOLUME_CREATE_COUNT))
+    @validation.schema(schema.create_volume_v372,
+                       mv.VOLUME_CREATE_COUNT)
     def create(self, req, body):
         """Creates a new volume.
 
@@ -465,6 +468,12 @@ class VolumeController(wsgi.Controller):
                     "enabled volume type and use it to create multiattach "
                     "volumes.")
             raise exc.HTTPBadRequest(explanation=msg)
+
+        count = volume.get('count')
+        if count is not None:
+            return self._create_volumes(req, context, int(count), size,
+                                        volume, kwargs)
+
         try:
             new_volume = self.volume_api.create(
                 context, size, volume.get('display_name'),
@@ -475,6 +484,28 @@ class VolumeController(wsgi.Controller):
         retval = self._view_builder.detail(req, new_volume)
         return retval
 
+    def _create_volumes(self, req, context, count, size, volume, kwargs):
+        """Create several volumes with one scheduling request."""
+        for source in ('snapshot', 'source_volume', 'backup', 'group'):
+            if kwargs.get(source) is not None:
+                msg = _("The count parameter can only be used to create "
+                        "empty volumes or volumes from an image.")
+                raise exc.HTTPBadRequest(explanation=msg)
+
+        try:
+            new_volumes = self.volume_api.create_volumes(
+                context, count, size, volume.get('display_name'),
+                volume.get('display_description'),
+                image_id=kwargs.get('image_id'),
+                volume_type=kwargs.get('volume_type'),
+                metadata=kwargs.get('metadata'),
+                availability_zone=kwargs.get('availability_zone'),
+                scheduler_hints=kwargs.get('scheduler_hints'))
+        except exception.VolumeTypeDefaultMisconfiguredError as err:
+            raise exc.HTTPInternalServerError(explanation=err.msg)
+
+        return self._view_builder.detail_list(req, new_volumes)
+
     @validation.schema(schema.update, mv.BASE_VERSION,
                        mv.get_prior_version(mv.SUPPORT_VOLUME_SCHEMA_CHANGES))
     @validation.schema(schema.update_v353,
@@ -61,3 +61,12 @@ class ViewBuilder(common.ViewBuilder):
         pools_dict = dict(pools=plist)
 
         return pools_dict
+
+    def stage_stats(self, request, stats):
+        """View of the latency statistics of a scheduler."""
+        return {
+            'stage_stats': {
+                'host': stats.get('host'),
+                'stages': stats.get('stages', {}),
+            }
+        }
@@ -22,10 +22,19 @@
 """
 
 import abc
+import bisect
+import collections
+import errno
+import functools
 import hashlib
+import io
 import json
+import mmap
 import os
+import struct
+import time
 
+import futurist
 from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_service import loopingcall
@@ -33,8 +42,11 @@ from oslo_utils import excutils
 from oslo_utils import units
 
 from cinder.backup import driver
+from cinder.backup import status_monitor
+from cinder import coordination
 from cinder import exception
 from cinder.i18n import _
+from cinder import monkey_patch
 from cinder import objects
 from cinder.objects import fields
 from cinder import utils
@@ -60,11 +72,82 @@ backup_opts = [
                 help="Attempt to create new container for supported drivers, "
                      "when it does not exist. When set to False, operator "
                      "must ensure presence of configured container."),
+    cfg.IntOpt('backup_max_inflight_chunks',
+               default=1,
+               min=1,
+               help='Maximum number of chunks of a backup that are compressed '
+                    'and uploaded concurrently by chunked backup drivers, '
+                    'while the next chunks are read and hashed. Restores '
+                    'download and decompress up to this number of chunks '
+                    'ahead of the ones being written. Memory used by each '
+                    'backup or restore grows by up to this number of '
+                    'chunks. The default of 1 processes the chunks '
+                    'serially.'),
+    cfg.StrOpt('backup_sha256_index_format',
+               default='json',
+               choices=[('json', 'JSON list of hexadecimal SHA-256 digests, '
+                                 'readable by all releases'),
+                        ('binary', 'Packed binary SHA-256 digests, '
+                                   'compressed with the backup compression '
+                                   'algorithm when it is effective')],
+               help='Format of the SHA-256 index that chunked backup drivers '
+                    'store with each backup and read from the parent backup '
+                    'on incremental backups. Both formats can always be '
+                    'read. Only use binary once all the backup services '
+                    'have been upgraded.'),
+    cfg.BoolOpt('backup_sparse',
+                default=False,
+                help='Do not store the hash blocks of a volume that only '
+                     'contain zeros in chunked backups, record them in the '
+                     'backup metadata instead. Ranges of the volume that '
+                     'are not allocated are not read either, when the '
+                     'volume file reports them. Backups with zero blocks '
+                     'cannot be restored by releases without support for '
+                     'them, only enable it once all the backup services '
+                     'have been upgraded.'),
+    cfg.BoolOpt('backup_deduplication',
+                default=False,
+                help='Store the chunks of chunked backups in a deduplicated '
+                     'store shared by all the backups of a container. Chunks '
+                     'are named by their content, so identical chunks of '
+                     'any backup in the container are only stored once, and '
+                     'are reference counted so they are deleted with the '
+                     'last backup that uses them. The Posix based drivers, '
+                     'which otherwise use a container per backup, store the '
+                     'backups that have no container in a shared one. '
+                     'Backups with deduplicated chunks cannot be restored by '
+                     'releases without support for them, only enable it '
+                     'once all the backup services have been upgraded.'),
+    cfg.IntOpt('backup_dedup_gc_grace_period',
+               default=86400,
+               min=0,
+               help='Time in seconds deduplicated chunks that no backup '
+                    'references, like the chunks of deleted backups or the '
+                    'chunks uploaded by failed backups, are kept so later '
+                    'backups can use them. They are deleted when a backup '
+                    'of the container is deleted after this time. It must '
+                    'be longer than backups take, or backups in progress '
+                    'that use these chunks fail.'),
 ]
 
 CONF = cfg.CONF
 CONF.register_opts(backup_opts)
 
+SHA256_DIGEST_SIZE = hashlib.sha256().digest_size
+# Binary SHA-256 indexes start with this magic, followed by the length of a
+# JSON header as a 4 bytes big endian integer, the header and the digests.
+SHA256_INDEX_MAGIC = b'CINDER-SHA256-INDEX\n'
+_SHA256_INDEX_HEADER_LENGTH = struct.Struct('!I')
+
+# Deduplicated chunks are stored as objects named with this prefix followed
+# by the hash of their content, and are reference counted in the index.
+DEDUP_OBJECT_PREFIX = 'dedup_'
+DEDUP_INDEX_NAME = 'dedup_index'
+
+# Offsets and lengths of the reads of volumes opened with direct I/O must be
+# multiples of this alignment.
+DIRECT_IO_ALIGNMENT = 4096
+
 
 def _write_nonzero(volume_file, volume_offset, content):
     """Write non-zero parts of `content` into `volume_file`."""
@@ -79,6 +162,104 @@ def _write_nonzero(volume_file, volume_offset, content):
             volume_file.write(chunk.tobytes())
 
 
+def _split_digests(digests):
+    """Return packed SHA-256 digests as a list of hexadecimal strings."""
+    digests = memoryview(digests)
+    return [digests[i:i + SHA256_DIGEST_SIZE].hex()
+            for i in range(0, len(digests), SHA256_DIGEST_SIZE)]
+
+
+def _write_zeros(volume_file, volume_offset, length):
+    """Write `length` zeros into `volume_file` at `volume_offset`."""
+    zeros = memoryview(bytes(min(length, 1024 * 1024)))
+    volume_file.seek(volume_offset)
+    while length > 0:
+        volume_file.write(zeros[:length])
+        length -= len(zeros)
+
+
+@functools.lru_cache(maxsize=8)
+def _zero_digests(block_size, length):
+    """Return the packed SHA-256 digests of the blocks of `length` zeros."""
+    blocks, remainder = divmod(length, block_size)
+    digests = hashlib.sha256(bytes(block_size)).digest() * blocks
+    if remainder:
+        digests += hashlib.sha256(bytes(remainder)).digest()
+    return digests
+
+
+def _get_hole_length(volume_file, offset):
+    """Return the length of the hole at `offset` of `volume_file`.
+
+    Returns 0 if there is data at the offset or if the file doesn't report
+    its holes. The file's position is not changed.
+    """
+    try:
+        fileno = volume_file.fileno()
+        position = os.lseek(fileno, 0, os.SEEK_CUR)
+    except (AttributeError, TypeError, ValueError, OSError):
+        return 0
+    try:
+        data_offset = os.lseek(fileno, offset, os.SEEK_DATA)
+    except OSError as e:
+        if e.errno != errno.ENXIO:
+            return 0
+        # There is no data after the offset
+        data_offset = os.fstat(fileno).st_size
+    finally:
+        os.lseek(fileno, position, os.SEEK_SET)
+    return max(data_offset - offset, 0)
+
+
+def _read_chunk(volume_file, buf, length):
+    """Read up to `length` bytes of `volume_file` into `buf`.
+
+    Returns a memoryview of the data, which is only valid until the buffer is
+    reused. Files that don't support readinto() are read into a new bytes
+    object instead.
+    """
+    view = memoryview(buf)[:length]
+    total = 0
+    try:
+        while total < len(view):
+            count = volume_file.readinto(view[total:])
+            if not count:
+                break
+            total += count
+    except (AttributeError, NotImplementedError, io.UnsupportedOperation):
+        return memoryview(volume_file.read(length))
+    return view[:total]
+
+
+def _intersect_extents(extents1, extents2):
+    """Return the intersection of two sorted lists of (start, end)."""
+    result = []
+    i = j = 0
+    while i < len(extents1) and j < len(extents2):
+        start = max(extents1[i][0], extents2[j][0])
+        end = min(extents1[i][1], extents2[j][1])
+        if start < end:
+            result.append((start, end))
+        if extents1[i][1] < extents2[j][1]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+def _complement_extents(extents, length):
+    """Return the ranges of [0, length) not in a sorted list of extents."""
+    result = []
+    position = 0
+    for start, end in extents:
+        if start > position:
+            result.append((position, start))
+        position = end
+    if position < length:
+        result.append((position, length))
+    return result
+
+
 def _write_volume(volume_is_new, volume_file, volume_offset, content):
     if volume_is_new:
         _write_nonzero(volume_file, volume_offset, content)
@@ -87,6 +268,138 @@ def _write_volume(volume_is_new, volume_file, volume_offset, content):
         volume_file.write(content)
 
 
+class _ChunkPipeline(object):
+    """Bounded pipeline of chunk compression and upload jobs.
+
+    At most max_inflight jobs are queued or running at any time, submitting
+    a job when the pipeline is full waits for the oldest one to finish. Job
+    failures are raised on submit or wait. Pipelines used from a native
+    thread, like the object writer and reader methods, must be native.
+    """
+
+    def __init__(self, max_inflight, native=False):
+        self.max_inflight = max_inflight
+        # Number of jobs submitted so far
+        self.submitted = 0
+        self._futures = collections.deque()
+        if monkey_patch.is_patched() and not native:
+            self._executor = futurist.GreenThreadPoolExecutor(max_inflight)
+        else:
+            self._executor = futurist.ThreadPoolExecutor(max_inflight)
+
+    def submit(self, func, *args, **kwargs):
+        while len(self._futures) >= self.max_inflight:
+            self._futures.popleft().result()
+        self._futures.append(self._executor.submit(func, *args, **kwargs))
+        self.submitted += 1
+
+    def imap(self, func, iterable):
+        """Yield the results of calling func on each item, in order.
+
+        Items are submitted as results are consumed, so at most max_inflight
+        results are held by the pipeline.
+        """
+        for item in iterable:
+            if len(self._futures) >= self.max_inflight:
+                yield self._futures.popleft().result()
+            self._futures.append(self._executor.submit(func, item))
+            self.submitted += 1
+        while self._futures:
+            yield self._futures.popleft().result()
+
+    def wait(self):
+        """Wait for all the submitted jobs to finish."""
+        while self._futures:
+            self._futures.popleft().result()
+
+    def wait_for(self, submitted):
+        """Wait for the first `submitted` jobs to finish."""
+        while (self._futures and
+               self.submitted - len(self._futures) < submitted):
+            self._futures.popleft().result()
+
+    def shutdown(self):
+        """Cancel the jobs that haven't started and stop the executor."""
+        for future in self._futures:
+            future.cancel()
+        self._futures.clear()
+        self._executor.shutdown(wait=True)
+
+
+class _ChunkBuffers(object):
+    """Ring of reusable buffers that the chunks of a volume are read into.
+
+    Buffers are page aligned, so they can be used for direct I/O. The
+    pipeline jobs submitted while a buffer is in use may reference its data,
+    so it's only reused once they are done.
+    """
+
+    def __init__(self, size, count, pipeline=None):
+        self._pipeline = pipeline
+        self._ring = collections.deque([mmap.mmap(-1, size), 0]
+                                       for _i in range(count))
+        self._current = None
+
+    def get(self):
+        """Return the next buffer, once its previous data is unused."""
+        if self._pipeline:
+            if self._current:
+                self._current[1] = self._pipeline.submitted
+            self._current = self._ring[0]
+            self._pipeline.wait_for(self._current[1])
+        self._ring.rotate(-1)
+        return self._ring[-1][0]
+
+
+class _DedupSession(object):
+    """Deduplicated chunks used by a backup in progress."""
+
+    def __init__(self, index):
+        # Chunks in the store when the backup started, by object name
+        self.index = index
+        # Chunks uploaded by the backup and their object metadata
+        self.uploaded = {}
+        # Object metadata of the chunks the backup uploaded more than once,
+        # with the metadata of the upload
+        self.copies = []
+        self.referenced = set()
+        self.registered = False
+
+
+class _ExtentMap(object):
+    """Set of byte ranges of a volume, stored as disjoint sorted extents."""
+
+    def __init__(self):
+        self._starts = []
+        self._ends = []
+
+    def claim(self, start, end):
+        """Add the [start, end) range to the map.
+
+        Returns the list of (start, end) parts of the range that were not in
+        the map yet.
+        """
+        # First extent that ends at or after start, it may be adjacent.
+        first = last = bisect.bisect_left(self._ends, start)
+        unclaimed = []
+        position = start
+        while last < len(self._starts) and self._starts[last] <= end:
+            if self._starts[last] > position:
+                unclaimed.append((position, self._starts[last]))
+            position = max(position, self._ends[last])
+            last += 1
+        if position < end:
+            unclaimed.append((position, end))
+
+        # Merge the range with the extents it overlaps or is adjacent to.
+        if last > first:
+            start = min(start, self._starts[first])
+            end = max(end, self._ends[last - 1])
+        self._starts[first:last] = [start]
+        self._ends[first:last] = [end]
+        return unclaimed
+
+
 # Object writer and reader returned by inheriting classes must not have any
 # logging calls, as well as the compression libraries, as eventlet has a bug
 # (https://github.com/eventlet/eventlet/issues/432) that would result in
@@ -105,7 +418,13 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
     """
 
     DRIVER_VERSION = '1.0.0'
-    DRIVER_VERSION_MAPPING = {'1.0.0': '_restore_v1'}
+    # Metadata version of backups with zero extents
+    SPARSE_DRIVER_VERSION = '1.1.0'
+    # Metadata version of backups with deduplicated chunks
+    DEDUP_DRIVER_VERSION = '1.2.0'
+    DRIVER_VERSION_MAPPING = {'1.0.0': '_restore_v1',
+                              '1.1.0': '_restore_v1',
+                              '1.2.0': '_restore_v1'}
 
     def _get_compressor(self, algorithm):
         try:
@@ -147,9 +466,18 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
         self.az = CONF.storage_availability_zone
         self.backup_compression_algorithm = CONF.backup_compression_algorithm
         self.backup_create_containers = CONF.backup_create_containers
+        self.max_inflight_chunks = CONF.backup_max_inflight_chunks
+        self.sha256_index_format = CONF.backup_sha256_index_format
+        self.sparse_backups = CONF.backup_sparse
+        self.dedup_backups = CONF.backup_deduplication
         self.compressor = \
             self._get_compressor(CONF.backup_compression_algorithm)
+        # python-zstd only compresses immutable buffers such as bytes.
+        self._compress_bytes_only = (
+            CONF.backup_compression_algorithm.lower() == 'zstd')
         self.support_force_delete = True
+        self.support_direct_io = (
+            chunk_size_bytes % DIRECT_IO_ALIGNMENT == 0)
 
     def _get_object_writer(self, container, object_name, extra_metadata=None):
         """Return writer proxy-wrapped to execute methods in native thread."""
@@ -185,6 +513,9 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
         The object returned should be a context handler that can be used in a
         "with" context.
 
+        The data given to the writer may be a memoryview of a buffer that is
+        reused once the writer is closed, so it must be copied if it's kept.
+
         The object writer methods must not have any logging calls, as eventlet
         has a bug (https://github.com/eventlet/eventlet/issues/432) that would
         result in failures.
@@ -271,13 +602,23 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
         return filename
 
     def _write_metadata(self, backup, volume_id, container, object_list,
-                        volume_meta, extra_metadata=None):
+                        volume_meta, extra_metadata=None, zero_extents=None):
         filename = self._metadata_filename(backup)
         LOG.debug('_write_metadata started, container name: %(container)s,'
                   ' metadata filename: %(filename)s.',
                   {'container': container, 'filename': filename})
         metadata = {}
-        metadata['version'] = self.DRIVER_VERSION
+        # Only backups with deduplicated chunks or zero extents need the new
+        # versions, so the others can still be restored by older releases.
+        if any(name.startswith(DEDUP_OBJECT_PREFIX)
+               for obj in object_list for name in obj):
+            metadata['version'] = self.DEDUP_DRIVER_VERSION
+        elif zero_extents:
+            metadata['version'] = self.SPARSE_DRIVER_VERSION
+        else:
+            metadata['version'] = self.DRIVER_VERSION
+        if zero_extents:
+            metadata['zero_extents'] = zero_extents
         metadata['backup_id'] = backup['id']
         metadata['volume_id'] = volume_id
         metadata['backup_name'] = backup['display_name']
@@ -294,7 +635,8 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
             writer.write(metadata_json)
         LOG.debug('_write_metadata finished. Metadata: %s.', metadata_json)
 
-    def _write_sha256file(self, backup, volume_id, container, sha256_list):
+    def _write_sha256file(self, backup, volume_id, container, digests):
+        """Write the SHA-256 index with the given packed digests."""
         filename = self._sha256_filename(backup)
         LOG.debug('_write_sha256file started, container name: %(container)s,'
                   ' sha256file filename: %(filename)s.',
@@ -307,11 +649,22 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
         sha256file['backup_description'] = backup['display_description']
         sha256file['created_at'] = str(backup['created_at'])
         sha256file['chunk_size'] = self.sha_block_size_bytes
-        sha256file['sha256s'] = sha256_list
-        sha256file_json = json.dumps(sha256file, sort_keys=True, indent=2)
-        sha256file_json = sha256file_json.encode('utf-8')
+        if self.sha256_index_format == 'binary':
+            sha256file['count'] = len(digests) // SHA256_DIGEST_SIZE
+            algorithm, data = self._prepare_output_data(bytes(digests))
+            sha256file['compression'] = algorithm
+            header = json.dumps(sha256file, sort_keys=True).encode('utf-8')
+            sha256file_data = b''.join(
+                (SHA256_INDEX_MAGIC,
+                 _SHA256_INDEX_HEADER_LENGTH.pack(len(header)),
+                 header,
+                 data))
+        else:
+            sha256file['sha256s'] = _split_digests(digests)
+            sha256file_data = json.dumps(sha256file, sort_keys=True,
+                                         indent=2).encode('utf-8')
         with self._get_object_writer(container, filename) as writer:
-            writer.write(sha256file_json)
+            writer.write(sha256file_data)
         LOG.debug('_write_sha256file finished.')
 
     def _read_metadata(self, backup):
@@ -327,18 +680,58 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
         LOG.debug('_read_metadata finished. Metadata: %s.', metadata_json)
         return metadata
 
-    def _read_sha256file(self, backup):
+    def _read_sha256_data(self, backup):
         container = backup['container']
         filename = self._sha256_filename(backup)
         LOG.debug('_read_sha256file started, container name: %(container)s, '
                   'sha256 filename: %(filename)s.',
                   {'container': container, 'filename': filename})
         with self._get_object_reader(container, filename) as reader:
-            sha256file_json = reader.read()
-        sha256file_json = sha256file_json.decode('utf-8')
-        sha256file = json.loads(sha256file_json)
+            sha256file_data = reader.read()
         LOG.debug('_read_sha256file finished.')
-        return sha256file
+        return sha256file_data
+
+    def _parse_sha256_index(self, sha256file_data):
+        """Return the header and the packed digests of a binary index."""
+        data = memoryview(sha256file_data)
+        offset = len(SHA256_INDEX_MAGIC)
+        header_length, = _SHA256_INDEX_HEADER_LENGTH.unpack_from(data, offset)
+        offset += _SHA256_INDEX_HEADER_LENGTH.size
+        header = json.loads(
+            data[offset:offset + header_length].tobytes().decode('utf-8'))
+        digests = data[offset + header_length:]
+        decompressor = self._get_compressor(header['compression'])
+        if decompressor is not None:
+            # zstd only decompresses read-only bytes
+            digests = decompressor.decompress(digests.tobytes())
+        if len(digests) != header['count'] * SHA256_DIGEST_SIZE:
+            err = _('SHA-256 index of backup %s is corrupted.') % (
+                header['backup_id'])
+            raise exception.InvalidBackup(reason=err)
+        return header, digests
+
+    def _read_sha256_index(self, backup):
+        """Read the SHA-256 index of a backup.
+
+        Returns the header of the index, where chunk_size is the hash block
+        size, and the packed digests of the blocks. Both the binary and the
+        JSON formats are supported.
+        """
+        sha256file_data = self._read_sha256_data(backup)
+        if sha256file_data.startswith(SHA256_INDEX_MAGIC):
+            return self._parse_sha256_index(sha256file_data)
+        sha256file = json.loads(sha256file_data.decode('utf-8'))
+        digests = bytes.fromhex(''.join(sha256file.pop('sha256s')))
+        return sha256file, digests
+
+    def _read_sha256file(self, backup):
+        """Read the SHA-256 index with the digests as a hexadecimal list."""
+        sha256file_data = self._read_sha256_data(backup)
+        if sha256file_data.startswith(SHA256_INDEX_MAGIC):
+            sha256file, digests = self._parse_sha256_index(sha256file_data)
+            sha256file['sha256s'] = _split_digests(digests)
+            return sha256file
+        return json.loads(sha256file_data.decode('utf-8'))
 
     def _prepare_backup(self, backup):
         """Prepare the backup process and return the backup metadata."""
@@ -368,7 +761,8 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
                   })
         object_meta = {'id': 1, 'list': [], 'prefix': object_prefix,
                        'volume_meta': None}
-        object_sha256 = {'id': 1, 'sha256s': [], 'prefix': object_prefix}
+        object_sha256 = {'id': 1, 'digests': bytearray(),
+                         'prefix': object_prefix}
         extra_metadata = self.get_extra_metadata(backup, volume)
         if extra_metadata is not None:
             object_meta['extra_metadata'] = extra_metadata
@@ -377,8 +771,14 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
                 volume_size_bytes)
 
     def _backup_chunk(self, backup, container, data, data_offset,
-                      object_meta, extra_metadata):
-        """Backup data chunk based on the object metadata and offset."""
+                      object_meta, extra_metadata, pipeline=None):
+        """Backup data chunk based on the object metadata and offset.
+
+        The object is added to the object list right away, so the list keeps
+        the order of the chunks in the volume. If a pipeline is given the
+        chunk is compressed and uploaded in it, otherwise it's done before
+        returning.
+        """
         object_prefix = object_meta['prefix']
         object_list = object_meta['list']
 
@@ -388,9 +788,26 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
         obj[object_name] = {}
         obj[object_name]['offset'] = data_offset
         obj[object_name]['length'] = len(data)
+        object_list.append(obj)
+        object_id += 1
+        object_meta['list'] = object_list
+        object_meta['id'] = object_id
+
+        if pipeline is None:
+            self._write_chunk(container, object_name, data, extra_metadata,
+                              obj[object_name])
+        else:
+            pipeline.submit(self._write_chunk, container, object_name, data,
+                            extra_metadata, obj[object_name])
+
+        utils.cooperative_yield()
+
+    def _write_chunk(self, container, object_name, data, extra_metadata,
+                     obj_meta):
+        """Compress and upload a chunk, and record it in its metadata."""
         LOG.debug('Backing up chunk of data from volume.')
         algorithm, output_data = self._prepare_output_data(data)
-        obj[object_name]['compression'] = algorithm
+        obj_meta['compression'] = algorithm
         LOG.debug('About to put_object')
         with self._get_object_writer(
                 container, object_name, extra_metadata=extra_metadata
@@ -398,23 +815,192 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
             writer.write(output_data)
         md5 = utils.tpool_wrap(hashlib.md5)(
             data, usedforsecurity=False).hexdigest()
-        obj[object_name]['md5'] = md5
+        obj_meta['md5'] = md5
         LOG.debug('backup MD5 for %(object_name)s: %(md5)s',
                   {'object_name': object_name, 'md5': md5})
-        object_list.append(obj)
-        object_id += 1
-        object_meta['list'] = object_list
-        object_meta['id'] = object_id
+
+    def _read_dedup_index(self, container):
+        """Return the deduplicated chunks of a container by object name."""
+        if DEDUP_INDEX_NAME not in self.get_container_entries(
+                container, DEDUP_INDEX_NAME):
+            return {}
+        with self._get_object_reader(container, DEDUP_INDEX_NAME) as reader:
+            index_json = reader.read()
+        return json.loads(index_json.decode('utf-8'))['objects']
+
+    def _write_dedup_index(self, container, index):
+        index_json = json.dumps({'version': self.DRIVER_VERSION,
+                                 'objects': index}, sort_keys=True)
+        with self._get_object_writer(container, DEDUP_INDEX_NAME) as writer:
+            writer.write(index_json.encode('utf-8'))
+
+    def _dedup_object_name(self, digests, data_length):
+        """Return the name of the deduplicated object of a chunk.
+
+        The name is derived from the digests of the chunk's hash blocks, so
+        the data doesn't have to be hashed again.
+        """
+        content_hash = hashlib.sha256(
+            b'%d:%d:' % (self.sha_block_size_bytes, data_length))
+        content_hash.update(digests)
+        return DEDUP_OBJECT_PREFIX + content_hash.hexdigest()
+
+    def _backup_dedup_chunk(self, container, data, data_offset, digests,
+                            object_meta, extra_metadata, dedup,
+                            pipeline=None):
+        """Backup a data chunk in the deduplicated store.
+
+        The chunk is only uploaded if it's neither in the store nor already
+        uploaded by this backup.
+        """
+        object_name = self._dedup_object_name(digests, len(data))
+        obj = {object_name: {'offset': data_offset, 'length': len(data)}}
+        object_meta['list'].append(obj)
+        object_meta['id'] += 1
+        dedup.referenced.add(object_name)
+
+        if object_name in dedup.index:
+            obj[object_name]['compression'] = (
+                dedup.index[object_name]['compression'])
+            obj[object_name]['md5'] = dedup.index[object_name]['md5']
+        elif object_name in dedup.uploaded:
+            # The upload may still be in flight, its metadata is copied once
+            # all the chunks have been written.
+            dedup.copies.append((obj[object_name],
+                                 dedup.uploaded[object_name]))
+        else:
+            dedup.uploaded[object_name] = obj[object_name]
+            if pipeline is None:
+                self._write_chunk(container, object_name, data,
+                                  extra_metadata, obj[object_name])
+            else:
+                pipeline.submit(self._write_chunk, container, object_name,
+                                data, extra_metadata, obj[object_name])
 
         utils.cooperative_yield()
 
+    @coordination.synchronized('backup-dedup-{container}')
+    def _register_dedup_references(self, container, dedup):
+        """Add a reference to the deduplicated chunks used by a backup."""
+        for obj_meta, uploaded_meta in dedup.copies:
+            obj_meta['compression'] = uploaded_meta['compression']
+            obj_meta['md5'] = uploaded_meta['md5']
+
+        index = self._read_dedup_index(container)
+        for object_name in dedup.referenced:
+            if object_name in index:
+                index[object_name]['refcount'] += 1
+                index[object_name].pop('unreferenced_at', None)
+            elif object_name in dedup.uploaded:
+                obj_meta = dedup.uploaded[object_name]
+                index[object_name] = {'refcount': 1,
+                                      'compression': obj_meta['compression'],
+                                      'md5': obj_meta['md5']}
+            else:
+                err = (_('Deduplicated chunk %s was deleted during the '
+                         'backup.') % object_name)
+                raise exception.BackupOperationError(err)
+        self._write_dedup_index(container, index)
+        dedup.registered = True
+
+    @coordination.synchronized('backup-dedup-{container}')
+    def _register_dedup_uploads(self, container, dedup):
+        """Add the chunks uploaded by a failed backup to the index.
+
+        They are added without references, so later backups, like a retry of
+        the failed one, can use them. They are not deleted, because another
+        backup in progress may have uploaded the same chunks, but they are
+        garbage collected once the grace period expires.
+        """
+        index = self._read_dedup_index(container)
+        now = time.time()
+        for object_name, obj_meta in dedup.uploaded.items():
+            # Chunks whose upload didn't complete have no md5
+            if object_name not in index and 'md5' in obj_meta:
+                index[object_name] = {'refcount': 0,
+                                      'compression': obj_meta['compression'],
+                                      'md5': obj_meta['md5'],
+                                      'unreferenced_at': now}
+        self._write_dedup_index(container, index)
+        dedup.registered = True
+
+    @coordination.synchronized('backup-dedup-{container}')
+    def _release_dedup_references(self, container, object_names):
+        """Release deduplicated chunks and delete the garbage.
+
+        Chunks left without references are only deleted once the grace
+        period expires, because backups in progress may have found them in
+        the index when they started.
+        """
+        index = self._read_dedup_index(container)
+        if not index and not object_names:
+            return
+        now = time.time()
+        for object_name in object_names:
+            entry = index.get(object_name)
+            if entry is None or entry['refcount'] <= 0:
+                LOG.warning('Deduplicated object %(object_name)s in '
+                            'container %(container)s is not referenced.',
+                            {'object_name': object_name,
+                             'container': container})
+                continue
+            entry['refcount'] -= 1
+            if not entry['refcount']:
+                entry['unreferenced_at'] = now
+        garbage = self._collect_dedup_garbage(index)
+        # The index is written first, so it never has deleted objects.
+        self._write_dedup_index(container, index)
+
+        for object_name in garbage:
+            self.delete_object(container, object_name)
+            LOG.debug('deleted deduplicated object: %(object_name)s'
+                      ' in container: %(container)s.',
+                      {'object_name': object_name, 'container': container})
+            utils.cooperative_yield()
+
+    def _collect_dedup_garbage(self, index):
+        """Remove the chunks unreferenced for the grace period from index.
+
+        Returns the names of their objects. Chunks without references and
+        without the time they were last referenced, like the ones indexed
+        by earlier releases, get the current time.
+        """
+        now = time.time()
+        grace_period = CONF.backup_dedup_gc_grace_period
+        garbage = []
+        for object_name, entry in list(index.items()):
+            if entry['refcount'] > 0:
+                continue
+            unreferenced_at = entry.setdefault('unreferenced_at', now)
+            if now - unreferenced_at >= grace_period:
+                del index[object_name]
+                garbage.append(object_name)
+        return garbage
+
+    def _release_backup_dedup_references(self, backup):
+        try:
+            metadata = self._read_metadata(backup)
+        except Exception:
+            LOG.warning('Error while reading the metadata of backup %s, '
+                        'its deduplicated chunks are not released.',
+                        backup['id'])
+            return
+        dedup_names = {name for obj in metadata['objects'] for name in obj
+                       if name.startswith(DEDUP_OBJECT_PREFIX)}
+        # Garbage is collected even if the backup has no deduplicated chunks
+        if dedup_names or self.dedup_backups:
+            self._release_dedup_references(backup['container'], dedup_names)
+
     def _prepare_output_data(self, data):
         if self.compressor is None:
             return 'none', data
         data_size_bytes = len(data)
         # Execute compression in native thread so it doesn't prevent
         # cooperative greenthread switching.
-        compressed_data = self.compressor.compress(data)
+        if self._compress_bytes_only:
+            compressed_data = self.compressor.compress(bytes(data))
+        else:
+            compressed_data = self.compressor.compress(data)
         comp_size_bytes = len(compressed_data)
         algorithm = CONF.backup_compression_algorithm.lower()
         if comp_size_bytes >= data_size_bytes:
@@ -439,18 +1025,18 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
         object_list = object_meta['list']
         object_id = object_meta['id']
         volume_meta = object_meta['volume_meta']
-        sha256_list = object_sha256['sha256s']
         extra_metadata = object_meta.get('extra_metadata')
         self._write_sha256file(backup,
                                backup.volume_id,
                                container,
-                               sha256_list)
+                               object_sha256['digests'])
         self._write_metadata(backup,
                              backup.volume_id,
                              container,
                              object_list,
                              volume_meta,
-                             extra_metadata)
+                             extra_metadata,
+                             object_meta.get('zero_extents'))
         # NOTE(whoami-rajat) : The object_id variable is used to name
         # the backup objects and hence differs from the object_count
         # variable, therefore the increment of object_id value in the last
@@ -496,21 +1082,65 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
     def _calculate_sha(self, data):
         """Calculate SHA256 of a data chunk.
 
-        This method cannot log anything as it is called on a native thread.
+        Returns the packed digests of the chunk's hash blocks. This method
+        cannot log anything as it is called on a native thread.
         """
         # NOTE(geguileo): Using memoryview to avoid data copying when slicing
         # for the sha256 call.
         chunk = memoryview(data)
-        shalist = []
-        off = 0
-        datalen = len(chunk)
-        while off < datalen:
-            chunk_end = min(datalen, off + self.sha_block_size_bytes)
-            block = chunk[off:chunk_end]
-            sha = hashlib.sha256(block).hexdigest()
-            shalist.append(sha)
-            off += self.sha_block_size_bytes
-        return shalist
+        return b''.join(
+            hashlib.sha256(chunk[off:off + self.sha_block_size_bytes]).digest()
+            for off in range(0, len(chunk), self.sha_block_size_bytes))
+
+    def _find_changed_extents(self, digests, parent_digests, data_length):
+        """Return the extents of a chunk whose hash blocks have changed.
+
+        The packed digests of the chunk are compared by slice with the ones
+        of the parent backup. Returns a list of (start, end) data offsets.
+        """
+        digests = memoryview(digests)
+        extents = []
+        extent_off = -1
+        for idx, off in enumerate(range(0, len(digests), SHA256_DIGEST_SIZE)):
+            end = off + SHA256_DIGEST_SIZE
+            if digests[off:end] != parent_digests[off:end]:
+                if extent_off == -1:
+                    # Start of new extent.
+                    extent_off = idx * self.sha_block_size_bytes
+            elif extent_off != -1:
+                # We've reached the end of extent.
+                extents.append((extent_off, idx * self.sha_block_size_bytes))
+                extent_off = -1
+
+        # The last extent extends to the end of data buffer.
+        if extent_off != -1:
+            extents.append((extent_off, data_length))
+        return extents
+
+    def _split_zero_extents(self, digests, extents, data_length):
+        """Split the extents of a chunk into zero and data extents.
+
+        The hash blocks that only contain zeros are found by their digests.
+        Returns the lists of (start, end) data offsets of the parts of the
+        extents that only contain zeros and of the rest of them.
+        """
+        zero_digests = _zero_digests(self.sha_block_size_bytes, data_length)
+        if digests == zero_digests:
+            return extents, []
+        data_extents = self._find_changed_extents(digests, zero_digests,
+                                                  data_length)
+        zero_extents = _complement_extents(data_extents, data_length)
+        return (_intersect_extents(extents, zero_extents),
+                _intersect_extents(extents, data_extents))
+
+    @staticmethod
+    def _add_zero_extent(object_meta, offset, length):
+        """Record a zero extent, merging it with the previous one."""
+        zero_extents = object_meta.setdefault('zero_extents', [])
+        if zero_extents and sum(zero_extents[-1]) == offset:
+            zero_extents[-1][1] += length
+        else:
+            zero_extents.append([offset, length])
 
     def backup(self, backup, volume_file, backup_metadata=True):
         """Backup the given volume.
@@ -530,8 +1160,9 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
         if backup.parent_id:
             parent_backup = objects.Backup.get_by_id(self.context,
                                                      backup.parent_id)
-            parent_backup_shafile = self._read_sha256file(parent_backup)
-            parent_backup_shalist = parent_backup_shafile['sha256s']
+            parent_backup_shafile, parent_digests = self._read_sha256_index(
+                parent_backup)
+            parent_digests = memoryview(parent_digests)
             if (parent_backup_shafile['chunk_size'] !=
                     self.sha_block_size_bytes):
                 err = (_('Hash block size has changed since the last '
@@ -568,81 +1199,143 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
         if self.enable_progress_timer:
             timer.start(interval=self.backup_timer_interval)
 
-        sha256_list = object_sha256['sha256s']
-        shaindex = 0
+        sha256_digests = object_sha256['digests']
+        digests_offset = 0
         is_backup_canceled = False
-        while True:
-            # First of all, we check the status of this backup. If it
-            # has been changed to delete or has been deleted, we cancel the
-            # backup process to do forcing delete.
-            with backup.as_read_deleted():
-                backup.refresh()
-            if backup.status in (fields.BackupStatus.DELETING,
-                                 fields.BackupStatus.DELETED):
-                is_backup_canceled = True
-                # To avoid the chunk left when deletion complete, need to
-                # clean up the object of chunk again.
-                self.delete_backup(backup)
-                LOG.debug('Cancel the backup process of %s.', backup.id)
-                break
-            data_offset = volume_file.tell()
-            read_bytes = self.chunk_size_bytes
-            data = volume_file.read(read_bytes)
-
-            if data == b'':
-                break
-
-            # Calculate new shas with the datablock.
-            shalist = utils.tpool_wrap(self._calculate_sha)(data)
-            sha256_list.extend(shalist)
-
-            # If parent_backup is not None, that means an incremental
-            # backup will be performed.
-            if parent_backup:
-                # Find the extent that needs to be backed up.
-                extent_off = -1
-                for idx, sha in enumerate(shalist):
-                    if sha != parent_backup_shalist[shaindex]:
-                        if extent_off == -1:
-                            # Start of new extent.
-                            extent_off = idx * self.sha_block_size_bytes
+        # Chunks are compressed and uploaded in a pipeline while the next
+        # ones are read and hashed, if more than one is allowed in flight.
+        pipeline = None
+        if self.max_inflight_chunks > 1:
+            pipeline = _ChunkPipeline(self.max_inflight_chunks)
+        # Chunks are read into reusable buffers, one more than the chunks
+        # that can be in flight.
+        buffers = _ChunkBuffers(self.chunk_size_bytes,
+                                self.max_inflight_chunks + 1 if pipeline
+                                else 1,
+                                pipeline)
+        dedup = None
+        if self.dedup_backups:
+            dedup = _DedupSession(self._read_dedup_index(container))
+        status_watch = status_monitor.MONITOR.watch(backup)
+        try:
+            while True:
+                # First of all, we check the status of this backup. If it
+                # has been changed to delete or has been deleted, we cancel
+                # the backup process to do forcing delete.
+                if status_watch.get_status() in (
+                        fields.BackupStatus.DELETING,
+                        fields.BackupStatus.DELETED):
+                    is_backup_canceled = True
+                    with backup.as_read_deleted():
+                        backup.refresh()
+                    # Chunks still in flight must be written before the
+                    # cleanup, or they would be left behind.
+                    if pipeline:
+                        pipeline.wait()
+                    # To avoid the chunk left when deletion complete, need to
+                    # clean up the object of chunk again.
+                    self.delete_backup(backup)
+                    LOG.debug('Cancel the backup process of %s.', backup.id)
+                    break
+                data_offset = volume_file.tell()
+                read_bytes = self.chunk_size_bytes
+                if (self.sparse_backups and
+                        _get_hole_length(volume_file,
+                                         data_offset) >= read_bytes):
+                    # The whole chunk is unallocated, so it's not read and
+                    # only has zeros.
+                    volume_file.seek(data_offset + read_bytes)
+                    data = None
+                    data_length = read_bytes
+                    digests = _zero_digests(self.sha_block_size_bytes,
+                                            data_length)
+                else:
+                    data = _read_chunk(volume_file, buffers.get(),
+                                       read_bytes)
+
+                    if not data:
+                        break
+
+                    data_length = len(data)
+                    # Calculate new shas with the datablock.
+                    digests = utils.tpool_wrap(self._calculate_sha)(data)
+                sha256_digests += digests
+
+                # If parent_backup is not None, that means an incremental
+                # backup will be performed.
+                if parent_backup:
+                    parent_chunk_digests = parent_digests[
+                        digests_offset:digests_offset + len(digests)]
+                    digests_offset += len(digests)
+                    # Compare the digests of the whole chunk first, as most
+                    # chunks don't change between backups.
+                    if parent_chunk_digests == digests:
+                        extents = []
+                    else:
+                        extents = self._find_changed_extents(
+                            digests, parent_chunk_digests, data_length)
+                else:  # Do a full backup.
+                    extents = [(0, data_length)]
+
+                if self.sparse_backups and extents:
+                    zero_extents, extents = self._split_zero_extents(
+                        digests, extents, data_length)
+                    for extent_off, extent_end in zero_extents:
+                        self._add_zero_extent(object_meta,
+                                              data_offset + extent_off,
+                                              extent_end - extent_off)
+
+                for extent_off, extent_end in extents:
+                    if extent_end - extent_off == data_length:
+                        segment = data
+                    else:
+                        segment = data[extent_off:extent_end]
+                    if dedup:
+                        block_size = self.sha_block_size_bytes
+                        first = extent_off // block_size * SHA256_DIGEST_SIZE
+                        last = (-(-extent_end // block_size) *
+                                SHA256_DIGEST_SIZE)
+                        self._backup_dedup_chunk(container, segment,
+                                                 data_offset + extent_off,
+                                                 digests[first:last],
+                                                 object_meta, extra_metadata,
+                                                 dedup, pipeline=pipeline)
                     else:
-                        if extent_off != -1:
-                            # We've reached the end of extent.
-                            extent_end = idx * self.sha_block_size_bytes
-                            segment = data[extent_off:extent_end]
-                            self._backup_chunk(backup, container, segment,
-                                               data_offset + extent_off,
-                                               object_meta,
-                                               extra_metadata)
-                            extent_off = -1
-                    shaindex += 1
-
-                # The last extent extends to the end of data buffer.
-                if extent_off != -1:
-                    extent_end = len(data)
-                    segment = data[extent_off:extent_end]
-                    self._backup_chunk(backup, container, segment,
-                                       data_offset + extent_off,
-                                       object_meta, extra_metadata)
-                    extent_off = -1
-            else:  # Do a full backup.
-                self._backup_chunk(backup, container, data, data_offset,
-                                   object_meta, extra_metadata)
-
-            # Notifications
-            total_block_sent_num += self.data_block_num
-            counter += 1
-            if counter == self.data_block_num:
-                # Send the notification to Ceilometer when the chunk
-                # number reaches the data_block_num.  The backup percentage
-                # is put in the metadata as the extra information.
-                self._send_progress_notification(self.context, backup,
-                                                 object_meta,
-                                                 total_block_sent_num,
-                                                 volume_size_bytes)
-                # Reset the counter
-                counter = 0
+                        self._backup_chunk(backup, container, segment,
+                                           data_offset + extent_off,
+                                           object_meta, extra_metadata,
+                                           pipeline=pipeline)
+
+                # Notifications
+                total_block_sent_num += self.data_block_num
+                counter += 1
+                if counter == self.data_block_num:
+                    # Send the notification to Ceilometer when the chunk
+                    # number reaches the data_block_num.  The backup
+                    # percentage is put in the metadata as the extra
+                    # information.
+                    self._send_progress_notification(self.context, backup,
+                                                     object_meta,
+                                                     total_block_sent_num,
+                                                     volume_size_bytes)
+                    # Reset the counter
+                    counter = 0
+
+            # All the chunks must be stored before the backup's metadata.
+            if pipeline:
+                pipeline.wait()
+            if dedup and not is_backup_canceled:
+                self._register_dedup_references(container, dedup)
+        finally:
+            status_monitor.MONITOR.unwatch(status_watch)
+            if pipeline:
+                pipeline.shutdown()
+            if dedup and not dedup.registered:
+                try:
+                    self._register_dedup_uploads(container, dedup)
+                except Exception:
+                    LOG.exception('Failed to record the deduplicated chunks '
+                                  'uploaded by backup %s.', backup.id)
 
         # Stop the timer.
         timer.stop()
@@ -653,7 +1346,6 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
         # All the data have been sent, the backup_percent reaches 100.
         self._send_progress_end(self.context, backup, object_meta)
 
-        object_sha256['sha256s'] = sha256_list
         if backup_metadata:
             try:
                 self._backup_metadata(backup, object_meta)
@@ -665,10 +1357,29 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
 
         self._finalize_backup(backup, container, object_meta, object_sha256)
 
+    def _read_object(self, container, object_name, compression_algorithm,
+                     extra_metadata=None):
+        """Download a backup object and return its decompressed data."""
+        with self._get_object_reader(
+                container, object_name,
+                extra_metadata=extra_metadata) as reader:
+            body = reader.read()
+        decompressor = self._get_compressor(compression_algorithm)
+        if decompressor is None:
+            return body
+        LOG.debug('decompressing data using %s algorithm',
+                  compression_algorithm)
+        return decompressor.decompress(body)
+
     def _restore_v1(self, backup, volume_id, metadata, volume_file,
-                    volume_is_new, requested_backup):
+                    volume_is_new, requested_backup, extents=None,
+                    zero_extents=None):
         """Restore a v1 volume backup.
 
+        If extents is given, only the objects in it are read and only their
+        listed (start, end) volume ranges are written, and only the
+        zero_extents ranges are zeroed.
+
         Raises BackupRestoreCancel on any requested_backup status change, we
         ignore the backup parameter for this check since that's only the
         current data source from the list of backup sources.
@@ -680,7 +1391,10 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
         metadata_objects = metadata['objects']
         metadata_object_names = []
         for obj in metadata_objects:
-            metadata_object_names.extend(obj.keys())
+            # Deduplicated chunks are not under the backup's prefix
+            metadata_object_names.extend(
+                name for name in obj
+                if not name.startswith(DEDUP_OBJECT_PREFIX))
         LOG.debug('metadata_object_names = %s.', metadata_object_names)
         prune_list = [self._metadata_filename(backup),
                       self._sha256_filename(backup)]
@@ -692,15 +1406,34 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
                     'does not match object list stored in metadata.')
             raise exception.InvalidBackup(reason=err)
 
-        for metadata_object in metadata_objects:
-            # Abort when status changes to error, available, or anything else
-            with requested_backup.as_read_deleted():
-                requested_backup.refresh()
-            if requested_backup.status != fields.BackupStatus.RESTORING:
-                raise exception.BackupRestoreCancel(back_id=backup.id,
-                                                    vol_id=volume_id)
+        if extents is None:
+            zero_extents = [(offset, offset + length) for offset, length
+                            in metadata.get('zero_extents', [])]
+        # New volumes already have zeros.
+        if zero_extents and not volume_is_new:
+            for start, end in zero_extents:
+                _write_zeros(volume_file, start, end - start)
+            volume_file.flush()
 
+        restore_objects = []
+        for metadata_object in metadata_objects:
             object_name, obj = list(metadata_object.items())[0]
+            end = obj['offset'] + obj['length']
+            if extents is None:
+                ranges = [(obj['offset'], end)]
+            else:
+                # Deduplicated chunks may be listed more than once, so only
+                # the ranges within this entry are taken.
+                ranges = [(start, stop) for start, stop
+                          in extents.get(object_name, ())
+                          if obj['offset'] <= start and stop <= end]
+                if not ranges:
+                    # Newer backups of the chain have all its data
+                    continue
+            restore_objects.append((object_name, obj, ranges))
+
+        def _read(restore_object):
+            object_name, obj, ranges = restore_object
             LOG.debug('restoring object. backup: %(backup_id)s, '
                       'container: %(container)s, object name: '
                       '%(object_name)s, volume: %(volume_id)s.',
@@ -710,45 +1443,88 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
                           'object_name': object_name,
                           'volume_id': volume_id,
                       })
-
-            with self._get_object_reader(
-                    container, object_name,
-                    extra_metadata=extra_metadata) as reader:
-                body = reader.read()
-            compression_algorithm = metadata_object[object_name]['compression']
-            decompressor = self._get_compressor(compression_algorithm)
-            if decompressor is not None:
-                LOG.debug('decompressing data using %s algorithm',
-                          compression_algorithm)
-                decompressed = decompressor.decompress(body)
-                body = None  # Allow Python to free it
-                _write_volume(volume_is_new,
-                              volume_file, obj['offset'], decompressed)
-                decompressed = None  # Allow Python to free it
-            else:
-                _write_volume(volume_is_new,
-                              volume_file, obj['offset'], body)
+            return self._read_object(container, object_name,
+                                     obj['compression'], extra_metadata)
+
+        # Objects are downloaded and decompressed ahead in a pipeline if more
+        # than one is allowed in flight, they are always written in order.
+        pipeline = None
+        if self.max_inflight_chunks > 1:
+            pipeline = _ChunkPipeline(self.max_inflight_chunks)
+            bodies = pipeline.imap(_read, restore_objects)
+        else:
+            bodies = map(_read, restore_objects)
+
+        status_watch = status_monitor.MONITOR.watch(requested_backup)
+        try:
+            for object_name, obj, ranges in restore_objects:
+                # Abort when status changes to error, available, or anything
+                # else
+                if status_watch.get_status() != fields.BackupStatus.RESTORING:
+                    raise exception.BackupRestoreCancel(back_id=backup.id,
+                                                        vol_id=volume_id)
+
+                body = memoryview(next(bodies))
+                for start, end in ranges:
+                    _write_volume(volume_is_new, volume_file, start,
+                                  body[start - obj['offset']:
+                                       end - obj['offset']])
                 body = None  # Allow Python to free it
 
-            # force flush every write to avoid long blocking write on close
-            volume_file.flush()
-
-            # Be tolerant to IO implementations that do not support fileno()
-            try:
-                fileno = volume_file.fileno()
-            except IOError:
-                LOG.debug("volume_file does not support fileno() so skipping "
-                          "fsync()")
-            else:
-                os.fsync(fileno)
+                # force flush every write to avoid long blocking write on
+                # close
+                volume_file.flush()
+
+                # Be tolerant to IO implementations that do not support
+                # fileno()
+                try:
+                    fileno = volume_file.fileno()
+                except IOError:
+                    LOG.debug("volume_file does not support fileno() so "
+                              "skipping fsync()")
+                else:
+                    os.fsync(fileno)
 
-            # Restoring a backup to a volume can take some time. Yield so other
-            # threads can run, allowing for among other things the service
-            # status to be updated
-            utils.cooperative_yield()
+                # Restoring a backup to a volume can take some time. Yield so
+                # other threads can run, allowing for among other things the
+                # service status to be updated
+                utils.cooperative_yield()
+        finally:
+            status_monitor.MONITOR.unwatch(status_watch)
+            if pipeline:
+                pipeline.shutdown()
         LOG.debug('v1 volume backup restore of %s finished.',
                   backup_id)
 
+    def _plan_restore(self, metadata_list):
+        """Plan the restore of a chain of backups.
+
+        The metadata of the backups is given newest first, and each byte
+        range of the volume is assigned to the newest backup with an object
+        or a zero extent that contains it. Returns, in the same order, a
+        tuple per backup with a dict of the list of (start, end) volume
+        ranges to restore from each of its objects, and the list of ranges
+        to zero. Objects that are not in the dict don't need to be read.
+        """
+        restored = _ExtentMap()
+        plans = []
+        for metadata in metadata_list:
+            plan = {}
+            for metadata_object in metadata['objects']:
+                for object_name, obj in metadata_object.items():
+                    if not obj['length']:
+                        continue
+                    ranges = restored.claim(obj['offset'],
+                                            obj['offset'] + obj['length'])
+                    if ranges:
+                        # Deduplicated chunks may be listed more than once
+                        plan.setdefault(object_name, []).extend(ranges)
+            zero_ranges = []
+            for offset, length in metadata.get('zero_extents', []):
+                zero_ranges.extend(restored.claim(offset, offset + length))
+            plans.append((plan, sorted(zero_ranges)))
+        return plans
+
     def restore(self, backup, volume_id, volume_file, volume_is_new):
         """Restore the given volume backup from backup repository.
 
@@ -783,33 +1559,46 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
         # will be the last one in the list.
         backup_list = []
         backup_list.append(backup)
+        metadata_list = [metadata]
         current_backup = backup
         while current_backup.parent_id:
             prev_backup = objects.Backup.get_by_id(self.context,
                                                    current_backup.parent_id)
             backup_list.append(prev_backup)
+            metadata_list.append(self._read_metadata(prev_backup))
             current_backup = prev_backup
 
-        # Do a full restore first, then layer the incremental backups
-        # on top of it in order.
-        index = len(backup_list) - 1
-        while index >= 0:
-            backup1 = backup_list[index]
-            index = index - 1
-            metadata = self._read_metadata(backup1)
-            restore_func(backup1, volume_id, metadata, volume_file,
-                         volume_is_new, backup)
-
-            volume_meta = metadata.get('volume_meta', None)
-            try:
-                if volume_meta:
-                    self.put_metadata(volume_id, volume_meta)
-                else:
-                    LOG.debug("No volume metadata in this backup.")
-            except exception.BackupMetadataUnsupportedVersion:
-                msg = _("Metadata restore failed due to incompatible version.")
-                LOG.error(msg)
-                raise exception.BackupOperationError(msg)
+        # Every range of the volume is only read and written once, from the
+        # newest backup in the chain that has it.
+        plans = self._plan_restore(metadata_list)
+
+        # Restore the full backup first, then the incremental backups in
+        # order. The status of the backup is watched for the whole chain.
+        status_watch = status_monitor.MONITOR.watch(backup)
+        try:
+            index = len(backup_list) - 1
+            while index >= 0:
+                backup1 = backup_list[index]
+                metadata = metadata_list[index]
+                extents, zero_extents = plans[index]
+                restore_func(backup1, volume_id, metadata, volume_file,
+                             volume_is_new, backup, extents=extents,
+                             zero_extents=zero_extents)
+                index = index - 1
+
+                volume_meta = metadata.get('volume_meta', None)
+                try:
+                    if volume_meta:
+                        self.put_metadata(volume_id, volume_meta)
+                    else:
+                        LOG.debug("No volume metadata in this backup.")
+                except exception.BackupMetadataUnsupportedVersion:
+                    msg = _("Metadata restore failed due to incompatible "
+                            "version.")
+                    LOG.error(msg)
+                    raise exception.BackupOperationError(msg)
+        finally:
+            status_monitor.MONITOR.unwatch(status_watch)
 
         LOG.debug('restore %(backup_id)s to %(volume_id)s finished.',
                   {'backup_id': backup_id, 'volume_id': volume_id})
@@ -832,6 +1621,11 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
                 LOG.warning('Error while listing objects, continuing'
                             ' with delete.')
 
+            # Deduplicated chunks are not under the backup's prefix, they are
+            # listed in its metadata.
+            if self._metadata_filename(backup) in object_names:
+                self._release_backup_dedup_references(backup)
+
             for object_name in object_names:
                 self.delete_object(container, object_name)
                 LOG.debug('deleted object: %(object_name)s'
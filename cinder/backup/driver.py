@@ -355,6 +355,10 @@ class BackupDriver(base.Base, metaclass=abc.ABCMeta):
         # deletion. So it should be set to True if the driver that inherits
         # from BackupDriver supports the force deletion function.
         self.support_force_delete = False
+        # This flag indicates if backup driver can read the volumes to back
+        # up when they are opened with direct I/O, which requires aligned
+        # reads into aligned buffers.
+        self.support_direct_io = False
 
     def get_metadata(self, volume_id):
         return self.backup_meta_api.get(volume_id)
@@ -68,6 +68,10 @@ posixbackup_service_opts = [
 CONF = cfg.CONF
 CONF.register_opts(posixbackup_service_opts)
 
+# Default container of deduplicated backups, deduplicated chunks are only
+# shared by the backups of a container.
+DEDUP_CONTAINER = 'deduplicated'
+
 
 @interface.backupdriver
 class PosixBackupDriver(chunkeddriver.ChunkedBackupDriver):
@@ -99,6 +103,8 @@ class PosixBackupDriver(chunkeddriver.ChunkedBackupDriver):
     def update_container_name(self, backup, container):
         if container is not None:
             return container
+        if self.dedup_backups:
+            return self.backup_default_container or DEDUP_CONTAINER
         id = backup['id']
         return os.path.join(id[0:2], id[2:4], id)
 
@@ -46,6 +46,12 @@
                     (default: 60)
 :backup_s3_max_pool_connections: The maximum number of connections
                                  to keep in a connection pool. (default: 10)
+:backup_s3_multipart_part_size: The size in bytes of the parts that backup
+                                 objects are transferred in.
+                                 (default: 8388608)
+:backup_s3_multipart_concurrency: The number of parts of a backup object
+                                  that are transferred in parallel.
+                                  (default: 1)
 :backup_s3_retry_max_attempts: An integer representing the maximum number of
                                retry attempts that will be made on
                                a single request.  (default: 4)
@@ -77,6 +83,7 @@ from botocore.vendored.requests.packages.urllib3 import exceptions as \
     urrlib_exc
 from oslo_config import cfg
 from oslo_log import log as logging
+from oslo_utils import excutils
 from oslo_utils import timeutils
 
 from cinder.backup import chunkeddriver
@@ -117,6 +124,19 @@ s3backup_service_opts = [
     cfg.IntOpt('backup_s3_max_pool_connections', default=10,
                help='The maximum number of connections '
                     'to keep in a connection pool.'),
+    cfg.IntOpt('backup_s3_multipart_part_size', default=8388608,
+               min=5242880,
+               help='The size in bytes of the parts that backup objects '
+                    'are uploaded and downloaded in when '
+                    'backup_s3_multipart_concurrency is greater than 1. '
+                    'Objects that are not larger than a part are '
+                    'transferred with a single request.'),
+    cfg.IntOpt('backup_s3_multipart_concurrency', default=1, min=1,
+               help='The number of parts of a backup object that are '
+                    'uploaded or downloaded in parallel, using multipart '
+                    'uploads and ranged downloads. It is capped by '
+                    'backup_s3_max_pool_connections. The default value of '
+                    '1 transfers every object with a single request.'),
     cfg.IntOpt('backup_s3_retry_max_attempts', default=4,
                help='An integer representing the maximum number of '
                     'retry attempts that will be made on a single request.'),
@@ -164,6 +184,26 @@ def _wrap_exception(func):
     return func_wrapper
 
 
+def _get_sse_args():
+    if (CONF.backup_s3_sse_customer_algorithm
+            and CONF.backup_s3_sse_customer_key):
+        return {
+            'SSECustomerAlgorithm': CONF.backup_s3_sse_customer_algorithm,
+            'SSECustomerKey': CONF.backup_s3_sse_customer_key}
+    return {}
+
+
+def _get_transfer_concurrency():
+    """Number of parts of an object that are transferred in parallel."""
+    return min(CONF.backup_s3_multipart_concurrency,
+               CONF.backup_s3_max_pool_connections)
+
+
+def _content_md5(data):
+    return base64.b64encode(
+        hashlib.md5(data, usedforsecurity=False).digest()).decode('utf-8')
+
+
 @interface.backupdriver
 class S3BackupDriver(chunkeddriver.ChunkedBackupDriver):
     """Provides backup, restore and delete of backup objects within S3."""
@@ -329,24 +369,71 @@ class S3ObjectWriter(object):
 
     @_wrap_exception
     def close(self):
+        contentmd5 = _content_md5(self.data)
+        if (len(self.data) > CONF.backup_s3_multipart_part_size
+                and _get_transfer_concurrency() > 1):
+            self._multipart_upload()
+            return contentmd5
         reader = io.BytesIO(self.data)
-        contentmd5 = base64.b64encode(
-            hashlib.md5(self.data,
-                        usedforsecurity=False).digest()).decode('utf-8')
         put_args = {'Bucket': self.bucket,
                     'Body': reader,
                     'Key': self.object_name,
                     'ContentLength': len(self.data)}
         if CONF.backup_s3_md5_validation:
             put_args['ContentMD5'] = contentmd5
-        if (CONF.backup_s3_sse_customer_algorithm
-                and CONF.backup_s3_sse_customer_key):
-            put_args.update(
-                SSECustomerAlgorithm=CONF.backup_s3_sse_customer_algorithm,
-                SSECustomerKey=CONF.backup_s3_sse_customer_key)
+        put_args.update(_get_sse_args())
         self.conn.put_object(**put_args)
         return contentmd5
 
+    def _multipart_upload(self):
+        """Upload the object in parts, several of them in parallel."""
+        part_size = CONF.backup_s3_multipart_part_size
+        sse_args = _get_sse_args()
+        upload_id = self.conn.create_multipart_upload(
+            Bucket=self.bucket, Key=self.object_name,
+            **sse_args)['UploadId']
+
+        def upload_part(part):
+            part_number, start = part
+            body = data[start:start + part_size]
+            part_args = {'Bucket': self.bucket,
+                         'Key': self.object_name,
+                         'UploadId': upload_id,
+                         'PartNumber': part_number,
+                         'Body': body.tobytes(),
+                         'ContentLength': len(body)}
+            if CONF.backup_s3_md5_validation:
+                part_args['ContentMD5'] = _content_md5(body)
+            part_args.update(sse_args)
+            resp = self.conn.upload_part(**part_args)
+            return {'ETag': resp['ETag'], 'PartNumber': part_number}
+
+        # Writer and reader methods run in a native thread, so their
+        # pipelines are native and they don't log.
+        pipeline = chunkeddriver._ChunkPipeline(_get_transfer_concurrency(),
+                                                native=True)
+        try:
+            with memoryview(self.data) as data:
+                try:
+                    parts = list(pipeline.imap(
+                        upload_part,
+                        enumerate(range(0, len(data), part_size), start=1)))
+                finally:
+                    pipeline.shutdown()
+            self.conn.complete_multipart_upload(
+                Bucket=self.bucket, Key=self.object_name,
+                UploadId=upload_id, MultipartUpload={'Parts': parts})
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                try:
+                    self.conn.abort_multipart_upload(
+                        Bucket=self.bucket, Key=self.object_name,
+                        UploadId=upload_id)
+                except Exception:
+                    # The upload error is raised instead, the parts of the
+                    # upload are left to the bucket lifecycle rules.
+                    pass
+
 
 class S3ObjectReader(object):
     def __init__(self, bucket, object_name, conn):
@@ -362,13 +449,47 @@ class S3ObjectReader(object):
 
     @_wrap_exception
     def read(self):
+        concurrency = _get_transfer_concurrency()
+        if concurrency > 1:
+            length = self.conn.head_object(
+                Bucket=self.bucket, Key=self.object_name,
+                **_get_sse_args())['ContentLength']
+            if length > CONF.backup_s3_multipart_part_size:
+                return self._read_ranges(length, concurrency)
+        return self._get_object()
+
+    def _read_ranges(self, length, concurrency):
+        """Download the object in ranges, several of them in parallel."""
+        part_size = CONF.backup_s3_multipart_part_size
+        data = bytearray(length)
+
+        def read_range(start):
+            end = min(start + part_size, length)
+            return start, end, self._get_object(
+                Range='bytes=%d-%d' % (start, end - 1))
+
+        pipeline = chunkeddriver._ChunkPipeline(concurrency, native=True)
+        try:
+            for start, end, part in pipeline.imap(
+                    read_range, range(0, length, part_size)):
+                if len(part) != end - start:
+                    raise S3ClientError(
+                        reason=_('Read %(read)s bytes instead of %(len)s '
+                                 'at offset %(offset)s of object '
+                                 '%(name)s.') %
+                        {'read': len(part), 'len': end - start,
+                         'offset': start, 'name': self.object_name})
+                data[start:end] = part
+        finally:
+            pipeline.shutdown()
+        # zstd only decompresses read-only bytes
+        return bytes(data)
+
+    def _get_object(self, **kwargs):
         get_args = {'Bucket': self.bucket,
                     'Key': self.object_name}
-        if (CONF.backup_s3_sse_customer_algorithm
-                and CONF.backup_s3_sse_customer_key):
-            get_args.update(
-                SSECustomerAlgorithm=CONF.backup_s3_sse_customer_algorithm,
-                SSECustomerKey=CONF.backup_s3_sse_customer_key)
+        get_args.update(_get_sse_args())
+        get_args.update(kwargs)
         # NOTE: these retries account for errors that occur when streaming
         # down the data from s3 (i.e. socket errors and read timeouts that
         # occur after recieving an OK response from s3). Other retryable
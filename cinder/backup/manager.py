@@ -33,6 +33,7 @@ Volume backups can be created, restored, deleted and listed.
 
 import contextlib
 import os
+import stat
 import typing
 
 from castellan import key_manager
@@ -46,6 +47,7 @@ from oslo_utils import importutils
 from oslo_utils import timeutils
 
 from cinder.backup import rpcapi as backup_rpcapi
+from cinder.backup import status_monitor
 from cinder import context
 from cinder import exception
 from cinder.i18n import _
@@ -91,6 +93,11 @@ backup_manager_opts = [
                help='Size of the native threads pool for the backups.  '
                     'Most backup drivers rely heavily on this, it can be '
                     'decreased for specific drivers that don\'t.'),
+    cfg.BoolOpt('backup_direct_io',
+                default=False,
+                help='Read local block devices with direct I/O when '
+                     'creating backups with drivers that support it, '
+                     'bypassing the page cache of the backup host.'),
 ]
 
 CONF = cfg.CONF
@@ -107,6 +114,10 @@ MAPPING = {
 SERVICE_PGRP = os.getpgrp()
 
 
+def _direct_io_opener(path, flags):
+    return os.open(path, flags | os.O_DIRECT)
+
+
 # TODO(geguileo): Once Eventlet issue #432 gets fixed we can just tpool.execute
 # the whole call to the driver's backup and restore methods instead of proxy
 # wrapping the device_file and having the drivers also proxy wrap their
@@ -516,12 +527,15 @@ class BackupManager(manager.SizedThreadPoolManager):
                 if (isinstance(device_path, str) and
                         not os.path.isdir(device_path)):
                     if backup_device.secure_enabled:
-                        with open(device_path, 'rb') as device_file:
+                        with self._open_backup_device(
+                                backup_service, device_path) as device_file:
                             updates = backup_service.backup(
                                 backup, utils.tpool_wrap(device_file))
                     else:
                         with utils.temporary_chown(device_path):
-                            with open(device_path, 'rb') as device_file:
+                            with self._open_backup_device(
+                                    backup_service,
+                                    device_path) as device_file:
                                 updates = backup_service.backup(
                                     backup,
                                     utils.tpool_wrap(device_file))
@@ -578,6 +592,23 @@ class BackupManager(manager.SizedThreadPoolManager):
 
         self._finish_backup(context, backup, volume, updates)
 
+    def _open_backup_device(self, backup_service, device_path):
+        """Open a local device to read the data to back up.
+
+        Block devices are opened with direct I/O if it's enabled and the
+        backup driver supports it.
+        """
+        if (CONF.backup_direct_io and backup_service.support_direct_io and
+                stat.S_ISBLK(os.stat(device_path).st_mode)):
+            try:
+                return open(device_path, 'rb', buffering=0,
+                            opener=_direct_io_opener)
+            except OSError as err:
+                LOG.warning('Cannot open %(path)s with direct I/O, using '
+                            'buffered I/O: %(err)s',
+                            {'path': device_path, 'err': err})
+        return open(device_path, 'rb')
+
     def _finish_backup(self, context, backup, volume, updates):
         volume_id = backup.volume_id
         snapshot_id = backup.snapshot_id
@@ -895,6 +926,10 @@ class BackupManager(manager.SizedThreadPoolManager):
                 detail=message_field.Detail.BACKUP_INVALID_STATE)
             raise exception.InvalidBackup(reason=err)
 
+        # Let a creation of this backup in progress in this process stop
+        # without waiting for its next status poll.
+        status_monitor.MONITOR.notify(backup.id, backup.status)
+
         if backup.service and not self.is_working():
             err = _('Delete backup is aborted due to backup service is down.')
             status = fields.BackupStatus.ERROR_DELETING
@@ -1144,6 +1179,7 @@ class BackupManager(manager.SizedThreadPoolManager):
         if backup.service is not None:
             backup.status = status
             backup.save()
+            status_monitor.MONITOR.notify(backup.id, status)
 
             # Needs to clean temporary volumes and snapshots.
             try:
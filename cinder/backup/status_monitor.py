@@ -0,0 +1,126 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Status of the backups being created or restored by a backup service.
+
+Backup drivers check the status of a backup before every chunk they write or
+restore, to stop when the backup is deleted or the restore is cancelled.
+Instead of reading the backup from the database every time, operations watch
+their backup through the process wide monitor, which reads the status of all
+the watched backups with a single query at most every
+backup_status_check_interval seconds. The backup manager also notifies the
+monitor of the status changes it receives, so they are seen right away.
+"""
+
+import threading
+import time
+
+from oslo_config import cfg
+from oslo_log import log as logging
+
+from cinder import context
+from cinder import objects
+from cinder.objects import fields
+
+LOG = logging.getLogger(__name__)
+
+backup_status_opts = [
+    cfg.IntOpt('backup_status_check_interval', default=5, min=0,
+               help='Interval, in seconds, between the reads of the status '
+                    'of the backups being created or restored, which are '
+                    'used to detect that they have been cancelled. The '
+                    'status of all the backups in progress in a backup '
+                    'service is read with a single query. When set to 0 '
+                    'the status is read before every chunk.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(backup_status_opts)
+
+
+class BackupWatch(object):
+    """Latest known status of a backup being created or restored."""
+
+    def __init__(self, monitor, backup):
+        self.backup_id = backup.id
+        self.status = backup.status
+        self._monitor = monitor
+        self._refs = 0
+
+    def get_status(self):
+        """Return the status of the backup, reading it if it's due."""
+        self._monitor.poll()
+        return self.status
+
+
+class BackupStatusMonitor(object):
+    """Shared polling of the status of the watched backups."""
+
+    def __init__(self):
+        self._watches: dict[str, BackupWatch] = {}
+        self._lock = threading.Lock()
+        self._last_poll = None
+
+    def watch(self, backup):
+        """Start watching a backup, must be paired with unwatch.
+
+        Operations on the same backup share the same watch.
+        """
+        with self._lock:
+            watch = self._watches.get(backup.id)
+            if watch is None:
+                watch = BackupWatch(self, backup)
+                self._watches[backup.id] = watch
+            watch._refs += 1
+        return watch
+
+    def unwatch(self, watch):
+        with self._lock:
+            watch._refs -= 1
+            if not watch._refs:
+                self._watches.pop(watch.backup_id, None)
+
+    def notify(self, backup_id, status):
+        """Record a status change of a backup, if it's being watched."""
+        with self._lock:
+            watch = self._watches.get(backup_id)
+            if watch is not None:
+                watch.status = status
+
+    def poll(self):
+        """Read the status of all the watched backups if it's due."""
+        now = time.monotonic()
+        with self._lock:
+            if (self._last_poll is not None and
+                    now - self._last_poll < CONF.backup_status_check_interval):
+                return
+            self._last_poll = now
+            backup_ids = list(self._watches)
+        if backup_ids:
+            self._poll(backup_ids)
+
+    def _poll(self, backup_ids):
+        ctxt = context.get_admin_context(read_deleted='yes')
+        backups = objects.BackupList.get_all(ctxt,
+                                             filters={'id': backup_ids})
+        statuses = {backup.id: backup.status for backup in backups}
+        LOG.debug('Read the status of backups in progress: %s', statuses)
+        with self._lock:
+            for backup_id in backup_ids:
+                watch = self._watches.get(backup_id)
+                if watch is not None:
+                    # Purged backups are gone for good
+                    watch.status = statuses.get(backup_id,
+                                                fields.BackupStatus.DELETED)
+
+
+MONITOR = BackupStatusMonitor()
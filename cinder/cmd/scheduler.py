@@ -37,6 +37,8 @@ from cinder import version
 
 
 CONF = cfg.CONF
+CONF.import_opt('scheduler_shared_capacity_ledger',
+                'cinder.scheduler.host_manager')
 
 
 def main() -> None:
@@ -47,6 +49,8 @@ def main() -> None:
     logging.setup(CONF, "cinder")
     python_logging.captureWarnings(True)
     gmr.TextGuruMeditation.setup_autorun(version, conf=CONF)
-    server = service.Service.create(binary='cinder-scheduler')
+    server = service.Service.create(
+        binary='cinder-scheduler',
+        coordination=CONF.scheduler_shared_capacity_ledger)
     service.serve(server)
     service.wait()
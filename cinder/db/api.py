@@ -8491,6 +8491,7 @@ def image_volume_cache_get_and_update_last_used(context, image_id, **filters):
 
     if entry:
         entry.last_used = timeutils.utcnow()
+        entry.hit_count += 1
         entry.save(context.session)
     return entry
 
@@ -8517,6 +8518,22 @@ def image_volume_cache_get_all(context, **filters):
     )
 
 
+@require_context
+@main_context_manager.reader
+def image_volume_cache_get_popular_images(context, limit):
+    """Get the ids of the images with the most hits in all the caches."""
+    hits = func.sum(models.ImageVolumeCacheEntry.hit_count)
+    rows = (
+        context.session.query(models.ImageVolumeCacheEntry.image_id)
+        .group_by(models.ImageVolumeCacheEntry.image_id)
+        .having(hits > 0)
+        .order_by(desc(hits), models.ImageVolumeCacheEntry.image_id)
+        .limit(limit)
+        .all()
+    )
+    return [row.image_id for row in rows]
+
+
 @require_admin_context
 @main_context_manager.writer
 def image_volume_cache_include_in_cluster(
@@ -0,0 +1,36 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Add hit statistics to image volume cache entries
+
+Revision ID: 4437bdd33d5f
+Revises: 9c74c1c6971f
+Create Date: 2026-10-16 10:12:41.318214
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4437bdd33d5f'
+down_revision = '9c74c1c6971f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('image_volume_cache_entries',
+                  sa.Column('created_at', sa.DateTime(), nullable=True))
+    op.add_column('image_volume_cache_entries',
+                  sa.Column('hit_count', sa.Integer(), nullable=False,
+                            server_default=sa.text('0')))
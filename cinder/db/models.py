@@ -1197,6 +1197,14 @@ class ImageVolumeCacheEntry(BASE, models.ModelBase):
     last_used = sa.Column(
         sa.DateTime, nullable=False, default=lambda: timeutils.utcnow(),
     )
+    created_at = sa.Column(sa.DateTime, default=lambda: timeutils.utcnow())
+    # Number of volumes created from the entry
+    hit_count = sa.Column(
+        sa.Integer,
+        nullable=False,
+        default=0,
+        server_default=sa.text('0'),
+    )
 
 
 class Worker(BASE, CinderBase):
@@ -12,7 +12,9 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-from typing import Optional
+import contextlib
+import threading
+from typing import Generator, Optional
 from zoneinfo import ZoneInfo
 
 from oslo_config import cfg
@@ -23,6 +25,7 @@ from cinder import context
 from cinder import objects
 from cinder import rpc
 from cinder import utils
+from cinder.volume import volume_utils
 
 CONF = cfg.CONF
 
@@ -34,12 +37,21 @@ class ImageVolumeCache(object):
                  db,
                  volume_api,
                  max_cache_size_gb: int = 0,
-                 max_cache_size_count: int = 0):
+                 max_cache_size_count: int = 0,
+                 eviction_policy: str = 'lru',
+                 pinned_images: Optional[list[str]] = None,
+                 warm_count: int = 0):
         self.db = db
         self.volume_api = volume_api
         self.max_cache_size_gb = int(max_cache_size_gb)
         self.max_cache_size_count = int(max_cache_size_count)
+        self.eviction_policy = eviction_policy
+        self.pinned_images = list(pinned_images or [])
+        self.warm_count = int(warm_count)
         self.notifier = rpc.get_notifier('volume', CONF.host)
+        # Events of the cache entries being created, by image and scope
+        self._pending: dict[tuple[str, str], threading.Event] = {}
+        self._pending_lock = threading.Lock()
 
     def get_by_image_volume(self,
                             context: context.RequestContext,
@@ -68,6 +80,81 @@ class ImageVolumeCache(object):
         # given host value hostname@backend#pool.
         return {}
 
+    def get_scope(self, volume_ref: objects.Volume,
+                  clone_across_pools: bool = False) -> str:
+        """Return where the cache entries usable by a volume are created."""
+        if volume_ref.is_clustered:
+            return volume_ref.cluster_name
+        if not clone_across_pools:
+            return volume_ref.host
+        backend_name = volume_utils.extract_host(volume_ref.host)
+        assert backend_name is not None
+        return backend_name
+
+    @contextlib.contextmanager
+    def pending_entry(self,
+                      volume_ref: objects.Volume,
+                      image_id: str,
+                      clone_across_pools: bool = False
+                      ) -> Generator[bool, None, None]:
+        """Coordinate the creation of the cache entry of an image.
+
+        Yields True to the first caller for an image and scope, which creates
+        the entry. Other callers wait until it's done and get False, so they
+        can clone the new entry instead of downloading the image as well.
+        """
+        key = (image_id, self.get_scope(volume_ref, clone_across_pools))
+        with self._pending_lock:
+            event = self._pending.get(key)
+            first = event is None
+            if event is None:
+                event = self._pending[key] = threading.Event()
+
+        if not first:
+            LOG.debug('Waiting for the pending image-volume cache entry for '
+                      'image %(image_id)s on %(scope)s.',
+                      {'image_id': image_id, 'scope': key[1]})
+            event.wait()
+            yield False
+            return
+
+        try:
+            yield True
+        finally:
+            with self._pending_lock:
+                del self._pending[key]
+            event.set()
+
+    def has_entry(self,
+                  context: context.RequestContext,
+                  volume_ref: objects.Volume,
+                  image_id: str,
+                  clone_across_pools: bool = False) -> bool:
+        """Check for an entry without using it, unlike get_entry."""
+        return bool(self.db.image_volume_cache_get_all(
+            context,
+            image_id=image_id,
+            **self._get_query_filters(volume_ref,
+                                      clone_across_pools=clone_across_pools)))
+
+    def is_pinned(self, image_id: str) -> bool:
+        return image_id in self.pinned_images
+
+    def get_warm_images(self, context: context.RequestContext) -> list[str]:
+        """Return the images whose entries should be created in advance.
+
+        These are the pinned images, followed by the warm_count images with
+        the most hits in the caches of all the backends.
+        """
+        image_ids = list(self.pinned_images)
+        if self.warm_count:
+            popular = self.db.image_volume_cache_get_popular_images(
+                context, self.warm_count + len(image_ids))
+            image_ids.extend([image_id for image_id in popular
+                              if image_id not in image_ids]
+                             [:self.warm_count])
+        return image_ids
+
     def get_entry(self,
                   context: context.RequestContext,
                   volume_ref: objects.Volume,
@@ -168,20 +255,8 @@ class ImageVolumeCache(object):
                 volume.size > self.max_cache_size_gb):
             return False
 
-        # Assume the entries are ordered by most recently used to least used.
-        entries = self.db.image_volume_cache_get_all(
-            context,
-            **self._get_query_filters(volume))
-
-        current_count = len(entries)
-
-        current_size = 0
-        for entry in entries:
-            current_size += entry['size']
-
-        # Add values for the entry we intend to create.
-        current_size += volume.size
-        current_count += 1
+        entries, current_size, current_count = self._get_usage(context,
+                                                               volume)
 
         LOG.debug('Image-volume cache for %(service)s current_size (GB) = '
                   '%(size_gb)s (max = %(max_gb)s), current count = %(count)s '
@@ -192,6 +267,12 @@ class ImageVolumeCache(object):
                    'count': current_count,
                    'max_count': self.max_cache_size_count})
 
+        # Entries are evicted from last to first, and pinned images never are
+        entries = [entry for entry in entries
+                   if not self.is_pinned(entry['image_id'])]
+        if self.eviction_policy == 'cost':
+            entries.sort(key=self._get_eviction_score)
+
         while (((current_size > self.max_cache_size_gb and
                  self.max_cache_size_gb > 0)
                 or (current_count > self.max_cache_size_count and
@@ -208,19 +289,80 @@ class ImageVolumeCache(object):
                        'size_gb': current_size,
                        'count': current_count})
 
-        # It is only possible to not free up enough gb, we will always be able
-        # to free enough count. This is because 0 means unlimited which means
-        # it is guaranteed to be >0 if limited, and we can always delete down
-        # to 0.
-        if self.max_cache_size_gb > 0:
-            if current_size > self.max_cache_size_gb > 0:
-                LOG.warning('Image-volume cache for %(service)s does '
-                            'not have enough space (GB).',
-                            {'service': volume.service_topic_queue})
-                return False
+        # Pinned entries are never evicted, so it is possible to not free
+        # up enough gb or enough count.
+        if current_size > self.max_cache_size_gb > 0:
+            LOG.warning('Image-volume cache for %(service)s does '
+                        'not have enough space (GB).',
+                        {'service': volume.service_topic_queue})
+            return False
+
+        if current_count > self.max_cache_size_count > 0:
+            LOG.warning('Image-volume cache for %(service)s does '
+                        'not have enough space (count).',
+                        {'service': volume.service_topic_queue})
+            return False
 
         return True
 
+    def has_space(self,
+                  context: context.RequestContext,
+                  volume: objects.Volume) -> bool:
+        """Check if there is room for a volume without evicting entries."""
+        __, size, count = self._get_usage(context, volume)
+        return self._within_limits(size, count)
+
+    def can_fit(self,
+                context: context.RequestContext,
+                volume: objects.Volume) -> bool:
+        """Check if evicting the entries that aren't pinned makes room."""
+        entries, __, __ = self._get_usage(context, volume)
+        pinned = [entry for entry in entries
+                  if self.is_pinned(entry['image_id'])]
+        return self._within_limits(
+            sum(entry['size'] for entry in pinned) + volume.size,
+            len(pinned) + 1)
+
+    def _within_limits(self, size: int, count: int) -> bool:
+        return ((self.max_cache_size_gb == 0 or
+                 size <= self.max_cache_size_gb) and
+                (self.max_cache_size_count == 0 or
+                 count <= self.max_cache_size_count))
+
+    def _get_usage(self,
+                   context: context.RequestContext,
+                   volume: objects.Volume) -> tuple[list, int, int]:
+        """Return the entries, size and count of the cache with volume."""
+        # Assume the entries are ordered by most recently used to least used.
+        entries = self.db.image_volume_cache_get_all(
+            context,
+            **self._get_query_filters(volume))
+
+        current_count = len(entries)
+
+        current_size = 0
+        for entry in entries:
+            current_size += entry['size']
+
+        # Add values for the entry we intend to create.
+        current_size += volume.size
+        current_count += 1
+        return entries, current_size, current_count
+
+    @staticmethod
+    def _get_eviction_score(cache_entry: dict) -> float:
+        """Return the cost of keeping an entry over its benefit.
+
+        This is the size of the entry divided by its rate of hits since it
+        was created. The cost of cloning an entry is the same for all the
+        entries of a backend, so it doesn't change the order.
+        """
+        created_at = cache_entry.get('created_at') or cache_entry['last_used']
+        hours = max((timeutils.utcnow() - created_at).total_seconds(),
+                    1) / 3600
+        hit_rate = (cache_entry.get('hit_count', 0) + 1) / hours
+        return cache_entry['size'] / hit_rate
+
     @utils.if_notifications_enabled
     def _notify_cache_hit(self,
                           context: context.RequestContext,
@@ -281,4 +423,5 @@ class ImageVolumeCache(object):
             'size': cache_entry['size'],
             'image_updated_at': cache_entry['image_updated_at'],
             'last_used': cache_entry['last_used'],
+            'hit_count': cache_entry.get('hit_count', 0),
         })
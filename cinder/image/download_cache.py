@@ -0,0 +1,227 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Host local cache of the images downloaded from the image service.
+
+Volumes created from an image download it into image_conversion_dir before
+converting it, and delete it afterwards. When image_download_cache_size_gb is
+set, the downloaded images are kept in image_download_cache_dir instead, named
+after the image id and hash, so that they are downloaded once per host.
+
+The cache is shared by all the volume services of the host:
+
+* Downloads of the same image are serialized with an external lock, so
+  concurrent volume creations wait for a single download.
+* The images being used hold a shared flock, and eviction skips them.
+* The least recently used images are evicted to stay within the size.
+"""
+
+import contextlib
+import fcntl
+import hashlib
+import os
+from typing import Callable, Generator, Optional
+
+from eventlet import tpool
+from oslo_concurrency import lockutils
+from oslo_config import cfg
+from oslo_log import log as logging
+from oslo_utils import excutils
+from oslo_utils import fileutils
+from oslo_utils import units
+
+from cinder import exception
+from cinder.i18n import _
+
+LOG = logging.getLogger(__name__)
+
+download_cache_opts = [
+    cfg.StrOpt('image_download_cache_dir',
+               default='$state_path/image_download_cache',
+               help='Directory of the images downloaded from the image '
+                    'service that are kept to create other volumes. It is '
+                    'shared by all the volume services of the host.'),
+    cfg.IntOpt('image_download_cache_size_gb', default=0, min=0,
+               help='Maximum size, in GB, of the images kept in '
+                    'image_download_cache_dir, so that volumes created from '
+                    'the same image on this host download it only once. The '
+                    'least recently used images are evicted to stay within '
+                    'this size. 0 disables the cache.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(download_cache_opts)
+
+LOCK_PREFIX = 'cinder-'
+PART_SUFFIX = '.part'
+HASH_READ_SIZE = 4 * units.Mi
+
+
+def get_image_hash(image_meta: dict) -> Optional[tuple[str, str]]:
+    """Return the hash algorithm and value of an image, if it has one."""
+    algorithm = image_meta.get('os_hash_algo')
+    value = image_meta.get('os_hash_value')
+    if not (algorithm and value):
+        algorithm, value = 'md5', image_meta.get('checksum')
+    if not value or algorithm not in hashlib.algorithms_available:
+        return None
+    return algorithm, value
+
+
+def _hash_file(image_file, algorithm: str) -> str:
+    hasher = hashlib.new(algorithm, usedforsecurity=False)
+    image_file.seek(0)
+    for data in iter(lambda: image_file.read(HASH_READ_SIZE), b''):
+        hasher.update(data)
+    return hasher.hexdigest()
+
+
+class ImageDownloadCache(object):
+    def __init__(self, cache_dir: str, max_cache_size_gb: int):
+        self.cache_dir = cache_dir
+        self.max_cache_size = max_cache_size_gb * units.Gi
+
+    @contextlib.contextmanager
+    def get(self, image_meta: dict,
+            download: Callable[[str], None]
+            ) -> Generator[Optional[str], None, None]:
+        """Yield the path of an image in the cache, downloading it if needed.
+
+        download is called with the path where the image has to be
+        downloaded. None is yielded when the image can't be cached, because
+        it has no hash or doesn't fit in the cache. The image is read-only
+        and stays in the cache until the context exits.
+        """
+        image_id = image_meta['id']
+        image_hash = get_image_hash(image_meta)
+        size = image_meta.get('size')
+        if not image_hash or not size or size > self.max_cache_size:
+            LOG.debug('Image %s is not cached: it has no hash or it is '
+                      'larger than the cache.', image_id)
+            yield None
+            return
+
+        name = hashlib.sha256(('%s:%s:%s' % ((image_id,) + image_hash))
+                              .encode('utf-8')).hexdigest()
+        path = os.path.join(self.cache_dir, name)
+        fileutils.ensure_tree(self.cache_dir)
+        with lockutils.lock('image-download-%s' % name,
+                            lock_file_prefix=LOCK_PREFIX, external=True):
+            image_file = self._open(path)
+            if image_file:
+                LOG.debug('Image %(image)s found in the download cache at '
+                          '%(path)s.', {'image': image_id, 'path': path})
+                # The modification time orders the eviction
+                os.utime(path)
+            elif self._make_room(size):
+                LOG.debug('Downloading image %(image)s into the download '
+                          'cache at %(path)s.',
+                          {'image': image_id, 'path': path})
+                image_file = self._download(image_id, path, image_hash,
+                                            download)
+            else:
+                LOG.debug('Image %s is not cached: the cache is full of '
+                          'images in use.', image_id)
+        try:
+            yield path if image_file else None
+        finally:
+            if image_file:
+                image_file.close()
+
+    @staticmethod
+    def _open(path: str):
+        """Open and lock an image of the cache, if it's there."""
+        try:
+            image_file = open(path, 'rb')
+        except FileNotFoundError:
+            return None
+        fcntl.flock(image_file, fcntl.LOCK_SH)
+        if not os.fstat(image_file.fileno()).st_nlink:
+            # It was evicted before it was locked
+            image_file.close()
+            return None
+        return image_file
+
+    def _download(self, image_id: str, path: str,
+                  image_hash: tuple[str, str],
+                  download: Callable[[str], None]):
+        part_path = path + PART_SUFFIX
+        image_file = None
+        try:
+            download(part_path)
+            image_file = open(part_path, 'rb')
+            fcntl.flock(image_file, fcntl.LOCK_SH)
+            algorithm, value = image_hash
+            digest = tpool.execute(_hash_file, image_file, algorithm)
+            if digest != value:
+                reason = (_('The %(algorithm)s hash of the downloaded image '
+                            'is %(digest)s instead of %(value)s.') %
+                          {'algorithm': algorithm, 'digest': digest,
+                           'value': value})
+                raise exception.ImageDownloadFailed(image_href=image_id,
+                                                    reason=reason)
+            # The lock stays on the file once it's renamed
+            os.rename(part_path, path)
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                if image_file:
+                    image_file.close()
+                fileutils.delete_if_exists(part_path)
+        return image_file
+
+    def _make_room(self, size: int) -> bool:
+        """Evict the least recently used images to fit size more bytes."""
+        with lockutils.lock('image-download-cache-eviction',
+                            lock_file_prefix=LOCK_PREFIX, external=True):
+            entries = []
+            total = size
+            for entry in os.scandir(self.cache_dir):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                total += stat.st_size
+                # Images being downloaded can't be evicted
+                if not entry.name.endswith(PART_SUFFIX):
+                    entries.append((stat.st_mtime, entry.path,
+                                    stat.st_size))
+
+            for _mtime, entry_path, entry_size in sorted(entries):
+                if total <= self.max_cache_size:
+                    break
+                if self._evict(entry_path):
+                    total -= entry_size
+            return total <= self.max_cache_size
+
+    @staticmethod
+    def _evict(path: str) -> bool:
+        """Remove an image of the cache unless it's being used."""
+        try:
+            with open(path, 'rb') as image_file:
+                try:
+                    fcntl.flock(image_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return False
+                LOG.debug('Evicting %s from the image download cache.',
+                          path)
+                os.unlink(path)
+        except FileNotFoundError:
+            pass
+        return True
+
+
+def get_cache() -> Optional[ImageDownloadCache]:
+    """Return the image download cache, or None if it's disabled."""
+    if not CONF.image_download_cache_size_gb:
+        return None
+    return ImageDownloadCache(CONF.image_download_cache_dir,
+                              CONF.image_download_cache_size_gb)
@@ -16,10 +16,15 @@
 
 """Implementation of an image service that uses Glance as the backend"""
 
+import collections
 import copy
+import hashlib
+from http import HTTPStatus
 import itertools
+import os
 import random
 import shutil
+import stat
 import sys
 import textwrap
 import time
@@ -27,6 +32,7 @@ from typing import (Any, Callable, Iterable, NoReturn, Optional)
 import urllib
 import urllib.parse
 
+import futurist
 import glanceclient
 import glanceclient.exc
 from keystoneauth1 import loading as ks_loading
@@ -35,11 +41,14 @@ from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_serialization import jsonutils
 from oslo_utils import timeutils
+from oslo_utils import units
 
 from cinder import context
 from cinder import exception
 from cinder.i18n import _
+from cinder.image import download_cache
 from cinder.image import image_utils
+from cinder import monkey_patch
 from cinder import service_auth
 from cinder import utils
 
@@ -77,6 +86,23 @@ image_opts = [
                     'catalog. Format is: separated values of the form: '
                     '<service_type>:<service_name>:<endpoint_type> - '
                     'Only used if glance_api_servers are not provided.'),
+    cfg.IntOpt('glance_download_concurrency',
+               default=1,
+               min=1,
+               help='Number of concurrent HTTP range requests used to '
+                    'download an image into a file, when the image store '
+                    'supports them. Images larger than '
+                    'glance_download_segment_size_mb are split into '
+                    'segments of that size, which are written at their '
+                    'offset in the file. 1 downloads images with a single '
+                    'request. When the image has a checksum, up to this '
+                    'many segments are held in memory to verify it.'),
+    cfg.IntOpt('glance_download_segment_size_mb',
+               default=64,
+               min=1,
+               help='Size, in MB, of the segments of the images downloaded '
+                    'with concurrent range requests. See '
+                    'glance_download_concurrency.'),
 ]
 glance_core_properties_opts = [
     cfg.ListOpt('glance_core_properties',
@@ -107,6 +133,9 @@ _SESSION = None
 
 LOG = logging.getLogger(__name__)
 
+# Size of the writes and reads of the segments of ranged downloads
+SEGMENT_IO_SIZE = 4 * units.Mi
+
 
 def _parse_image_ref(image_href: str) -> tuple[str, str, bool]:
     """Parse an image href into composite parts.
@@ -505,6 +534,10 @@ class GlanceImageService(object):
                         shutil.copyfileobj(f, data)
                     return
 
+        if (data and CONF.glance_download_concurrency > 1 and
+                self._download_segments(context, image_id, data)):
+            return
+
         try:
             image_chunks = self._client.call(context, 'data', image_id)
         except Exception:
@@ -520,6 +553,164 @@ class GlanceImageService(object):
             for chunk in image_chunks:
                 data.write(chunk)
 
+    def _download_segments(self,
+                           context: context.RequestContext,
+                           image_id: str,
+                           data) -> bool:
+        """Download an image into a file with concurrent range requests.
+
+        The segments are written at their offset in the file. Their data is
+        kept until the previous segments complete, to hash the image in
+        order without reading the file back, since it may be write only.
+        Returns False, before writing anything, when the image has to be
+        downloaded with a single request because data isn't a regular file,
+        the image fits in one segment or its store doesn't support range
+        requests.
+        """
+        try:
+            if not stat.S_ISREG(os.fstat(data.fileno()).st_mode):
+                return False
+        except (AttributeError, OSError, TypeError, ValueError):
+            return False
+
+        segment_size = CONF.glance_download_segment_size_mb * units.Mi
+        image_meta = self.show(context, image_id)
+        size = image_meta.get('size')
+        if not size or size <= segment_size:
+            return False
+
+        try:
+            body = self._get_segment(context, image_id, 0, segment_size)
+        except Exception:
+            _reraise_translated_image_exception(image_id)
+        if body is None:
+            LOG.debug('The store of image %s does not support range '
+                      'requests, downloading it with a single request.',
+                      image_id)
+            return False
+
+        image_hash = download_cache.get_image_hash(image_meta)
+        hasher = None
+        if image_hash:
+            hasher = hashlib.new(image_hash[0], usedforsecurity=False)
+        dest = utils.tpool_wrap(image_utils.PositionalFile(data))
+        data.truncate(size)
+
+        concurrency = CONF.glance_download_concurrency
+        if monkey_patch.is_patched():
+            executor = futurist.GreenThreadPoolExecutor(concurrency)
+        else:
+            executor = futurist.ThreadPoolExecutor(concurrency)
+        futures: collections.deque = collections.deque()
+        LOG.debug('Downloading image %(image)s in %(count)d segments with '
+                  '%(concurrency)d concurrent requests.',
+                  {'image': image_id,
+                   'count': -(-size // segment_size),
+                   'concurrency': concurrency})
+        keep = hasher is not None
+        try:
+            futures.append(executor.submit(
+                self._write_segment, image_id, dest, body, 0, segment_size,
+                keep))
+            for offset in range(segment_size, size, segment_size):
+                if len(futures) >= concurrency:
+                    self._hash_segment(hasher, futures.popleft().result())
+                futures.append(executor.submit(
+                    self._fetch_segment, context, image_id, dest, offset,
+                    min(segment_size, size - offset), keep))
+            while futures:
+                self._hash_segment(hasher, futures.popleft().result())
+
+            if hasher and hasher.hexdigest() != image_hash[1]:
+                reason = (_('The %(algorithm)s hash of the downloaded image '
+                            'is %(digest)s instead of %(value)s.') %
+                          {'algorithm': image_hash[0],
+                           'digest': hasher.hexdigest(),
+                           'value': image_hash[1]})
+                raise exception.ImageDownloadFailed(image_href=image_id,
+                                                    reason=reason)
+        except Exception:
+            _reraise_translated_image_exception(image_id)
+        finally:
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=True)
+        return True
+
+    def _get_segment(self,
+                     context: context.RequestContext,
+                     image_id: str,
+                     offset: int,
+                     length: int) -> Optional[Iterable[bytes]]:
+        """Request a segment of an image, or None if ranges are unsupported."""
+        content_range = 'bytes %d-%d' % (offset, offset + length - 1)
+        resp, body = self._client.call(
+            context, 'get', '/v2/images/%s/file' % image_id,
+            headers={'Range': content_range.replace(' ', '=')},
+            controller='http_client')
+        if (resp.status_code != HTTPStatus.PARTIAL_CONTENT or
+                not resp.headers.get('Content-Range', '').startswith(
+                    content_range + '/')):
+            resp.close()
+            return None
+        return body
+
+    def _fetch_segment(self,
+                       context: context.RequestContext,
+                       image_id: str,
+                       dest,
+                       offset: int,
+                       length: int,
+                       keep: bool) -> list[bytearray]:
+        body = self._get_segment(context, image_id, offset, length)
+        if body is None:
+            raise exception.ImageDownloadFailed(
+                image_href=image_id,
+                reason=_('range request at offset %d failed.') % offset)
+        return self._write_segment(image_id, dest, body, offset, length,
+                                   keep)
+
+    @staticmethod
+    def _write_segment(image_id: str,
+                       dest,
+                       body: Iterable[bytes],
+                       offset: int,
+                       length: int,
+                       keep: bool) -> list[bytearray]:
+        """Write a segment, returning its blocks if keep is True."""
+        blocks = []
+        position = offset
+        block = bytearray()
+        for chunk in body:
+            block += chunk
+            if len(block) >= SEGMENT_IO_SIZE:
+                dest.pwrite(block, position)
+                position += len(block)
+                if keep:
+                    blocks.append(block)
+                block = bytearray()
+        if block:
+            dest.pwrite(block, position)
+            position += len(block)
+            if keep:
+                blocks.append(block)
+
+        if position - offset != length:
+            reason = (_('received %(received)d bytes instead of %(length)d '
+                        'at offset %(offset)d.') %
+                      {'received': position - offset, 'length': length,
+                       'offset': offset})
+            raise exception.ImageDownloadFailed(image_href=image_id,
+                                                reason=reason)
+        return blocks
+
+    @staticmethod
+    def _hash_segment(hasher, blocks: list[bytearray]) -> None:
+        if hasher is None:
+            return
+        for block in blocks:
+            hasher.update(block)
+
     def create(self,
                context: context.RequestContext,
                image_meta: dict[str, Any],
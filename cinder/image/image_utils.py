@@ -23,13 +23,16 @@ Some slight modifications, but at some point
 we should look at maybe pushing this up to Oslo
 """
 
+import collections
 import contextlib
 import errno
 import io
+import itertools
 import math
 import os
 import re
 import shutil
+import stat
 import tempfile
 import typing
 from typing import ContextManager, Generator, Optional
@@ -38,6 +41,7 @@ import cryptography
 from cursive import exception as cursive_exception
 from cursive import signature_utils
 from eventlet import tpool
+import futurist
 from oslo_concurrency import processutils
 from oslo_config import cfg
 from oslo_log import log as logging
@@ -50,7 +54,10 @@ from cinder import context
 from cinder import exception
 from cinder.i18n import _
 from cinder.image import accelerator
+from cinder.image import download_cache
+from cinder.image import format_inspector
 from cinder.image import glance
+from cinder import monkey_patch
 import cinder.privsep.format_inspector
 import cinder.privsep.path
 from cinder import utils
@@ -81,6 +88,14 @@ image_opts = [
                 'conversion consumes a large amount of system resources and '
                 'can cause performance problems on the cinder-volume node. '
                 'When set True, this option disables image conversion.'),
+    cfg.BoolOpt('image_stream_raw_to_volume',
+                default=False,
+                help='Write raw images to raw volumes while they are '
+                'downloaded, instead of downloading them to '
+                'image_conversion_dir first. The format of the image is '
+                'checked on its beginning before anything is written, and '
+                'images that are not raw are downloaded as usual. Not used '
+                'when volume_copy_bps_limit is set.'),
     cfg.ListOpt('vmdk_allowed_types',
                 default=['streamOptimized', 'monolithicSparse'],
                 help='A list of strings describing the VMDK createType '
@@ -133,6 +148,13 @@ COMPRESSIBLE_IMAGE_FORMATS = ('qcow2',)
 GLANCE_RESERVED_NAMESPACES = ["os_glance", "img_signature",
                               "signature_verified"]
 
+# Size of the writes when streaming images to volumes
+STREAM_WRITE_SIZE = 4 * units.Mi
+# Maximum size of the beginning of an image held to check its format
+STREAM_DETECT_LIMIT = 64 * units.Mi
+# Number of writes in flight while an image is streamed
+STREAM_WRITE_DEPTH = 2
+
 
 def validate_stores_id(context: context.RequestContext,
                        image_service_store_id: str) -> None:
@@ -689,6 +711,30 @@ def verify_glance_image_signature(context: context.RequestContext,
     return False
 
 
+@contextlib.contextmanager
+def _image_download_errors(image_id: str,
+                           path: str) -> Generator[None, None, None]:
+    """Translate I/O errors while an image is downloaded to path."""
+    try:
+        yield
+    except IOError as e:
+        if e.errno == errno.ENOSPC:
+            params = {'path': os.path.dirname(path),
+                      'image': image_id}
+            reason = _("No space left in image_conversion_dir "
+                       "path (%(path)s) while fetching "
+                       "image %(image)s.") % params
+            LOG.exception(reason)
+            raise exception.ImageTooBig(image_id=image_id,
+                                        reason=reason)
+
+        reason = ("IOError: %(errno)s %(strerror)s" %
+                  {'errno': e.errno, 'strerror': e.strerror})
+        LOG.error(reason)
+        raise exception.ImageDownloadFailed(image_href=image_id,
+                                            reason=reason)
+
+
 def fetch(context: context.RequestContext,
           image_service: glance.GlanceImageService,
           image_id: str,
@@ -702,25 +748,9 @@ def fetch(context: context.RequestContext,
     start_time = timeutils.utcnow()
     with fileutils.remove_path_on_error(path):
         with open(path, "wb") as image_file:
-            try:
+            with _image_download_errors(image_id, path):
                 image_service.download(context, image_id,
                                        tpool.Proxy(image_file))
-            except IOError as e:
-                if e.errno == errno.ENOSPC:
-                    params = {'path': os.path.dirname(path),
-                              'image': image_id}
-                    reason = _("No space left in image_conversion_dir "
-                               "path (%(path)s) while fetching "
-                               "image %(image)s.") % params
-                    LOG.exception(reason)
-                    raise exception.ImageTooBig(image_id=image_id,
-                                                reason=reason)
-
-                reason = ("IOError: %(errno)s %(strerror)s" %
-                          {'errno': e.errno, 'strerror': e.strerror})
-                LOG.error(reason)
-                raise exception.ImageDownloadFailed(image_href=image_id,
-                                                    reason=reason)
 
     duration = timeutils.delta_seconds(start_time, timeutils.utcnow())
 
@@ -1034,7 +1064,9 @@ def fetch_to_volume_format(context: context.RequestContext,
     # large and cause disk full errors which would confuse users.
     # Unfortunately it seems that you can't pipe to 'qemu-img convert' because
     # it seeks. Maybe we can think of something for a future version.
-    with temporary_file(prefix='image_download_%s_' % image_id) as tmp:
+    with contextlib.ExitStack() as stack:
+        tmp = stack.enter_context(
+            temporary_file(prefix='image_download_%s_' % image_id))
         has_meta = False if not image_meta else True
         try:
             format_raw = True if image_meta['disk_format'] == 'raw' else False
@@ -1051,10 +1083,29 @@ def fetch_to_volume_format(context: context.RequestContext,
 
         tmp_images = TemporaryImages.for_image_service(image_service)
         tmp_image = tmp_images.get(context, image_id)
+        cache = download_cache.get_cache()
         if tmp_image:
             tmp = tmp_image
         else:
-            fetch(context, image_service, image_id, tmp, user_id, project_id)
+            cached_image = None
+            if (cache and image_meta.get('container_format') != 'compressed'
+                    and not is_xenserver_format(image_meta)):
+                # Compressed and XenServer images are changed in place, so
+                # they can't be used from the cache.
+                cached_image = stack.enter_context(cache.get(
+                    image_meta,
+                    lambda path: fetch(context, image_service, image_id,
+                                       path, user_id, project_id)))
+            if cached_image:
+                tmp = cached_image
+            elif _can_stream_image(image_meta, volume_format, dest):
+                if _stream_raw_image(context, image_service, image_id,
+                                     image_meta, dest, tmp, size,
+                                     disable_sparse):
+                    return
+            else:
+                fetch(context, image_service, image_id, tmp, user_id,
+                      project_id)
 
         # NOTE(ZhengMa): This is used to do image decompression on image
         # downloading with 'compressed' container_format. It is a
@@ -1131,6 +1182,190 @@ def fetch_to_volume_format(context: context.RequestContext,
                       disable_sparse=disable_sparse)
 
 
+class _FormatDetector(object):
+    """Detect the format of an image from the chunks of its beginning.
+
+    This is detect_file_format for streams: format is set to the matching
+    format once the inspectors of all the other formats are sure they don't
+    match, or to 'raw' if none of them match.
+    """
+
+    def __init__(self):
+        self.format: Optional[str] = None
+        self._inspectors = {name: inspector()
+                            for name, inspector
+                            in format_inspector.ALL_FORMATS.items()
+                            if name != 'raw'}
+
+    def eat_chunk(self, chunk: bytes) -> None:
+        for name, inspector in list(self._inspectors.items()):
+            try:
+                inspector.eat_chunk(chunk)
+            except format_inspector.ImageFormatError:
+                # No match, so stop considering this format
+                del self._inspectors[name]
+                continue
+            if inspector.format_match and inspector.complete:
+                self.format = name
+                return
+        if all(i.complete for i in self._inspectors.values()):
+            self.format = 'raw'
+
+    def finish(self) -> None:
+        """Settle the format once the whole image has been inspected."""
+        if self.format is None and not any(
+                i.format_match for i in self._inspectors.values()):
+            self.format = 'raw'
+
+
+def _can_stream_image(image_meta: dict, volume_format: str,
+                      dest: str) -> bool:
+    """Check if an image can be written to the volume as it's downloaded."""
+    return bool(CONF.image_stream_raw_to_volume and
+                volume_format == 'raw' and
+                image_meta.get('disk_format') == 'raw' and
+                image_meta.get('container_format') == 'bare' and
+                image_meta.get('size') and
+                # The I/O of cinder-volume itself can't be throttled
+                not isinstance(throttling.Throttle.get_default(),
+                               throttling.BlkioCgroup) and
+                (os.path.isfile(dest) or utils.is_blk_device(dest)))
+
+
+def _stream_raw_image(context: context.RequestContext,
+                      image_service: glance.GlanceImageService,
+                      image_id: str,
+                      image_meta: dict,
+                      dest: str,
+                      tmp: str,
+                      size: Optional[int],
+                      disable_sparse: bool) -> bool:
+    """Write a raw image to a volume while it's downloaded.
+
+    The beginning of the image is held until the format inspectors confirm
+    that the image is raw, so nothing is written to the volume otherwise. In
+    that case the image is downloaded to tmp instead, and False is returned
+    so that it's checked and converted as usual.
+    """
+    if size is not None:
+        check_virtual_size(image_meta['size'], size, image_id)
+
+    start_time = timeutils.utcnow()
+    chunks = iter(image_service.download(context, image_id))
+    detector = _FormatDetector()
+    head = []
+    head_size = 0
+    for chunk in chunks:
+        head.append(chunk)
+        head_size += len(chunk)
+        detector.eat_chunk(chunk)
+        if detector.format or head_size >= STREAM_DETECT_LIMIT:
+            break
+    else:
+        detector.finish()
+    chunks = itertools.chain(head, chunks)
+
+    if detector.format != 'raw':
+        LOG.debug('Image %(image)s is not streamed to the volume, its '
+                  'format is %(format)s.',
+                  {'image': image_id, 'format': detector.format or 'unknown'})
+        with open(tmp, 'wb') as image_file, \
+                _image_download_errors(image_id, tmp):
+            image_file = utils.tpool_wrap(image_file)
+            for chunk in chunks:
+                image_file.write(chunk)
+        return False
+
+    # Regular files read zeros where nothing is written, unlike devices
+    sparse = not disable_sparse and os.path.isfile(dest)
+    with contextlib.ExitStack() as stack:
+        if not os.access(dest, os.W_OK):
+            stack.enter_context(utils.temporary_chown(dest))
+        written = _write_stream(chunks, dest, sparse)
+
+    if written != image_meta['size']:
+        reason = (_('Downloaded %(written)s bytes instead of %(size)s.') %
+                  {'written': written, 'size': image_meta['size']})
+        raise exception.ImageDownloadFailed(image_href=image_id,
+                                            reason=reason)
+
+    duration = max(timeutils.delta_seconds(start_time, timeutils.utcnow()),
+                   1)
+    LOG.info('Image %(image)s of %(sz).2f MB streamed to %(dest)s at '
+             '%(mbps).2f MB/s',
+             {'image': image_id, 'sz': written / units.Mi, 'dest': dest,
+              'mbps': written / units.Mi / duration})
+    return True
+
+
+def _write_stream(chunks, dest: str, sparse: bool) -> int:
+    """Write chunks to dest in blocks, returning the number of bytes.
+
+    Up to STREAM_WRITE_DEPTH blocks are written while the next chunks are
+    read. All-zero blocks are skipped when sparse is True. A regular file
+    is emptied first, keeping its size, like qemu-img convert recreating
+    it would, so none of its previous data is left where blocks are
+    skipped or past the end of the image.
+    """
+    if monkey_patch.is_patched():
+        executor = futurist.GreenThreadPoolExecutor(STREAM_WRITE_DEPTH)
+    else:
+        executor = futurist.ThreadPoolExecutor(STREAM_WRITE_DEPTH)
+    writes: collections.deque = collections.deque()
+    offset = 0
+    try:
+        with open(dest, 'r+b', buffering=0) as f:
+            dest_stat = os.fstat(f.fileno())
+            if stat.S_ISREG(dest_stat.st_mode):
+                f.truncate(0)
+                f.truncate(dest_stat.st_size)
+            dest_file = utils.tpool_wrap(PositionalFile(f))
+
+            def write(data):
+                if sparse and data.count(0) == len(data):
+                    return
+                while len(writes) >= STREAM_WRITE_DEPTH:
+                    writes.popleft().result()
+                writes.append(executor.submit(dest_file.pwrite, data,
+                                              offset))
+
+            block = bytearray()
+            for chunk in chunks:
+                block += chunk
+                while len(block) >= STREAM_WRITE_SIZE:
+                    write(bytes(block[:STREAM_WRITE_SIZE]))
+                    del block[:STREAM_WRITE_SIZE]
+                    offset += STREAM_WRITE_SIZE
+            if block:
+                write(bytes(block))
+                offset += len(block)
+            while writes:
+                writes.popleft().result()
+            dest_file.fsync()
+    finally:
+        for future in writes:
+            future.cancel()
+        executor.shutdown(wait=True)
+    return offset
+
+
+class PositionalFile(object):
+    """Positional I/O on an open file, which can run in any thread."""
+
+    def __init__(self, dest_file):
+        self._fd = dest_file.fileno()
+
+    def pwrite(self, data: bytes, offset: int) -> None:
+        view = memoryview(data)
+        while view:
+            written = os.pwrite(self._fd, view, offset)
+            view = view[written:]
+            offset += written
+
+    def fsync(self) -> None:
+        os.fsync(self._fd)
+
+
 @contextlib.contextmanager
 def chown_if_needed(volume_path: str) -> Generator[None, None, None]:
     if os.access(volume_path, os.R_OK):
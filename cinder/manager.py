@@ -51,6 +51,7 @@ This module provides Manager, a base class for managers.
 
 """
 
+import copy
 from typing import Optional
 
 from eventlet import greenpool
@@ -71,6 +72,7 @@ from cinder import monkey_patch
 from cinder import objects
 from cinder import rpc
 from cinder.scheduler import rpcapi as scheduler_rpcapi
+from cinder.scheduler import sched_utils
 from cinder import utils
 
 CONF = cfg.CONF
@@ -205,6 +207,11 @@ class SchedulerDependentManager(ThreadPoolManager):
         **kwargs,
     ):
         self.last_capabilities = None
+        # When set, only the changes in the capabilities are sent to the
+        # schedulers, except for every this many reports.
+        self.full_capabilities_report_interval = 0
+        self._capabilities_generation = 0
+        self._published_capabilities: Optional[dict] = None
         self.service_name = service_name
         self.scheduler_rpcapi = scheduler_rpcapi.SchedulerAPI()
         super().__init__(host, cluster=cluster, *args, **kwargs)
@@ -217,12 +224,15 @@ class SchedulerDependentManager(ThreadPoolManager):
         """Pass data back to the scheduler at a periodic interval."""
         if self.last_capabilities:
             LOG.debug('Notifying Schedulers of capabilities ...')
+            generation, capabilities_delta = self._get_capabilities_delta()
             self.scheduler_rpcapi.update_service_capabilities(
                 context,
                 self.service_name,
                 self.host,
                 self.last_capabilities,
-                self.cluster)
+                self.cluster,
+                generation=generation,
+                capabilities_delta=capabilities_delta)
             try:
                 self.scheduler_rpcapi.notify_service_capabilities(
                     context,
@@ -238,6 +248,29 @@ class SchedulerDependentManager(ThreadPoolManager):
                        "during a live upgrade. Error: %(e)s")
                 LOG.warning(msg, {'host': self.host, 'e': e})
 
+    def _get_capabilities_delta(self) -> tuple:
+        """Number the capabilities report and get its changes.
+
+        Returns the generation of the report, and the changes since the
+        previously published report or None if the full report must be sent.
+        The first report is full, and then one every
+        full_capabilities_report_interval reports. Reports are not numbered if
+        full_capabilities_report_interval is not set.
+        """
+        if not self.full_capabilities_report_interval:
+            return None, None
+        assert self.last_capabilities is not None
+
+        self._capabilities_generation += 1
+        generation = self._capabilities_generation
+        capabilities_delta = None
+        if (self._published_capabilities is not None and
+                (generation - 1) % self.full_capabilities_report_interval):
+            capabilities_delta = sched_utils.get_capabilities_delta(
+                self._published_capabilities, self.last_capabilities)
+        self._published_capabilities = copy.deepcopy(self.last_capabilities)
+        return generation, capabilities_delta
+
     def reset(self):
         super(SchedulerDependentManager, self).reset()
         self.scheduler_rpcapi = scheduler_rpcapi.SchedulerAPI()
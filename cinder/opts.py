@@ -42,6 +42,7 @@ from cinder.backup.drivers import posix as cinder_backup_drivers_posix
 from cinder.backup.drivers import s3 as cinder_backup_drivers_s3
 from cinder.backup.drivers import swift as cinder_backup_drivers_swift
 from cinder.backup import manager as cinder_backup_manager
+from cinder.backup import status_monitor as cinder_backup_statusmonitor
 from cinder.cmd import backup as cinder_cmd_backup
 from cinder.cmd import volume as cinder_cmd_volume
 from cinder.common import config as cinder_common_config
@@ -50,6 +51,7 @@ from cinder.compute import nova as cinder_compute_nova
 from cinder import context as cinder_context
 from cinder import coordination as cinder_coordination
 from cinder.db import api as cinder_db_api
+from cinder.image import download_cache as cinder_image_downloadcache
 from cinder.image import glance as cinder_image_glance
 from cinder.image import image_utils as cinder_image_imageutils
 from cinder.keymgr import conf_key_mgr as cinder_keymgr_confkeymgr
@@ -248,6 +250,7 @@ def list_opts():
                 cinder_backup_drivers_s3.s3backup_service_opts,
                 cinder_backup_drivers_swift.swiftbackup_service_opts,
                 cinder_backup_manager.backup_manager_opts,
+                cinder_backup_statusmonitor.backup_status_opts,
                 cinder_cmd_backup.backup_cmd_opts,
                 [cinder_cmd_volume.cluster_opt],
                 cinder_common_config.api_opts,
@@ -261,6 +264,7 @@ def list_opts():
                 cinder_context.context_opts,
                 cinder_db_api.db_opts,
                 cinder_db_api.backup_opts,
+                cinder_image_downloadcache.download_cache_opts,
                 cinder_image_glance.image_opts,
                 cinder_image_glance.glance_core_properties_opts,
                 cinder_image_imageutils.image_opts,
@@ -281,6 +285,7 @@ def list_opts():
                 [cinder_volume_api.volume_host_opt],
                 [cinder_volume_api.volume_same_az_opt],
                 [cinder_volume_api.az_cache_time_opt],
+                [cinder_volume_api.volume_create_max_count_opt],
                 cinder_volume_driver.volume_opts,
                 cinder_volume_driver.iser_opts,
                 cinder_volume_driver.nvmeof_opts,
@@ -19,6 +19,7 @@ from cinder.policies import base
 
 
 GET_POOL_POLICY = "scheduler_extension:scheduler_stats:get_pools"
+GET_STAGE_STATS_POLICY = "scheduler_extension:scheduler_stats:get_stage_stats"
 
 pools_policies = [
     policy.DocumentedRuleDefault(
@@ -30,6 +31,16 @@ pools_policies = [
                 'method': 'GET',
                 'path': '/scheduler-stats/get_pools'
             }
+        ]),
+    policy.DocumentedRuleDefault(
+        name=GET_STAGE_STATS_POLICY,
+        check_str=base.RULE_ADMIN_API,
+        description="Show the latency statistics of the scheduling stages.",
+        operations=[
+            {
+                'method': 'GET',
+                'path': '/scheduler-stats/get_stage_stats'
+            }
         ])
 ]
 
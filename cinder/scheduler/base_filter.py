@@ -16,11 +16,15 @@
 """
 Filter support
 """
-from typing import Iterable
+import time
+from typing import Iterable, Optional
 
+import futurist
 from oslo_log import log as logging
 
+from cinder import monkey_patch
 from cinder.scheduler import base_handler
+from cinder.scheduler import stage_stats
 
 LOG = logging.getLogger(__name__)
 
@@ -49,6 +53,11 @@ class BaseFilter(object):
     # for each request rather than for each instance
     run_filter_once_per_request = False
 
+    # Set to true in a subclass if _filter_one can be run concurrently for
+    # different objects, so the handler can spread them over its workers.
+    # Only filters that don't override filter_all are run in parallel.
+    run_parallel = False
+
     def run_filter_for_index(self, index):
         """Return True if the filter needs to be run for n-th instances.
 
@@ -64,6 +73,28 @@ class BaseFilterHandler(base_handler.BaseHandler):
     This class should be subclassed where one needs to use filters.
     """
 
+    _executor: Optional[futurist.GreenThreadPoolExecutor |
+                        futurist.ThreadPoolExecutor] = None
+
+    def init_executor(self, max_workers: int) -> None:
+        """Run the filters that support it with up to max_workers workers."""
+        if monkey_patch.is_patched():
+            self._executor = futurist.GreenThreadPoolExecutor(max_workers)
+        else:
+            self._executor = futurist.ThreadPoolExecutor(max_workers)
+
+    def _runs_parallel(self, filter_obj, objs: list) -> bool:
+        return (self._executor is not None and filter_obj.run_parallel and
+                len(objs) > 1 and
+                type(filter_obj).filter_all is BaseFilter.filter_all)
+
+    def _filter_parallel(self, filter_obj, objs: list,
+                         filter_properties: dict) -> list:
+        """Filter the objects with the workers, keeping their order."""
+        passes = self._executor.map(
+            lambda obj: filter_obj._filter_one(obj, filter_properties), objs)
+        return [obj for obj, passed in zip(objs, passes) if passed]
+
     def _log_filtration(self, full_filter_results,
                         part_filter_results, filter_properties):
         # Log the filtration history
@@ -108,8 +139,17 @@ class BaseFilterHandler(base_handler.BaseHandler):
             filter_class = filter_cls()
 
             if filter_class.run_filter_for_index(index):
-                objs = filter_class.filter_all(list_objs, filter_properties)
+                start = time.monotonic()
+                if self._runs_parallel(filter_class, list_objs):
+                    objs = self._filter_parallel(filter_class, list_objs,
+                                                 filter_properties)
+                else:
+                    objs = filter_class.filter_all(list_objs,
+                                                   filter_properties)
                 if objs is None:
+                    stage_stats.STATS.record(stage_stats.FILTER, cls_name,
+                                             time.monotonic() - start,
+                                             removed=start_count)
                     LOG.info("Filter %s returned 0 hosts", cls_name)
                     full_filter_results.append((cls_name, None))
                     list_objs = None
@@ -117,14 +157,19 @@ class BaseFilterHandler(base_handler.BaseHandler):
 
                 list_objs = list(objs)
                 end_count = len(list_objs)
+                elapsed = time.monotonic() - start
+                stage_stats.STATS.record(stage_stats.FILTER, cls_name,
+                                         elapsed,
+                                         removed=start_count - end_count)
                 part_filter_results.append((cls_name, start_count, end_count))
                 remaining = [getattr(obj, "host", obj)
                              for obj in list_objs]
                 full_filter_results.append((cls_name, remaining))
 
                 LOG.debug("Filter %(cls_name)s returned "
-                          "%(obj_len)d host(s)",
-                          {'cls_name': cls_name, 'obj_len': len(list_objs)})
+                          "%(obj_len)d host(s) in %(elapsed).4fs",
+                          {'cls_name': cls_name, 'obj_len': len(list_objs),
+                           'elapsed': elapsed})
         if not list_objs:
             self._log_filtration(full_filter_results,
                                  part_filter_results, filter_properties)
@@ -18,11 +18,14 @@ Pluggable Weighing support
 """
 
 import abc
+import heapq
+import time
 from typing import Iterable, Optional
 
 from oslo_log import log as logging
 
 from cinder.scheduler import base_handler
+from cinder.scheduler import stage_stats
 
 
 LOG = logging.getLogger(__name__)
@@ -103,26 +106,45 @@ class BaseWeigher(object, metaclass=abc.ABCMeta):
         to calculate weights. Do not modify the weight of an object here,
         just return a list of weights.
         """
-        # Calculate the weights
-        weights = []
-        for obj in weighed_obj_list:
-            weight = self._weigh_object(obj.obj, weight_properties)
-
-            # Record the min and max values if they are None. If they anything
-            # but none we assume that the weigher has set them
-            if self.minval is None:
-                self.minval = weight
-            if self.maxval is None:
-                self.maxval = weight
-
-            if weight < self.minval:
-                self.minval = weight
-            elif weight > self.maxval:
-                self.maxval = weight
+        return self._weigh_bulk([obj.obj for obj in weighed_obj_list],
+                                weight_properties)
+
+    def weigh_all(self,
+                  obj_list: list,
+                  weight_properties: dict) -> list[float]:
+        """Weigh multiple unwrapped objects in bulk.
+
+        This is the entry point used by the weight handlers. Override it in a
+        subclass to compute the weights of all the objects at once, hoisting
+        any per request work out of the per object loop. Weighers that only
+        override weigh_objects keep working through it.
+        """
+        if type(self).weigh_objects is not BaseWeigher.weigh_objects:
+            return self.weigh_objects(
+                [WeighedObject(obj, 0.0) for obj in obj_list],
+                weight_properties)
+        return self._weigh_bulk(obj_list, weight_properties)
+
+    def _weigh_bulk(self, obj_list: list,
+                    weight_properties: dict) -> list[float]:
+        weights = [self._weigh_object(obj, weight_properties)
+                   for obj in obj_list]
+        self._update_bounds(weights)
+        return weights
 
-            weights.append(weight)
+    def _update_bounds(self, weights: list[float]) -> None:
+        """Record the min and max values of a list of weights.
 
-        return weights
+        Bounds that have already been set by the weigher are only widened.
+        """
+        if not weights:
+            return
+        low = min(weights)
+        high = max(weights)
+        if self.minval is None or low < self.minval:
+            self.minval = low
+        if self.maxval is None or high > self.maxval:
+            self.maxval = high
 
 
 class BaseWeightHandler(base_handler.BaseHandler):
@@ -130,31 +152,53 @@ class BaseWeightHandler(base_handler.BaseHandler):
 
     def get_weighed_objects(self,
                             weigher_classes: list,
-                            obj_list: list[WeighedObject],
-                            weighing_properties: dict) -> list[WeighedObject]:
-        """Return a sorted (descending), normalized list of WeighedObjects."""
+                            obj_list: Iterable,
+                            weighing_properties: dict,
+                            limit: Optional[int] = None
+                            ) -> list[WeighedObject]:
+        """Return a sorted (descending), normalized list of WeighedObjects.
+
+        The weights of all the objects are accumulated in a flat list and the
+        WeighedObjects are only built for the returned objects. If limit is
+        set, only the limit heaviest objects are returned, which avoids
+        sorting the whole list when the caller only needs the top of it.
+        """
 
+        obj_list = list(obj_list)
         if not obj_list:
             return []
 
-        weighed_objs = [self.object_class(obj, 0.0) for obj in obj_list]
+        totals = [0.0] * len(obj_list)
         for weigher_cls in weigher_classes:
+            start = time.monotonic()
             weigher = weigher_cls()
-            weights = weigher.weigh_objects(weighed_objs, weighing_properties)
+            weights = weigher.weigh_all(obj_list, weighing_properties)
 
             # Normalize the weights
             weights = normalize(weights,
                                 minval=weigher.minval,
                                 maxval=weigher.maxval)
 
-            for i, weight in enumerate(weights):
-                obj = weighed_objs[i]
-                obj.weight += weigher.weight_multiplier() * weight
+            multiplier = weigher.weight_multiplier()
+            totals = [total + multiplier * weight
+                      for total, weight in zip(totals, weights)]
+            elapsed = time.monotonic() - start
+            stage_stats.STATS.record(stage_stats.WEIGHER, weigher_cls.__name__,
+                                     elapsed)
 
-            LOG.debug("Weigher %(cls_name)s returned, "
+            LOG.debug("Weigher %(cls_name)s returned in %(elapsed).4fs, "
                       "weigher value is {max: %(maxval)s, min: %(minval)s}",
                       {'cls_name': weigher_cls.__name__,
+                       'elapsed': elapsed,
                        'maxval': weigher.maxval,
                        'minval': weigher.minval})
 
-        return sorted(weighed_objs, key=lambda x: x.weight, reverse=True)
+        # Both heapq.nlargest and sorted are stable, so objects with the same
+        # weight keep their original order.
+        if limit is not None and limit < len(obj_list):
+            indexes = heapq.nlargest(limit, range(len(obj_list)),
+                                     key=totals.__getitem__)
+        else:
+            indexes = sorted(range(len(obj_list)), key=totals.__getitem__,
+                             reverse=True)
+        return [self.object_class(obj_list[i], totals[i]) for i in indexes]
@@ -0,0 +1,183 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Capacity consumption ledger shared by the schedulers.
+
+Every scheduler consumes capacity from its own in-memory copy of the backend
+states until the next capability report arrives. When several schedulers are
+running they don't see each other's consumption, so they can oversubscribe
+the same pool.
+
+The ledger records the capacity reserved by each scheduler, keyed by the
+pool's backend id, so the other schedulers can take it into account. A
+scheduler drops its own reservations for a backend once it receives a
+capability report newer than them, as the report already includes them.
+"""
+
+import contextlib
+from datetime import datetime
+import threading
+from typing import Iterator, Optional
+import uuid
+
+from oslo_log import log as logging
+from oslo_utils import timeutils
+from tooz import coordination as tooz_coordination
+
+from cinder import coordination
+from cinder.volume import volume_utils
+
+
+LOG = logging.getLogger(__name__)
+
+GROUP_NAME = b'cinder-scheduler-capacity-ledger'
+
+
+class CapacityLedger(object):
+    """In-process capacity ledger.
+
+    The reservations of all the members are kept in the ``members`` dict,
+    which maps each member to its reservations. Ledgers created with the same
+    dict see each other's reservations, which is enough for a single process
+    and for tests. CoordinationCapacityLedger shares them across processes.
+    """
+
+    def __init__(self, member_id: Optional[str] = None,
+                 members: Optional[dict] = None):
+        self.member_id = member_id or str(uuid.uuid4())
+        self._members = {} if members is None else members
+        # {backend_id: [[size, timestamp string], ...]}
+        self._reservations: dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def lock(self, backend_id: str) -> Iterator[None]:
+        """Serialize the reservations made on a backend."""
+        with self._lock:
+            yield
+
+    def reserve(self, backend_id: str, size: float) -> None:
+        """Record that size GB have been consumed from a backend.
+
+        A negative size gives capacity back.
+        """
+        timestamp = timeutils.utcnow().strftime(timeutils.PERFECT_TIME_FORMAT)
+        self._reservations.setdefault(backend_id, []).append([size,
+                                                              timestamp])
+        self._publish()
+
+    def reconcile(self, backend: str, timestamp: datetime) -> None:
+        """Drop our reservations included in a backend capability report.
+
+        :param backend: The host@backend or cluster@backend that sent the
+                        report; it covers all its pools.
+        :param timestamp: The time of the report.
+        """
+        changed = False
+        for backend_id in list(self._reservations):
+            if volume_utils.extract_host(backend_id) != backend:
+                continue
+            reservations = [r for r in self._reservations[backend_id]
+                            if self._parse_time(r[1]) > timestamp]
+            if len(reservations) != len(self._reservations[backend_id]):
+                changed = True
+            if reservations:
+                self._reservations[backend_id] = reservations
+            else:
+                del self._reservations[backend_id]
+        if changed:
+            self._publish()
+
+    def get_foreign_reservations(self) -> dict[str, list[tuple]]:
+        """Return the reservations made by the other members.
+
+        :returns: dict mapping backend ids to lists of (size, timestamp)
+        """
+        result: dict[str, list[tuple]] = {}
+        for member_id, reservations in self._get_members().items():
+            if member_id == self.member_id:
+                continue
+            for backend_id, entries in reservations.items():
+                result.setdefault(backend_id, []).extend(
+                    (size, self._parse_time(timestamp))
+                    for size, timestamp in entries)
+        return result
+
+    @staticmethod
+    def _parse_time(timestamp: str) -> datetime:
+        return datetime.strptime(timestamp, timeutils.PERFECT_TIME_FORMAT)
+
+    def _publish(self) -> None:
+        self._members[self.member_id] = {
+            backend_id: list(entries)
+            for backend_id, entries in self._reservations.items()}
+
+    def _get_members(self) -> dict:
+        return self._members
+
+
+class CoordinationCapacityLedger(CapacityLedger):
+    """Capacity ledger shared through the coordination backend.
+
+    Each scheduler joins a tooz group and publishes its reservations as its
+    member capabilities, so only the owner ever writes them. Reservations on
+    a backend are serialized with a distributed lock.
+    """
+
+    def __init__(self, coordinator=coordination.COORDINATOR):
+        self.coordinator = coordinator
+        super(CoordinationCapacityLedger, self).__init__(
+            member_id=coordinator.prefix + coordinator.agent_id)
+        self._joined = False
+
+    def _join(self):
+        if self._joined:
+            return self.coordinator.coordinator
+        self.coordinator.start()
+        tooz_coordinator = self.coordinator.coordinator
+        try:
+            tooz_coordinator.create_group(GROUP_NAME).get()
+        except tooz_coordination.GroupAlreadyExist:
+            pass
+        try:
+            tooz_coordinator.join_group(GROUP_NAME).get()
+        except tooz_coordination.MemberAlreadyExist:
+            pass
+        self._joined = True
+        return tooz_coordinator
+
+    @contextlib.contextmanager
+    def lock(self, backend_id: str) -> Iterator[None]:
+        self._join()
+        with self.coordinator.get_lock('scheduler-ledger-' + backend_id):
+            yield
+
+    def _publish(self) -> None:
+        tooz_coordinator = self._join()
+        tooz_coordinator.update_capabilities(
+            GROUP_NAME, dict(self._reservations)).get()
+
+    def _get_members(self) -> dict:
+        tooz_coordinator = self._join()
+        members = tooz_coordinator.get_members(GROUP_NAME).get()
+        capabilities = {
+            member: tooz_coordinator.get_member_capabilities(GROUP_NAME,
+                                                             member)
+            for member in members}
+        result = {}
+        for member, request in capabilities.items():
+            try:
+                result[member.decode('ascii')] = request.get() or {}
+            except tooz_coordination.MemberNotJoined:
+                # The member has left the group since we listed them.
+                continue
+        return result
@@ -102,13 +102,12 @@ class Scheduler(object):
         return self.host_manager.first_receive_capabilities()
 
     def update_service_capabilities(self, service_name, host, capabilities,
-                                    cluster_name, timestamp):
+                                    cluster_name, timestamp, generation=None,
+                                    capabilities_delta=None):
         """Process a capability update from a service node."""
-        self.host_manager.update_service_capabilities(service_name,
-                                                      host,
-                                                      capabilities,
-                                                      cluster_name,
-                                                      timestamp)
+        self.host_manager.update_service_capabilities(
+            service_name, host, capabilities, cluster_name, timestamp,
+            generation=generation, capabilities_delta=capabilities_delta)
 
     def notify_service_capabilities(self, service_name, backend,
                                     capabilities, timestamp):
@@ -118,6 +117,10 @@ class Scheduler(object):
                                                       capabilities,
                                                       timestamp)
 
+    def refresh_backend_states(self, context):
+        """Reload the active volume services from the database."""
+        self.host_manager.refresh_backend_state_map(context)
+
     def host_passes_filters(self, context, backend, request_spec,
                             filter_properties):
         """Check if the specified backend passes the filters."""
@@ -142,6 +145,25 @@ class Scheduler(object):
         """Must override schedule method for scheduler to work."""
         raise NotImplementedError(_("Must implement schedule_create_volume"))
 
+    def schedule_create_volumes(self, context, request_spec_list,
+                                filter_properties_list):
+        """Schedule a batch of volume creations.
+
+        Returns a list with one entry per request, None if the volume was sent
+        to a backend or the exception that prevented scheduling it.
+        """
+        results = []
+        for request_spec, filter_properties in zip(request_spec_list,
+                                                   filter_properties_list):
+            try:
+                self.schedule_create_volume(context, request_spec,
+                                            filter_properties)
+            except Exception as e:
+                results.append(e)
+            else:
+                results.append(None)
+        return results
+
     def schedule_create_group(self, context, group,
                               group_spec,
                               request_spec_list,
@@ -13,9 +13,11 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import functools
 import operator
 import re
 import sys
+import threading
 from typing import Callable
 
 import pyparsing
@@ -38,21 +40,17 @@ def _operatorOperands(tokenList):
 class EvalConstant(object):
     def __init__(self, toks):
         self.value = toks[0]
+        # Variable references are resolved at evaluation time, literals are
+        # converted once here so that compiled expressions can be reused.
+        self.variable = None
+        if (isinstance(self.value, str) and
+                re.match(r"^[a-zA-Z_]+\.[a-zA-Z_]+$", self.value)):
+            self.variable = tuple(self.value.split('.'))
+        else:
+            self.value = self._convert(self.value)
 
-    def eval(self):
-        result = self.value
-        if (isinstance(result, str) and
-                re.match(r"^[a-zA-Z_]+\.[a-zA-Z_]+$", result)):
-            (which_dict, entry) = result.split('.')
-            try:
-                result = _vars[which_dict][entry]
-            except KeyError:
-                raise exception.EvaluatorParseException(
-                    _("KeyError evaluating string"))
-            except TypeError:
-                raise exception.EvaluatorParseException(
-                    _("TypeError evaluating string"))
-
+    @staticmethod
+    def _convert(result):
         try:
             result = int(result)
         except ValueError:
@@ -64,6 +62,22 @@ class EvalConstant(object):
 
         return result
 
+    def eval(self, variables):
+        if self.variable is None:
+            return self.value
+
+        (which_dict, entry) = self.variable
+        try:
+            result = variables[which_dict][entry]
+        except KeyError:
+            raise exception.EvaluatorParseException(
+                _("KeyError evaluating string"))
+        except TypeError:
+            raise exception.EvaluatorParseException(
+                _("TypeError evaluating string"))
+
+        return self._convert(result)
+
 
 class EvalSignOp(object):
     operations = {
@@ -74,21 +88,21 @@ class EvalSignOp(object):
     def __init__(self, toks):
         self.sign, self.value = toks[0]
 
-    def eval(self):
-        return self.operations[self.sign] * self.value.eval()
+    def eval(self, variables):
+        return self.operations[self.sign] * self.value.eval(variables)
 
 
 class EvalAddOp(object):
     def __init__(self, toks):
         self.value = toks[0]
 
-    def eval(self):
-        sum = self.value[0].eval()
+    def eval(self, variables):
+        sum = self.value[0].eval(variables)
         for op, val in _operatorOperands(self.value[1:]):
             if op == '+':
-                sum += val.eval()
+                sum += val.eval(variables)
             elif op == '-':
-                sum -= val.eval()
+                sum -= val.eval(variables)
         return sum
 
 
@@ -96,14 +110,14 @@ class EvalMultOp(object):
     def __init__(self, toks):
         self.value = toks[0]
 
-    def eval(self):
-        prod = self.value[0].eval()
+    def eval(self, variables):
+        prod = self.value[0].eval(variables)
         for op, val in _operatorOperands(self.value[1:]):
             try:
                 if op == '*':
-                    prod *= val.eval()
+                    prod *= val.eval(variables)
                 elif op == '/':
-                    prod /= float(val.eval())
+                    prod /= float(val.eval(variables))
             except ZeroDivisionError as e:
                 raise exception.EvaluatorParseException(
                     _("ZeroDivisionError: %s") % e)
@@ -114,10 +128,10 @@ class EvalPowerOp(object):
     def __init__(self, toks):
         self.value = toks[0]
 
-    def eval(self):
-        prod = self.value[0].eval()
+    def eval(self, variables):
+        prod = self.value[0].eval(variables)
         for op, val in _operatorOperands(self.value[1:]):
-            prod = pow(prod, val.eval())
+            prod = pow(prod, val.eval(variables))
         return prod
 
 
@@ -125,8 +139,8 @@ class EvalNegateOp(object):
     def __init__(self, toks):
         self.negation, self.value = toks[0]
 
-    def eval(self):
-        return not self.value.eval()
+    def eval(self, variables):
+        return not self.value.eval(variables)
 
 
 class EvalComparisonOp(object):
@@ -143,11 +157,11 @@ class EvalComparisonOp(object):
     def __init__(self, toks):
         self.value = toks[0]
 
-    def eval(self):
-        val1 = self.value[0].eval()
+    def eval(self, variables):
+        val1 = self.value[0].eval(variables)
         for op, val in _operatorOperands(self.value[1:]):
             fn = self.operations[op]
-            val2 = val.eval()
+            val2 = val.eval(variables)
             if not fn(val1, val2):
                 break
             val1 = val2
@@ -160,12 +174,12 @@ class EvalTernaryOp(object):
     def __init__(self, toks):
         self.value = toks[0]
 
-    def eval(self):
-        condition = self.value[0].eval()
+    def eval(self, variables):
+        condition = self.value[0].eval(variables)
         if condition:
-            return self.value[2].eval()
+            return self.value[2].eval(variables)
         else:
-            return self.value[4].eval()
+            return self.value[4].eval(variables)
 
 
 class EvalFunction(object):
@@ -178,8 +192,8 @@ class EvalFunction(object):
     def __init__(self, toks):
         self.func, self.value = toks[0]
 
-    def eval(self):
-        args = self.value.eval()
+    def eval(self, variables):
+        args = self.value.eval(variables)
         if type(args) is list:
             return self.functions[self.func](*args)
         else:
@@ -190,9 +204,9 @@ class EvalCommaSeperator(object):
     def __init__(self, toks):
         self.value = toks[0]
 
-    def eval(self):
-        val1 = self.value[0].eval()
-        val2 = self.value[2].eval()
+    def eval(self, variables):
+        val1 = self.value[0].eval(variables)
+        val2 = self.value[2].eval(variables)
         if type(val2) is list:
             val_list = []
             val_list.append(val1)
@@ -207,9 +221,9 @@ class EvalBoolAndOp(object):
     def __init__(self, toks):
         self.value = toks[0]
 
-    def eval(self):
-        left = self.value[0].eval()
-        right = self.value[2].eval()
+    def eval(self, variables):
+        left = self.value[0].eval(variables)
+        right = self.value[2].eval(variables)
         return left and right
 
 
@@ -217,14 +231,19 @@ class EvalBoolOrOp(object):
     def __init__(self, toks):
         self.value = toks[0]
 
-    def eval(self):
-        left = self.value[0].eval()
-        right = self.value[2].eval()
+    def eval(self, variables):
+        left = self.value[0].eval(variables)
+        right = self.value[2].eval(variables)
         return left or right
 
 
 _parser = None
-_vars: dict = {}
+_parser_lock = threading.Lock()
+
+# Number of distinct compiled expressions kept around.  Backends usually
+# report a handful of distinct filter and goodness functions, so this
+# comfortably holds every expression in use by a deployment.
+_COMPILED_CACHE_SIZE = 512
 
 
 def _def_parser():
@@ -274,6 +293,35 @@ def _def_parser():
     return expr
 
 
+@functools.lru_cache(maxsize=_COMPILED_CACHE_SIZE)
+def compile_expression(expression):
+    """Compiles an expression into a reusable evaluable tree.
+
+    The returned object exposes ``eval(variables)`` where ``variables`` is a
+    dictionary of the dictionaries that can be referenced by the expression.
+    Compiled expressions hold no evaluation state, so they can be shared and
+    evaluated concurrently.  Results are cached per expression text.
+    """
+    global _parser
+    with _parser_lock:
+        if _parser is None:
+            _parser = _def_parser()
+
+        # Some reasonable formulas break with the default recursion limit of
+        # 1000.  Raise it here and reset it afterward.
+        orig_recursion_limit = sys.getrecursionlimit()
+        if orig_recursion_limit < 3000:
+            sys.setrecursionlimit(3000)
+
+        try:
+            return _parser.parse_string(expression, parseAll=True)[0]
+        except pyparsing.ParseException as e:
+            raise exception.EvaluatorParseException(
+                _("ParseException: %s") % e)
+        finally:
+            sys.setrecursionlimit(orig_recursion_limit)
+
+
 def evaluate(expression, **kwargs):
     """Evaluates an expression.
 
@@ -283,25 +331,4 @@ def evaluate(expression, **kwargs):
     Supports both integer and floating point values, and automatic
     promotion where necessary.
     """
-    global _parser
-    if _parser is None:
-        _parser = _def_parser()
-
-    global _vars
-    _vars = kwargs
-
-    # Some reasonable formulas break with the default recursion limit of
-    # 1000.  Raise it here and reset it afterward.
-    orig_recursion_limit = sys.getrecursionlimit()
-    if orig_recursion_limit < 3000:
-        sys.setrecursionlimit(3000)
-
-    try:
-        result = _parser.parse_string(expression, parseAll=True)[0]
-    except pyparsing.ParseException as e:
-        raise exception.EvaluatorParseException(
-            _("ParseException: %s") % e)
-    finally:
-        sys.setrecursionlimit(orig_recursion_limit)
-
-    return result.eval()
+    return compile_expression(expression).eval(kwargs)
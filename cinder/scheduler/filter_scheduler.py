@@ -33,6 +33,7 @@ from cinder import objects
 from cinder.scheduler import driver
 from cinder.scheduler.host_manager import BackendState
 from cinder.scheduler import scheduler_options
+from cinder.scheduler import stage_stats
 from cinder.scheduler.weights import WeighedHost
 from cinder.volume import volume_utils
 
@@ -89,7 +90,8 @@ class FilterScheduler(driver.Scheduler):
                                                        backend.host,
                                                        backend.cluster_name)
 
-        self.volume_rpcapi.create_group(context, updated_group)
+        with stage_stats.STATS.timer(stage_stats.RPC, 'create_group'):
+            self.volume_rpcapi.create_group(context, updated_group)
 
     def schedule_create_volume(self,
                                context: context.RequestContext,
@@ -101,8 +103,97 @@ class FilterScheduler(driver.Scheduler):
             raise exception.NoValidBackend(reason=_("No weighed backends "
                                                     "available"))
 
-        backend = backend.obj
+        self._create_volume_on_backend(context, request_spec,
+                                       filter_properties, backend.obj)
+
+    def schedule_create_volumes(self,
+                                context: context.RequestContext,
+                                request_spec_list: list,
+                                filter_properties_list: list) -> list:
+        """Schedule a batch of volume creations.
+
+        Requests that share the same volume type, availability zone and size
+        are filtered once, and their backends are then chosen greedily while
+        consuming the capacity of the chosen pools in memory.
+
+        Returns a list with one entry per request, None if the volume was sent
+        to a backend or the exception that prevented scheduling it.
+        """
+        results: list[Optional[Exception]] = [None] * len(request_spec_list)
+
+        batches: dict[tuple, list[int]] = {}
+        for index, request_spec in enumerate(request_spec_list):
+            vol = request_spec['volume_properties']
+            key = (vol['size'], vol.get('availability_zone'),
+                   vol.get('volume_type_id'))
+            batches.setdefault(key, []).append(index)
+
+        for indexes in batches.values():
+            self._schedule_create_volume_batch(
+                context,
+                [request_spec_list[i] for i in indexes],
+                [filter_properties_list[i] for i in indexes],
+                indexes,
+                results)
+        return results
+
+    def _schedule_create_volume_batch(self,
+                                      context: context.RequestContext,
+                                      request_spec_list: list,
+                                      filter_properties_list: list,
+                                      indexes: list[int],
+                                      results: list) -> None:
+        # All requests in the batch are equivalent for the filters, so the
+        # first one is used to find the candidates for all of them.
+        batch_properties = dict(filter_properties_list[0])
+        try:
+            weighed_backends = self._get_weighted_candidates(
+                context, request_spec_list[0], batch_properties)
+        except Exception as e:
+            for index in indexes:
+                results[index] = e
+            return
+
+        backends = [weighed.obj for weighed in weighed_backends]
+        for index, request_spec, filter_properties in zip(
+                indexes, request_spec_list, filter_properties_list):
+            try:
+                self._prepare_filter_properties(context, request_spec,
+                                                filter_properties)
+                if not backends:
+                    LOG.warning('No weighed backend found for volume '
+                                'with properties: %s',
+                                filter_properties['request_spec'].get(
+                                    'volume_type'))
+                    raise exception.NoValidBackend(
+                        reason=_("No weighed backends available"))
+
+                # Weights depend on the capacity consumed by the previous
+                # requests of the batch, but filtering results don't.
+                if index != indexes[0]:
+                    weighed_backends = self.host_manager.get_weighed_backends(
+                        backends, batch_properties, limit=1)
+                backend = self._choose_top_backend(weighed_backends,
+                                                   request_spec).obj
+
+                # Stop offering the backend once it can't take more volumes.
+                if not self.host_manager.get_filtered_backends(
+                        [backend], batch_properties):
+                    backends.remove(backend)
+
+                self._create_volume_on_backend(context, request_spec,
+                                               filter_properties, backend)
+            except Exception as e:
+                results[index] = e
+
+    def _create_volume_on_backend(self,
+                                  context: context.RequestContext,
+                                  request_spec: dict,
+                                  filter_properties: dict,
+                                  backend: BackendState) -> None:
         volume_id = request_spec['volume_id']
+        # The service is set along with the capabilities of the backend
+        assert backend.service is not None
 
         updated_volume = driver.volume_update_db(
             context, volume_id,
@@ -116,9 +207,10 @@ class FilterScheduler(driver.Scheduler):
         # context is not serializable
         filter_properties.pop('context', None)
 
-        self.volume_rpcapi.create_volume(context, updated_volume, request_spec,
-                                         filter_properties,
-                                         allow_reschedule=True)
+        with stage_stats.STATS.timer(stage_stats.RPC, 'create_volume'):
+            self.volume_rpcapi.create_volume(context, updated_volume,
+                                             request_spec, filter_properties,
+                                             allow_reschedule=True)
 
     def backend_passes_filters(self,
                                context: context.RequestContext,
@@ -305,33 +397,9 @@ class FilterScheduler(driver.Scheduler):
         """
         elevated = context.elevated()
 
-        # Since Cinder is using mixed filters from Oslo and it's own, which
-        # takes 'resource_XX' and 'volume_XX' as input respectively, copying
-        # 'volume_XX' to 'resource_XX' will make both filters happy.
-        volume_type = request_spec.get("volume_type")
-        # When creating snapshots, the value of volume_type is None here
-        # which causes issues in filters (Eg: Bug #1856126).
-        # To prevent that, we set it as an empty dictionary here.
-        if volume_type is None:
-            volume_type = {}
-        resource_type = volume_type
-
-        config_options = self._get_configuration_options()
-
         if filter_properties is None:
             filter_properties = {}
-        self._populate_retry(filter_properties,
-                             request_spec)
-
-        request_spec_dict = jsonutils.to_primitive(request_spec)
-
-        filter_properties.update({'context': context,
-                                  'request_spec': request_spec_dict,
-                                  'config_options': config_options,
-                                  'volume_type': volume_type,
-                                  'resource_type': resource_type})
-
-        self.populate_filter_properties(request_spec,
+        self._prepare_filter_properties(context, request_spec,
                                         filter_properties)
 
         # Revert volume consumed capacity if it's a rescheduled request
@@ -361,6 +429,38 @@ class FilterScheduler(driver.Scheduler):
             backends, filter_properties)
         return weighed_backends
 
+    def _prepare_filter_properties(self,
+                                   context: context.RequestContext,
+                                   request_spec: dict,
+                                   filter_properties: dict) -> None:
+        """Populate the filter properties used to schedule a request."""
+        # Since Cinder is using mixed filters from Oslo and it's own, which
+        # takes 'resource_XX' and 'volume_XX' as input respectively, copying
+        # 'volume_XX' to 'resource_XX' will make both filters happy.
+        volume_type = request_spec.get("volume_type")
+        # When creating snapshots, the value of volume_type is None here
+        # which causes issues in filters (Eg: Bug #1856126).
+        # To prevent that, we set it as an empty dictionary here.
+        if volume_type is None:
+            volume_type = {}
+        resource_type = volume_type
+
+        config_options = self._get_configuration_options()
+
+        self._populate_retry(filter_properties,
+                             request_spec)
+
+        request_spec_dict = jsonutils.to_primitive(request_spec)
+
+        filter_properties.update({'context': context,
+                                  'request_spec': request_spec_dict,
+                                  'config_options': config_options,
+                                  'volume_type': volume_type,
+                                  'resource_type': resource_type})
+
+        self.populate_filter_properties(request_spec,
+                                        filter_properties)
+
     def _get_weighted_candidates_generic_group(
             self, context: context.RequestContext,
             group_spec: dict, request_spec_list: list[dict],
@@ -592,7 +692,8 @@ class FilterScheduler(driver.Scheduler):
         backend_state = top_backend.obj
         LOG.debug("Choosing %s", backend_state.backend_id)
         volume_properties = request_spec['volume_properties']
-        backend_state.consume_from_volume(volume_properties)
+        self.host_manager.consume_from_volume(backend_state,
+                                              volume_properties)
         return top_backend
 
     def _choose_top_backend_generic_group(
@@ -20,17 +20,42 @@ from cinder.scheduler import filters
 from cinder.volume import api as volume
 
 
+def _get_host_keys(host):
+    """Return the values of backend_state.host that match a volume's host.
+
+    These are the values that match the host when filtering volumes by host
+    in the DB: the host itself, its backend, and its host name.
+    """
+    return {host, host.partition('#')[0], host.partition('@')[0]}
+
+
 class AffinityFilter(filters.BaseBackendFilter):
     def __init__(self):
         self.volume_api = volume.API()
-
-    def _get_volumes(self, context, affinity_uuids, backend_state):
-        filters = {'id': affinity_uuids, 'deleted': False}
+        # Filters are instantiated for each request, so the locations of the
+        # affinity volumes are only loaded once for all the backends.
+        self._affinity_locations = None
+
+    def _get_affinity_locations(self, context, affinity_uuids):
+        """Return the hosts and clusters where the volumes are located."""
+        if self._affinity_locations is None:
+            filters = {'id': affinity_uuids, 'deleted': False}
+            hosts = set()
+            clusters = set()
+            for vol in self.volume_api.get_all(context, filters=filters):
+                if vol.host:
+                    hosts.update(_get_host_keys(vol.host))
+                if vol.cluster_name:
+                    clusters.update(_get_host_keys(vol.cluster_name))
+            self._affinity_locations = (hosts, clusters)
+        return self._affinity_locations
+
+    def _has_volumes(self, context, affinity_uuids, backend_state):
+        hosts, clusters = self._get_affinity_locations(context,
+                                                       affinity_uuids)
         if backend_state.cluster_name:
-            filters['cluster_name'] = backend_state.cluster_name
-        else:
-            filters['host'] = backend_state.host
-        return self.volume_api.get_all(context, filters=filters)
+            return backend_state.cluster_name in clusters
+        return backend_state.host in hosts
 
 
 class DifferentBackendFilter(AffinityFilter):
@@ -61,7 +86,7 @@ class DifferentBackendFilter(AffinityFilter):
             return False
 
         if affinity_uuids:
-            return not self._get_volumes(context, affinity_uuids,
+            return not self._has_volumes(context, affinity_uuids,
                                          backend_state)
         # With no different_host key
         return True
@@ -95,7 +120,7 @@ class SameBackendFilter(AffinityFilter):
             return False
 
         if affinity_uuids:
-            return self._get_volumes(context, affinity_uuids, backend_state)
+            return self._has_volumes(context, affinity_uuids, backend_state)
 
         # With no same_host key
         return True
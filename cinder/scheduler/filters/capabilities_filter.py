@@ -13,6 +13,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import functools
+
 from oslo_log import log as logging
 
 from cinder.objects.fields import VolumeAttachStatus
@@ -21,10 +23,53 @@ from cinder.scheduler.filters import extra_specs_ops
 
 LOG = logging.getLogger(__name__)
 
+_COMPILED_CACHE_SIZE = 256
+
+
+@functools.lru_cache(maxsize=_COMPILED_CACHE_SIZE)
+def _compile_extra_specs(extra_specs_items: tuple) -> tuple:
+    """Compile the extra specs of a resource type for the filter.
+
+    Returns a tuple with the key, requirement, capability path and match
+    function of every spec that refers to capabilities. Results are cached
+    by the extra specs themselves, so changes to a type's extra specs are
+    always picked up.
+    """
+    compiled = []
+    for key, req in extra_specs_items:
+        # Either not scoped format, or in capabilities scope
+        scope = key.split(':')
+
+        # Ignore scoped (such as vendor-specific) capabilities
+        if len(scope) > 1 and scope[0] != "capabilities":
+            continue
+        # Strip off prefix if spec started with 'capabilities:'
+        elif scope[0] == "capabilities":
+            del scope[0]
+
+        compiled.append((key, req, tuple(scope),
+                         extra_specs_ops.compile_match(req)))
+    return tuple(compiled)
+
 
 class CapabilitiesFilter(filters.BaseBackendFilter):
     """BackendFilter to work with resource (instance & volume) type records."""
 
+    run_parallel = True
+
+    def __init__(self):
+        super(CapabilitiesFilter, self).__init__()
+        # All the backends of a request share the same extra specs dict, so
+        # they are only looked up in the cache once per request.
+        self._compiled_specs: tuple = (None, ())
+
+    def _get_compiled_specs(self, extra_specs: dict) -> tuple:
+        specs, compiled = self._compiled_specs
+        if specs is not extra_specs:
+            compiled = _compile_extra_specs(tuple(extra_specs.items()))
+            self._compiled_specs = (extra_specs, compiled)
+        return compiled
+
     def _satisfies_extra_specs(self, capabilities, filter_properties):
         """Check if capabilities satisfy resource type requirements.
 
@@ -53,25 +98,14 @@ class CapabilitiesFilter(filters.BaseBackendFilter):
         if not extra_specs:
             return True
 
-        for key, req in extra_specs.items():
-
-            # Either not scoped format, or in capabilities scope
-            scope = key.split(':')
-
-            # Ignore scoped (such as vendor-specific) capabilities
-            if len(scope) > 1 and scope[0] != "capabilities":
-                continue
-            # Strip off prefix if spec started with 'capabilities:'
-            elif scope[0] == "capabilities":
-                del scope[0]
-
+        for key, req, scope, match in self._get_compiled_specs(extra_specs):
             cap = capabilities
-            for index in range(len(scope)):
+            for name in scope:
                 try:
-                    cap = cap[scope[index]]
+                    cap = cap[name]
                 except (TypeError, KeyError):
                     LOG.debug("Backend doesn't provide capability '%(cap)s' ",
-                              {'cap': scope[index]})
+                              {'cap': name})
                     return False
 
             # Make all capability values a list so we can handle lists
@@ -79,7 +113,7 @@ class CapabilitiesFilter(filters.BaseBackendFilter):
 
             # Loop through capability values looking for any match
             for cap_value in cap_list:
-                if extra_specs_ops.match(cap_value, req):
+                if match(cap_value):
                     break
             else:
                 # Nothing matched, so bail out
@@ -29,6 +29,9 @@ class DriverFilter(filters.BaseBackendFilter):
     and metrics.
     """
 
+    # Compiled filter functions are safe to evaluate concurrently
+    run_parallel = True
+
     def backend_passes(self, backend_state, filter_properties):
         """Determines if a backend has a passing filter_function or not."""
         stats = self._generate_stats(backend_state, filter_properties)
@@ -13,7 +13,9 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import functools
 import operator
+from typing import Any, Callable
 
 from oslo_utils import strutils
 
@@ -22,14 +24,13 @@ from oslo_utils import strutils
 # 2. Note that <or> is handled in a different way below.
 # 3. If the first word in the extra_specs is not one of the operators,
 #   it is ignored.
-_op_methods = {'=': lambda x, y: float(x) >= float(y),
+_op_methods = {'=': lambda x, y: float(x) >= y,
                '<in>': lambda x, y: y in x,
-               '<is>': lambda x, y: (strutils.bool_from_string(x) is
-                                     strutils.bool_from_string(y)),
-               '==': lambda x, y: float(x) == float(y),
-               '!=': lambda x, y: float(x) != float(y),
-               '>=': lambda x, y: float(x) >= float(y),
-               '<=': lambda x, y: float(x) <= float(y),
+               '<is>': lambda x, y: strutils.bool_from_string(x) is y,
+               '==': lambda x, y: float(x) == y,
+               '!=': lambda x, y: float(x) != y,
+               '>=': lambda x, y: float(x) >= y,
+               '<=': lambda x, y: float(x) <= y,
                's==': operator.eq,
                's!=': operator.ne,
                's<': operator.lt,
@@ -37,41 +38,57 @@ _op_methods = {'=': lambda x, y: float(x) >= float(y),
                's>': operator.gt,
                's>=': operator.ge}
 
+# Conversion of the operand of the operations, done once when compiling
+_op_operands = {'=': float,
+                '<is>': strutils.bool_from_string,
+                '==': float,
+                '!=': float,
+                '>=': float,
+                '<=': float}
 
-def match(value, req):
+_COMPILED_CACHE_SIZE = 1024
+
+
+@functools.lru_cache(maxsize=_COMPILED_CACHE_SIZE)
+def compile_match(req) -> Callable[[Any], bool]:
+    """Return a function that checks a value against a requirement.
+
+    Calling the returned function with a value is equivalent to calling
+    match(value, req), but the requirement is only parsed once.
+    """
     if req is None:
-        if value is None:
-            return True
-        else:
-            return False
+        return lambda value: value is None
     words = req.split()
 
     op = method = None
     if words:
-        op = words.pop(0)
+        op = words[0]
         method = _op_methods.get(op)
 
     if op != '<or>' and not method:
-        return value == req
-
-    if value is None:
-        return False
+        return lambda value: value == req
 
     if op == '<or>':  # Ex: <or> v1 <or> v2 <or> v3
-        while True:
-            if words.pop(0) == value:
-                return True
-            if not words:
-                break
-            op = words.pop(0)  # remove a keyword <or>
-            if not words:
-                break
-        return False
+        choices = words[1::2]
+        return lambda value: value is not None and value in choices
 
+    if len(words) < 2:
+        return lambda value: False
     try:
-        if words and method(value, words[0]):
-            return True
+        operand = _op_operands.get(op, str)(words[1])
     except ValueError:
-        pass
+        return lambda value: False
 
-    return False
+    def _match(value):
+        if value is None:
+            return False
+        try:
+            return bool(method(value, operand))
+        except ValueError:
+            return False
+
+    return _match
+
+
+def match(value, req):
+    return compile_match(req)(value)
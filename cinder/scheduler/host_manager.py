@@ -17,6 +17,7 @@
 
 from collections import abc
 import random
+import time
 import typing
 from typing import (Any, Iterable, Optional, Type, Union)
 
@@ -30,8 +31,10 @@ from cinder.common import constants
 from cinder import context as cinder_context
 from cinder import exception
 from cinder import objects
+from cinder.scheduler import capacity_ledger
 from cinder.scheduler import filters
 from cinder.scheduler import sched_utils
+from cinder.scheduler import stage_stats
 from cinder.volume import volume_types
 from cinder.volume import volume_utils
 
@@ -59,6 +62,35 @@ host_manager_opts = [
                default='cinder.scheduler.weights.OrderedHostWeightHandler',
                help='Which handler to use for selecting the host/pool '
                     'after weighing'),
+    cfg.IntOpt('scheduler_backend_state_max_age',
+               default=0,
+               min=0,
+               help='Maximum age in seconds of the scheduler view of the '
+                    'active volume services before a scheduling request '
+                    'refreshes it from the database. The default of 0 '
+                    'refreshes the view on every scheduling request. When '
+                    'set, the view is updated in place from capability '
+                    'reports and refreshed by a periodic task that runs '
+                    'every periodic_interval seconds, so this value should '
+                    'be larger than periodic_interval for scheduling '
+                    'requests to avoid database queries altogether.'),
+    cfg.BoolOpt('scheduler_shared_capacity_ledger',
+                default=False,
+                help='Share the capacity consumed by each scheduler with the '
+                     'other schedulers through the coordination backend, so '
+                     'that multiple active schedulers don\'t oversubscribe '
+                     'the same pools between capability reports. Requires '
+                     'the [coordination] backend_url option to point to a '
+                     'backend reachable by all the schedulers.'),
+    cfg.IntOpt('scheduler_filter_workers',
+               default=1,
+               min=1,
+               help='Number of workers used to run the filters that support '
+                    'it, such as DriverFilter and CapabilitiesFilter, over '
+                    'several backends at once. The workers are green threads '
+                    'when the scheduler runs with eventlet, so this mainly '
+                    'helps filters that wait on I/O. The default of 1 runs '
+                    'every filter serially.'),
 ]
 
 CONF = cfg.CONF
@@ -143,6 +175,11 @@ class BackendState(object):
         self.pools: dict = {}
 
         self.updated = None
+        # Time of the capability report the capacity values come from and
+        # capacity consumed by other schedulers since then, as recorded in
+        # the shared capacity ledger.
+        self.capacity_reported_at = None
+        self.ledger_consumed_gb: float = 0
 
     @property
     def backend_id(self) -> str:
@@ -418,6 +455,8 @@ class PoolState(BackendState):
             if self.updated and self.updated > capability['timestamp']:
                 return
             self.update_backend(capability)
+            self.capacity_reported_at = capability['timestamp']
+            self.ledger_consumed_gb = 0
 
             self.total_capacity_gb = capability.get('total_capacity_gb', 0)
             self.free_capacity_gb = capability.get('free_capacity_gb', 0)
@@ -457,6 +496,7 @@ class HostManager(object):
     """Base HostManager class."""
 
     backend_state_cls = BackendState
+    shared_capacity_ledger: Optional[capacity_ledger.CapacityLedger] = None
 
     ALLOWED_SERVICE_NAMES = ('volume', 'backup')
 
@@ -477,6 +517,8 @@ class HostManager(object):
         self.backup_service_states = {}
         self.filter_handler = filters.BackendFilterHandler('cinder.scheduler.'
                                                            'filters')
+        if CONF.scheduler_filter_workers > 1:
+            self.filter_handler.init_executor(CONF.scheduler_filter_workers)
         self.filter_classes = self.filter_handler.get_all_classes()
         self.enabled_filters = self._choose_backend_filters(
             CONF.scheduler_default_filters)
@@ -486,6 +528,13 @@ class HostManager(object):
         self.weight_classes = self.weight_handler.get_all_classes()
 
         self._no_capabilities_backends = set()  # Services without capabilities
+        self._backend_state_map_updated_at: Optional[float] = None
+        # Last numbered capability report of each service, used to apply the
+        # deltas: {(service_name, host): (generation, capabilities, timestamp)}
+        self._capabilities_reports: dict[tuple, tuple] = {}
+        if CONF.scheduler_shared_capacity_ledger:
+            self.shared_capacity_ledger = (
+                capacity_ledger.CoordinationCapacityLedger())
         self._update_backend_state_map(cinder_context.get_admin_context())
         self.service_states_last_update = {}
 
@@ -556,12 +605,16 @@ class HostManager(object):
                                                         filter_properties)
 
     def get_weighed_backends(self, backends, weight_properties,
-                             weigher_class_names=None) -> list:
-        """Weigh the backends."""
+                             weigher_class_names=None,
+                             limit: Optional[int] = None) -> list:
+        """Weigh the backends.
+
+        If limit is set, only the limit best weighed backends are returned.
+        """
         weigher_classes = self._choose_backend_weighers(weigher_class_names)
 
         weighed_backends = self.weight_handler.get_weighed_objects(
-            weigher_classes, backends, weight_properties)
+            weigher_classes, backends, weight_properties, limit=limit)
 
         LOG.debug("Weighed %s", weighed_backends)
         return weighed_backends
@@ -569,23 +622,62 @@ class HostManager(object):
     def update_service_capabilities(self,
                                     service_name: str,
                                     host: str,
-                                    capabilities: dict,
+                                    capabilities: Optional[dict],
                                     cluster_name: Optional[str],
-                                    timestamp) -> None:
-        """Update the per-service capabilities based on this notification."""
+                                    timestamp,
+                                    generation: Optional[int] = None,
+                                    capabilities_delta: Optional[dict] = None
+                                    ) -> None:
+        """Update the per-service capabilities based on this notification.
+
+        Services can number their reports with generation, and then send only
+        the changes since their previous report in capabilities_delta.
+        """
         if service_name not in HostManager.ALLOWED_SERVICE_NAMES:
             LOG.debug('Ignoring %(service_name)s service update '
                       'from %(host)s',
                       {'service_name': service_name, 'host': host})
             return
 
-        # Determine whether HostManager has just completed initialization, and
-        # has not received the rpc message returned by volume.
-        just_init = self._is_just_initialized()
-
         # TODO(geguileo): In P - Remove the next line since we receive the
         # timestamp
         timestamp = timestamp or timeutils.utcnow()
+
+        updated_pool_names = None
+        if generation is not None:
+            report_key = (service_name, host)
+            last_report = self._capabilities_reports.get(report_key)
+            if capabilities_delta is None:
+                assert capabilities is not None
+                report = sched_utils.apply_capabilities_delta(capabilities,
+                                                              {})
+            elif last_report and last_report[0] == generation - 1:
+                report = sched_utils.apply_capabilities_delta(
+                    last_report[1], capabilities_delta)
+                # The delta tells which pools changed, as long as it applies
+                # to the capabilities we are going to compare with.
+                capab_old = self.service_states.get(cluster_name or host)
+                if (service_name == 'volume' and capab_old and
+                        capab_old.get('timestamp') == last_report[2]):
+                    updated_pool_names = sched_utils.get_delta_updated_pools(
+                        capabilities_delta, self.REQUIRED_KEYS)
+            else:
+                LOG.debug('Ignoring capabilities delta %(generation)s from '
+                          '%(service_name)s service %(host)s, waiting for '
+                          'its next full report.',
+                          {'generation': generation, 'host': host,
+                           'service_name': service_name})
+                return
+            self._capabilities_reports[report_key] = (generation, report,
+                                                      timestamp)
+            # Don't let the backend states modify our copy of the report
+            capabilities = sched_utils.apply_capabilities_delta(report, {})
+
+        assert capabilities is not None
+
+        # Determine whether HostManager has just completed initialization, and
+        # has not received the rpc message returned by volume.
+        just_init = self._is_just_initialized()
         # Copy the capabilities, so we don't modify the original dict
         capab_copy = dict(capabilities)
         capab_copy["timestamp"] = timestamp
@@ -616,7 +708,12 @@ class HostManager(object):
         # There are cases: capab_old has the capabilities set,
         # but the timestamp may be None in it. So does capab_last_update.
 
-        if (not self._get_updated_pools(capab_old, capab_copy)) and (
+        if updated_pool_names is not None:
+            updated_pools = self._get_updated_pools_by_name(
+                capab_copy, updated_pool_names)
+        else:
+            updated_pools = self._get_updated_pools(capab_old, capab_copy)
+        if (not updated_pools) and (
                 (not capab_old.get("timestamp")) or
                 (not capab_last_update.get("timestamp")) or
                 (capab_last_update["timestamp"] < capab_old["timestamp"])):
@@ -633,8 +730,26 @@ class HostManager(object):
                    'cluster': cluster_msg})
 
         self._no_capabilities_backends.discard(backend)
+        if self.shared_capacity_ledger is not None:
+            self.shared_capacity_ledger.reconcile(backend, timestamp)
         if just_init:
             self._update_backend_state_map(cinder_context.get_admin_context())
+        elif CONF.scheduler_backend_state_max_age:
+            self._update_backend_state(backend, capab_copy)
+
+    def _update_backend_state(self, backend: str, capabilities: dict) -> None:
+        """Apply a capability report to the backend state map in place.
+
+        Reports from backends we don't know about yet invalidate the map, so
+        the next scheduling request loads the new service from the database.
+        """
+        backend_state = self.backend_state_map.get(backend)
+        if backend_state is None:
+            self._backend_state_map_updated_at = None
+            return
+
+        backend_state.update_from_volume_capability(
+            capabilities, service=dict(backend_state.service or {}))
 
     def notify_service_capabilities(self, service_name, backend, capabilities,
                                     timestamp):
@@ -677,6 +792,26 @@ class HostManager(object):
                 len(set(self.backend_state_map)) > 0 and
                 len(self._no_capabilities_backends) == 0)
 
+    def refresh_backend_state_map(
+            self,
+            context: cinder_context.RequestContext) -> None:
+        """Periodically reload the active volume services.
+
+        Only does anything when scheduler_backend_state_max_age is set,
+        otherwise the map is reloaded on every scheduling request anyway.
+        """
+        if CONF.scheduler_backend_state_max_age:
+            self._update_backend_state_map(context)
+
+    def _ensure_backend_state_map(
+            self,
+            context: cinder_context.RequestContext) -> None:
+        max_age = CONF.scheduler_backend_state_max_age
+        if (not max_age or self._backend_state_map_updated_at is None or
+                time.monotonic() - self._backend_state_map_updated_at >
+                max_age):
+            self._update_backend_state_map(context)
+
     def _update_backend_state_map(
             self,
             context: cinder_context.RequestContext) -> None:
@@ -739,6 +874,8 @@ class HostManager(object):
                          "scheduler cache.", {'backend': backend_key})
             del self.backend_state_map[backend_key]
 
+        self._backend_state_map_updated_at = time.monotonic()
+
     def revert_volume_consumed_capacity(self,
                                         pool_name: str,
                                         size: int) -> None:
@@ -748,6 +885,48 @@ class HostManager(object):
                 if pool_name == '#'.join([backend_key, pool_state.pool_name]):
                     pool_state.consume_from_volume({'size': -size},
                                                    update_time=False)
+                    if self.shared_capacity_ledger is not None:
+                        self.shared_capacity_ledger.reserve(
+                            pool_state.backend_id, -size)
+
+    def consume_from_volume(self,
+                            backend_state: BackendState,
+                            volume_properties: dict) -> None:
+        """Consume a volume from a backend, reserving it in the ledger.
+
+        With the shared capacity ledger the reservation is made while holding
+        the backend's ledger lock, after picking up the capacity consumed by
+        the other schedulers, so it is never lost.
+        """
+        if self.shared_capacity_ledger is None:
+            backend_state.consume_from_volume(volume_properties)
+            return
+
+        with self.shared_capacity_ledger.lock(backend_state.backend_id):
+            self._apply_capacity_ledger([backend_state])
+            backend_state.consume_from_volume(volume_properties)
+            self.shared_capacity_ledger.reserve(backend_state.backend_id,
+                                                volume_properties['size'])
+
+    def _apply_capacity_ledger(self, pools: Iterable[BackendState]) -> None:
+        """Consume from the pools the capacity reserved by other schedulers.
+
+        Only the reservations made after the capability report the pool
+        values come from are counted, the report already includes the older
+        ones.
+        """
+        ledger = self.shared_capacity_ledger
+        assert ledger is not None
+        reservations = ledger.get_foreign_reservations()
+        for pool in pools:
+            reported_at = pool.capacity_reported_at
+            consumed = sum(size for size, timestamp
+                           in reservations.get(pool.backend_id, ())
+                           if reported_at is None or timestamp > reported_at)
+            delta = consumed - pool.ledger_consumed_gb
+            if delta:
+                pool.consume_from_volume({'size': delta}, update_time=False)
+                pool.ledger_consumed_gb = consumed
 
     def get_all_backend_states(
             self,
@@ -761,7 +940,9 @@ class HostManager(object):
           {'192.168.1.100': BackendState(), ...}
         """
 
-        self._update_backend_state_map(context)
+        with stage_stats.STATS.timer(stage_stats.BACKEND_STATES,
+                                     'update_backend_state_map'):
+            self._ensure_backend_state_map(context)
 
         # build a pool_state map and return that map instead of
         # backend_state_map
@@ -773,6 +954,9 @@ class HostManager(object):
                 pool_key = '.'.join([backend_key, pool.pool_name])
                 all_pools[pool_key] = pool
 
+        if self.shared_capacity_ledger is not None:
+            self._apply_capacity_ledger(all_pools.values())
+
         return all_pools.values()
 
     def _filter_pools_by_volume_type(
@@ -801,7 +985,7 @@ class HostManager(object):
                   filters: Optional[dict] = None) -> list[dict]:
         """Returns a dict of all pools on all hosts HostManager knows about."""
 
-        self._update_backend_state_map(context)
+        self._ensure_backend_state_map(context)
 
         all_pools = {}
         name = volume_type = None
@@ -927,6 +1111,15 @@ class HostManager(object):
 
         return pool_usage
 
+    def _get_updated_pools_by_name(self, new_capa: dict,
+                                   pool_names: set) -> list:
+        """Like _get_updated_pools, but with the names of changed pools."""
+        new_pools = new_capa.get('pools', [])
+        if not (new_pools and isinstance(new_pools, list) and all(
+                self.REQUIRED_KEYS.issubset(pool) for pool in new_pools)):
+            return []
+        return [pool for pool in new_pools if pool['pool_name'] in pool_names]
+
     def _get_updated_pools(self, old_capa: dict, new_capa: dict) -> list:
         # Judge if the capabilities should be reported.
 
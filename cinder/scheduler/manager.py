@@ -48,6 +48,7 @@ from cinder import quota
 from cinder import rpc
 from cinder.scheduler.flows import create_volume
 from cinder.scheduler import rpcapi as scheduler_rpcapi
+from cinder.scheduler import stage_stats
 from cinder.volume import rpcapi as volume_rpcapi
 from cinder.volume import volume_utils as vol_utils
 
@@ -136,23 +137,26 @@ class SchedulerManager(manager.CleanableManager, manager.Manager):
     def _clean_expired_reservation(self, context):
         QUOTAS.expire(context)
 
+    @periodic_task.periodic_task(run_immediately=True)
+    def _refresh_backend_states(self, context):
+        self.driver.refresh_backend_states(context)
+
     def update_service_capabilities(self, context, service_name=None,
                                     host=None, capabilities=None,
                                     cluster_name=None, timestamp=None,
+                                    generation=None, capabilities_delta=None,
                                     **kwargs):
         """Process a capability update from a service node."""
-        if capabilities is None:
+        if capabilities is None and capabilities_delta is None:
             capabilities = {}
         # If we received the timestamp we have to deserialize it
         elif timestamp:
             timestamp = datetime.strptime(timestamp,
                                           timeutils.PERFECT_TIME_FORMAT)
 
-        self.driver.update_service_capabilities(service_name,
-                                                host,
-                                                capabilities,
-                                                cluster_name,
-                                                timestamp)
+        self.driver.update_service_capabilities(
+            service_name, host, capabilities, cluster_name, timestamp,
+            generation=generation, capabilities_delta=capabilities_delta)
 
     def notify_service_capabilities(self, context, service_name,
                                     capabilities, host=None, backend=None,
@@ -228,6 +232,41 @@ class SchedulerManager(manager.CleanableManager, manager.Manager):
         with flow_utils.DynamicLogListener(flow_engine, logger=LOG):
             flow_engine.run()
 
+    @append_operation_type(name='create_volume')
+    def create_volumes(self, context, volumes, request_spec_list,
+                       filter_properties_list, image_id=None):
+        """Schedule several equivalent volume creations at once."""
+        self._wait_for_scheduler()
+
+        cleanables = [volume for volume in volumes
+                      if volume.is_cleanable(pinned=False)]
+        for volume in cleanables:
+            volume.set_worker()
+
+        results = self.driver.schedule_create_volumes(context,
+                                                      request_spec_list,
+                                                      filter_properties_list)
+        for volume, request_spec, result in zip(volumes, request_spec_list,
+                                                results):
+            if result is None:
+                continue
+            self.message_api.create(
+                context,
+                message_field.Action.SCHEDULE_ALLOCATE_VOLUME,
+                resource_uuid=volume.id,
+                exception=result)
+            self._set_volume_state_and_notify(
+                'create_volume', {'volume_state': {'status': 'error'}},
+                context, result, request_spec)
+            # The volume won't go any further, so it doesn't need cleanup.
+            if volume in cleanables:
+                try:
+                    volume.unset_worker()
+                except Exception:
+                    LOG.exception('Failed to remove the cleanup entry of '
+                                  'volume %s, it will be cleaned up when '
+                                  'the scheduler restarts.', volume.id)
+
     @append_operation_type()
     def create_snapshot(self, ctxt, volume, snapshot, backend,
                         request_spec=None, filter_properties=None):
@@ -437,6 +476,11 @@ class SchedulerManager(manager.CleanableManager, manager.Manager):
         """
         return self.driver.get_pools(context, filters)
 
+    def get_stage_stats(self, context):
+        """Get the latency statistics of this scheduler's stages."""
+        return {'host': self.host,
+                'stages': stage_stats.STATS.to_dict()}
+
     @append_operation_type(name='create_group')
     def validate_host_capacity(self, context, backend, request_spec,
                                filter_properties):
@@ -73,9 +73,13 @@ class SchedulerAPI(rpc.RPCAPI):
         3.10 - Adds backup_id to create_volume method.
         3.11 - Adds manage_existing_snapshot method.
         3.12 - Adds create_backup method.
+        3.13 - Adds create_volumes method.
+        3.14 - Adds generation and capabilities_delta to
+               update_service_capabilities.
+        3.15 - Adds get_stage_stats method.
     """
 
-    RPC_API_VERSION = '3.12'
+    RPC_API_VERSION = '3.15'
     RPC_DEFAULT_VERSION = '3.0'
     TOPIC = constants.SCHEDULER_TOPIC
     BINARY = 'cinder-scheduler'
@@ -109,6 +113,25 @@ class SchedulerAPI(rpc.RPCAPI):
             msg_args.pop('backup_id')
         cctxt.cast(ctxt, 'create_volume', **msg_args)
 
+    def create_volumes(self, ctxt, volumes, request_spec_list,
+                       filter_properties_list, image_id=None):
+        if not self.client.can_send_version('3.13'):
+            for volume, request_spec, filter_properties in zip(
+                    volumes, request_spec_list, filter_properties_list):
+                self.create_volume(ctxt, volume, image_id=image_id,
+                                   request_spec=request_spec,
+                                   filter_properties=filter_properties)
+            return
+
+        for volume in volumes:
+            volume.create_worker()
+        cctxt = self._get_cctxt('3.13')
+        msg_args = {'volumes': volumes,
+                    'request_spec_list': request_spec_list,
+                    'filter_properties_list': filter_properties_list,
+                    'image_id': image_id}
+        cctxt.cast(ctxt, 'create_volumes', **msg_args)
+
     @rpc.assert_min_rpc_version('3.8')
     def validate_host_capacity(self, ctxt, backend, request_spec,
                                filter_properties=None):
@@ -198,6 +221,11 @@ class SchedulerAPI(rpc.RPCAPI):
         cctxt = self._get_cctxt()
         return cctxt.call(ctxt, 'get_pools', filters=filters)
 
+    @rpc.assert_min_rpc_version('3.15')
+    def get_stage_stats(self, ctxt, host=None):
+        cctxt = self._get_cctxt(server=host, version='3.15')
+        return cctxt.call(ctxt, 'get_stage_stats')
+
     @staticmethod
     def prepare_timestamp(timestamp):
         timestamp = timestamp or timeutils.utcnow()
@@ -205,13 +233,28 @@ class SchedulerAPI(rpc.RPCAPI):
 
     def update_service_capabilities(self, ctxt, service_name, host,
                                     capabilities, cluster_name,
-                                    timestamp=None):
+                                    timestamp=None, generation=None,
+                                    capabilities_delta=None):
+        """Send the capabilities of a service to all the schedulers.
+
+        If the schedulers support it, the reports are numbered with the
+        generation argument and, if capabilities_delta is provided, it is sent
+        instead of the full capabilities.
+        """
         msg_args = dict(service_name=service_name, host=host,
                         capabilities=capabilities)
 
         version = '3.3'
+        if generation is not None and self.client.can_send_version('3.14'):
+            version = '3.14'
+            msg_args.update(cluster_name=cluster_name,
+                            timestamp=self.prepare_timestamp(timestamp),
+                            generation=generation)
+            if capabilities_delta is not None:
+                msg_args.update(capabilities=None,
+                                capabilities_delta=capabilities_delta)
         # If server accepts timestamping the capabilities and the cluster name
-        if self.client.can_send_version(version):
+        elif self.client.can_send_version(version):
             # Serialize the timestamp
             msg_args.update(cluster_name=cluster_name,
                             timestamp=self.prepare_timestamp(timestamp))
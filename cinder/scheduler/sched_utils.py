@@ -11,6 +11,7 @@
 #    under the License.
 
 import math
+from typing import Iterable
 
 from oslo_log import log as logging
 
@@ -217,3 +218,97 @@ def calculate_max_over_subscription_ratio(
         max_over_subscription_ratio = float(max_over_subscription_ratio)
 
     return max_over_subscription_ratio
+
+
+def _get_dict_delta(old: dict, new: dict, skip=()) -> dict:
+    delta: dict = {}
+    changed = {key: value for key, value in new.items()
+               if key not in skip and (key not in old or old[key] != value)}
+    if changed:
+        delta['set'] = changed
+    removed = [key for key in old if key not in skip and key not in new]
+    if removed:
+        delta['unset'] = removed
+    return delta
+
+
+def _apply_dict_delta(old: dict, delta: dict) -> dict:
+    new = dict(old)
+    new.update(delta.get('set', {}))
+    for key in delta.get('unset', ()):
+        new.pop(key, None)
+    return new
+
+
+def get_capabilities_delta(old: dict, new: dict) -> dict:
+    """Return the changes between two capability reports.
+
+    Pools are matched by name, and only the keys that changed are included
+    for each pool. The delta can be applied to the old report with
+    apply_capabilities_delta to get the new one back.
+    """
+    delta = _get_dict_delta(old, new, skip=('pools',))
+    old_pools = old.get('pools')
+    new_pools = new.get('pools')
+    if not (isinstance(old_pools, list) and isinstance(new_pools, list)):
+        # Pools are not well structured, send them as a whole
+        if old_pools != new_pools:
+            if 'pools' in new:
+                delta.setdefault('set', {})['pools'] = new_pools
+            else:
+                delta.setdefault('unset', []).append('pools')
+        return delta
+
+    old_by_name = {pool['pool_name']: pool for pool in old_pools}
+    pools_delta = {}
+    for pool in new_pools:
+        name = pool['pool_name']
+        pool_delta = _get_dict_delta(old_by_name.get(name, {}), pool)
+        if pool_delta:
+            pools_delta[name] = pool_delta
+    if pools_delta:
+        delta['pools'] = pools_delta
+    new_names = {pool['pool_name'] for pool in new_pools}
+    removed_pools = [name for name in old_by_name if name not in new_names]
+    if removed_pools:
+        delta['removed_pools'] = removed_pools
+    return delta
+
+
+def apply_capabilities_delta(old: dict, delta: dict) -> dict:
+    """Return the capability report resulting from applying a delta.
+
+    The old report is not modified, and the pools of the returned report are
+    new dicts.
+    """
+    new = _apply_dict_delta(old, delta)
+    pools = new.get('pools')
+    if not isinstance(pools, list) or 'pools' in delta.get('set', {}):
+        return new
+
+    pools_delta = delta.get('pools', {})
+    removed_pools = set(delta.get('removed_pools', ()))
+    new_pools = []
+    for pool in pools:
+        name = pool['pool_name']
+        if name in removed_pools:
+            continue
+        new_pools.append(_apply_dict_delta(pool, pools_delta.get(name, {})))
+    old_names = {pool['pool_name'] for pool in pools}
+    new_pools.extend(_apply_dict_delta({}, pool_delta)
+                     for name, pool_delta in pools_delta.items()
+                     if name not in old_names)
+    new['pools'] = new_pools
+    return new
+
+
+def get_delta_updated_pools(delta: dict, keys: Iterable[str]) -> set:
+    """Return the names of the pools added or with changes in given keys."""
+    keys = set(keys)
+    updated = set()
+    for name, pool_delta in delta.get('pools', {}).items():
+        changed = set(pool_delta.get('set', ()))
+        changed.update(pool_delta.get('unset', ()))
+        if 'pool_name' in changed or keys & changed:
+            updated.add(name)
+    return updated
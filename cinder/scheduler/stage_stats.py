@@ -0,0 +1,113 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Latency statistics of the scheduling stages.
+
+The filter and weight handlers, and the scheduler itself, record how long
+each stage of a scheduling request takes: every filter and weigher, loading
+the backend states and the RPC casts to the volume services. Filters also
+record how many backends they removed.
+
+The durations are aggregated in-process into histograms with fixed buckets,
+so memory usage doesn't grow with the number of requests. The statistics of
+a scheduler can be retrieved with its get_stage_stats RPC method.
+"""
+
+import contextlib
+import threading
+import time
+from typing import Iterator, Optional
+
+
+# Upper bounds, in seconds, of the histogram buckets. Durations above the last
+# bound are counted in an additional bucket.
+BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+FILTER = 'filter'
+WEIGHER = 'weigher'
+BACKEND_STATES = 'backend_states'
+RPC = 'rpc'
+
+
+class Histogram(object):
+    """Histogram of the durations of a stage."""
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.removed = 0
+
+    def record(self, duration: float, removed: Optional[int] = None) -> None:
+        self.count += 1
+        self.sum += duration
+        self.max = max(self.max, duration)
+        for i, bound in enumerate(BUCKETS):
+            if duration <= bound:
+                break
+        else:
+            i = len(BUCKETS)
+        self.buckets[i] += 1
+        if removed:
+            self.removed += removed
+
+    def to_dict(self) -> dict:
+        result = {'count': self.count,
+                  'sum': self.sum,
+                  'max': self.max,
+                  'buckets': [[bound, count] for bound, count
+                              in zip(BUCKETS + (None,), self.buckets)]}
+        if self.removed:
+            result['removed'] = self.removed
+        return result
+
+
+class StageStats(object):
+    """Histograms of the scheduling stages, by stage type and name."""
+
+    def __init__(self):
+        self._histograms: dict[tuple[str, str], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage_type: str, name: str, duration: float,
+               removed: Optional[int] = None) -> None:
+        """Record the duration of a stage and the backends it removed."""
+        with self._lock:
+            histogram = self._histograms.get((stage_type, name))
+            if histogram is None:
+                histogram = self._histograms[(stage_type, name)] = Histogram()
+            histogram.record(duration, removed)
+
+    @contextlib.contextmanager
+    def timer(self, stage_type: str, name: str) -> Iterator[None]:
+        """Record the duration of the code run in the context."""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record(stage_type, name, time.monotonic() - start)
+
+    def to_dict(self) -> dict:
+        """Return the statistics as {stage_type: {name: histogram dict}}."""
+        result: dict[str, dict] = {}
+        with self._lock:
+            for (stage_type, name), histogram in self._histograms.items():
+                result.setdefault(stage_type, {})[name] = histogram.to_dict()
+        return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+
+STATS = StageStats()
@@ -60,27 +60,38 @@ class CapacityWeigher(weights.BaseHostWeigher):
         return CONF.capacity_weight_multiplier
 
     def weigh_objects(self, weighed_obj_list, weight_properties):
-        """Override the weigh objects.
+        """Override the weigh objects."""
+        return self.weigh_all([obj.obj for obj in weighed_obj_list],
+                              weight_properties)
 
+    def weigh_all(self, obj_list, weight_properties):
+        """Override the bulk weighing.
 
-        This override calls the parent to do the weigh objects and then
-        replaces any infinite weights with a value that is a multiple of the
-        delta between the min and max values.
+        This override weighs all the hosts and then replaces any infinite
+        weights with a value that is a multiple of the delta between the min
+        and max values.
 
         NOTE(jecarey): the infinite weight value is only used when the
         smallest value is being favored (negative multiplier).  When the
         largest weight value is being used a weight of -1 is used instead.
         See _weigh_object method.
         """
-        tmp_weights = super(CapacityWeigher, self).weigh_objects(
-            weighed_obj_list, weight_properties)
+        unknown_weight = self._unknown_weight()
+        thin = self._is_thin(weight_properties)
+        tmp_weights = [self._free_capacity(host_state, thin, unknown_weight)
+                       for host_state in obj_list]
+        self._update_bounds(tmp_weights)
+        if not tmp_weights:
+            return tmp_weights
 
         assert self.maxval is not None
         if math.isinf(self.maxval):
-            # NOTE(jecarey): if all weights were infinite then parent
-            # method returns 0 for all of the weights.  Thus self.minval
-            # cannot be infinite at this point
+            # NOTE(jecarey): if all weights were infinite then the
+            # normalization returns 0 for all of the weights.  Thus
+            # self.minval cannot be infinite at this point
             copy_weights = [w for w in tmp_weights if not math.isinf(w)]
+            if not copy_weights:
+                return tmp_weights
             self.maxval = max(copy_weights)
             assert self.minval is not None
             offset = (self.maxval - self.minval) * OFFSET_MULT
@@ -92,39 +103,47 @@ class CapacityWeigher(weights.BaseHostWeigher):
 
     def _weigh_object(self, host_state, weight_properties) -> float:
         """Higher weights win.  We want spreading to be the default."""
+        return self._free_capacity(host_state,
+                                   self._is_thin(weight_properties),
+                                   self._unknown_weight())
+
+    @staticmethod
+    def _unknown_weight() -> float:
+        # (zhiteng) 'infinite' and 'unknown' are treated the same
+        # here, for sorting purpose.
+
+        # As a partial fix for bug #1350638, 'infinite' and 'unknown' are
+        # given the lowest weight to discourage driver from report such
+        # capacity anymore.
+        return -1 if CONF.capacity_weight_multiplier > 0 else float('inf')
+
+    @staticmethod
+    def _is_thin(weight_properties) -> bool:
+        # NOTE(xyang): If 'provisioning:type' is 'thick' in extra_specs,
+        # we will not use max_over_subscription_ratio and
+        # provisioned_capacity_gb to determine whether a volume can be
+        # provisioned. Instead free capacity will be used to evaluate.
+        vol_type = weight_properties.get('volume_type', {}) or {}
+        provision_type = vol_type.get('extra_specs', {}).get(
+            'provisioning:type')
+        return provision_type != 'thick'
+
+    @staticmethod
+    def _free_capacity(host_state, thin: bool, unknown_weight: float) -> float:
         free_space = host_state.free_capacity_gb
         total_space = host_state.total_capacity_gb
         if (free_space == 'infinite' or free_space == 'unknown' or
                 total_space == 'infinite' or total_space == 'unknown'):
-            # (zhiteng) 'infinite' and 'unknown' are treated the same
-            # here, for sorting purpose.
-
-            # As a partial fix for bug #1350638, 'infinite' and 'unknown' are
-            # given the lowest weight to discourage driver from report such
-            # capacity anymore.
-            free = -1 if CONF.capacity_weight_multiplier > 0 else float('inf')
-        else:
-            # NOTE(xyang): If 'provisioning:type' is 'thick' in extra_specs,
-            # we will not use max_over_subscription_ratio and
-            # provisioned_capacity_gb to determine whether a volume can be
-            # provisioned. Instead free capacity will be used to evaluate.
-            thin = True
-            vol_type = weight_properties.get('volume_type', {}) or {}
-            provision_type = vol_type.get('extra_specs', {}).get(
-                'provisioning:type')
-            if provision_type == 'thick':
-                thin = False
-
-            free = sched_utils.calculate_virtual_free_capacity(
-                total_space,
-                free_space,
-                host_state.provisioned_capacity_gb,
-                host_state.thin_provisioning_support,
-                host_state.max_over_subscription_ratio,
-                host_state.reserved_percentage,
-                thin)
-
-        return free
+            return unknown_weight
+
+        return sched_utils.calculate_virtual_free_capacity(
+            total_space,
+            free_space,
+            host_state.provisioned_capacity_gb,
+            host_state.thin_provisioning_support,
+            host_state.max_over_subscription_ratio,
+            host_state.reserved_percentage,
+            thin)
 
 
 class AllocatedCapacityWeigher(weights.BaseHostWeigher):
@@ -141,6 +160,12 @@ class AllocatedCapacityWeigher(weights.BaseHostWeigher):
         """Override the weight multiplier."""
         return CONF.allocated_capacity_weight_multiplier
 
+    def weigh_all(self, obj_list, weight_properties):
+        """Override the bulk weighing to read the attribute directly."""
+        weights = [host_state.allocated_capacity_gb for host_state in obj_list]
+        self._update_bounds(weights)
+        return weights
+
     def _weigh_object(self, host_state, weight_properties):
         # Higher weights win.  We want spreading (choose host with lowest
         # allocated_capacity first) to be the default.
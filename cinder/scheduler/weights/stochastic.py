@@ -32,7 +32,7 @@ class StochasticHostWeightHandler(base_weight.BaseWeightHandler):
                                                           namespace)
 
     def get_weighed_objects(self, weigher_classes, obj_list,
-                            weighing_properties):
+                            weighing_properties, limit=None):
         # The normalization performed in the superclass is nonlinear, which
         # messes up the probabilities, so override it. The probabilistic
         # approach we use here is self-normalizing.
@@ -41,13 +41,14 @@ class StochasticHostWeightHandler(base_weight.BaseWeightHandler):
 
         # Compute the object weights as the parent would but without sorting
         # or normalization.
+        obj_list = list(obj_list)
         weighed_objs = [wts.WeighedHost(obj, 0.0) for obj in obj_list]
         for weigher_cls in weigher_classes:
             weigher = weigher_cls()
-            weights = weigher.weigh_objects(weighed_objs, weighing_properties)
-            for i, weight in enumerate(weights):
-                obj = weighed_objs[i]
-                obj.weight += weigher.weight_multiplier() * weight
+            weights = weigher.weigh_all(obj_list, weighing_properties)
+            multiplier = weigher.weight_multiplier()
+            for obj, weight in zip(weighed_objs, weights):
+                obj.weight += multiplier * weight
 
         # Avoid processing empty lists
         if not weighed_objs:
@@ -79,4 +80,6 @@ class StochasticHostWeightHandler(base_weight.BaseWeightHandler):
         # could only occur with very large numbers and floating point
         # rounding. In those cases the actual winner should have been the
         # last element, so return it.
-        return weighed_objs[winning_index:] + weighed_objs[0:winning_index]
+        weighed_objs = (weighed_objs[winning_index:] +
+                        weighed_objs[0:winning_index])
+        return weighed_objs[:limit] if limit is not None else weighed_objs
@@ -42,6 +42,14 @@ class VolumeNumberWeigher(weights.BaseHostWeigher):
         """Override the weight multiplier."""
         return CONF.volume_number_multiplier
 
+    def weigh_all(self, obj_list, weight_properties):
+        """Override the bulk weighing to elevate the context only once."""
+        context = weight_properties['context'].elevated()
+        weights = [self._volume_number(context, host_state)
+                   for host_state in obj_list]
+        self._update_bounds(weights)
+        return weights
+
     def _weigh_object(self, host_state, weight_properties):
         """Less volume number weights win.
 
@@ -49,6 +57,10 @@ class VolumeNumberWeigher(weights.BaseHostWeigher):
         """
         context = weight_properties['context']
         context = context.elevated()
+        return self._volume_number(context, host_state)
+
+    @staticmethod
+    def _volume_number(context, host_state):
         volume_number = db.volume_data_get_for_host(context=context,
                                                     host=host_state.host,
                                                     count_only=True)
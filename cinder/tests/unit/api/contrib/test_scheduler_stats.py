@@ -17,6 +17,7 @@
 from unittest import mock
 
 import ddt
+import oslo_messaging
 import webob
 
 from cinder.api.contrib import scheduler_stats
@@ -208,3 +209,68 @@ class SchedulerStatsAPITest(test.TestCase):
                                                             'pool', True)
         self.assertDictEqual(expected, res)
         mock_get_pools.assert_called_with(mock.ANY, filters=filters)
+
+    @mock.patch('cinder.objects.ServiceList.get_all', return_value=[{}])
+    @mock.patch('cinder.scheduler.rpcapi.SchedulerAPI.get_stage_stats')
+    def test_get_stage_stats(self, mock_get_stage_stats, mock_services):
+        req = fakes.HTTPRequest.blank('/v3/%s/scheduler-stats/'
+                                      'get_stage_stats?host=sched1' %
+                                      fake.PROJECT_ID)
+        req.api_version_request = mv.get_api_version(
+            mv.SCHEDULER_STAGE_STATS)
+        req.environ['cinder.context'] = self.ctxt
+        stages = {'filter': {'CapacityFilter': {'count': 1}}}
+        mock_get_stage_stats.return_value = {'host': 'sched1',
+                                             'stages': stages}
+
+        res = self.controller.get_stage_stats(req)
+
+        self.assertDictEqual(
+            {'stage_stats': {'host': 'sched1', 'stages': stages}}, res)
+        mock_get_stage_stats.assert_called_once_with(self.ctxt,
+                                                     host='sched1')
+        mock_services.assert_called_once_with(
+            self.ctxt, {'host': 'sched1', 'binary': 'cinder-scheduler',
+                        'is_up': True})
+
+    def _get_stage_stats_request(self, host=None):
+        url = '/v3/%s/scheduler-stats/get_stage_stats' % fake.PROJECT_ID
+        if host:
+            url += '?host=%s' % host
+        req = fakes.HTTPRequest.blank(url)
+        req.api_version_request = mv.get_api_version(
+            mv.SCHEDULER_STAGE_STATS)
+        req.environ['cinder.context'] = self.ctxt
+        return req
+
+    @mock.patch('cinder.objects.ServiceList.get_all', return_value=[])
+    @mock.patch('cinder.scheduler.rpcapi.SchedulerAPI.get_stage_stats')
+    def test_get_stage_stats_host_not_found(self, mock_get_stage_stats,
+                                            mock_services):
+        req = self._get_stage_stats_request(host='unknown')
+
+        self.assertRaises(exception.NotFound,
+                          self.controller.get_stage_stats, req)
+        mock_get_stage_stats.assert_not_called()
+
+    @ddt.data(None, 'sched1')
+    @mock.patch('cinder.objects.ServiceList.get_all', return_value=[{}])
+    @mock.patch('cinder.scheduler.rpcapi.SchedulerAPI.get_stage_stats',
+                side_effect=oslo_messaging.MessagingTimeout)
+    def test_get_stage_stats_timeout(self, host, mock_get_stage_stats,
+                                     mock_services):
+        req = self._get_stage_stats_request(host=host)
+
+        self.assertRaises(exception.NotFound,
+                          self.controller.get_stage_stats, req)
+        mock_get_stage_stats.assert_called_once_with(self.ctxt, host=host)
+
+    def test_get_stage_stats_version_not_supported(self):
+        req = fakes.HTTPRequest.blank('/v3/%s/scheduler-stats/'
+                                      'get_stage_stats' % fake.PROJECT_ID)
+        req.api_version_request = mv.get_api_version(
+            mv.get_prior_version(mv.SCHEDULER_STAGE_STATS))
+        req.environ['cinder.context'] = self.ctxt
+
+        self.assertRaises(exception.VersionNotFoundForAPIMethod,
+                          self.controller.get_stage_stats, req)
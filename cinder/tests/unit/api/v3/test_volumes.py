@@ -697,6 +697,56 @@ class VolumeApiTest(BaseVolumeTest):
         self.assertEqual(ex['volume']['description'],
                          res_dict['volume']['description'])
 
+    @mock.patch.object(volume_api.API, 'create_volumes', autospec=True)
+    def test_volume_create_count(self, create_volumes):
+        self.patch('cinder.db.api._volume_type_get_full',
+                   v3_fakes.fake_volume_type_get)
+        create_volumes.return_value = [
+            fake_volume.fake_volume_obj(self.ctxt,
+                                        **v3_fakes.create_volume(volume_id))
+            for volume_id in (fake.VOLUME_ID, fake.VOLUME2_ID)]
+
+        req = fakes.HTTPRequest.blank('/v3/volumes')
+        req.api_version_request = mv.get_api_version(mv.VOLUME_CREATE_COUNT)
+        body = {'volume': {'name': 'test name', 'size': 1, 'count': 2}}
+        res_dict = self.controller.create(req, body=body)
+
+        self.assertEqual([fake.VOLUME_ID, fake.VOLUME2_ID],
+                         [vol['id'] for vol in res_dict['volumes']])
+        create_volumes.assert_called_once_with(
+            self.controller.volume_api, req.environ['cinder.context'], 2, 1,
+            'test name', None, image_id=None, volume_type=None,
+            metadata=None, availability_zone=None, scheduler_hints=None)
+
+    @mock.patch.object(volume_api.API, 'create_volumes', autospec=True)
+    def test_volume_create_count_with_source(self, create_volumes):
+        self.mock_object(volume_api.API, 'get_volume',
+                         v3_fakes.fake_volume_get)
+
+        req = fakes.HTTPRequest.blank('/v3/volumes')
+        req.api_version_request = mv.get_api_version(mv.VOLUME_CREATE_COUNT)
+        body = {'volume': {'size': 1, 'count': 2,
+                           'source_volid': fake.VOLUME_ID}}
+        self.assertRaises(webob.exc.HTTPBadRequest,
+                          self.controller.create, req, body=body)
+        create_volumes.assert_not_called()
+
+    @ddt.data(0, '0', '00', -1, '-1', '1.5')
+    def test_volume_create_count_invalid(self, count):
+        req = fakes.HTTPRequest.blank('/v3/volumes')
+        req.api_version_request = mv.get_api_version(mv.VOLUME_CREATE_COUNT)
+        body = {'volume': {'size': 1, 'count': count}}
+        self.assertRaises(exception.ValidationError,
+                          self.controller.create, req, body=body)
+
+    def test_volume_create_count_old_version(self):
+        req = fakes.HTTPRequest.blank('/v3/volumes')
+        req.api_version_request = mv.get_api_version(
+            mv.get_prior_version(mv.VOLUME_CREATE_COUNT))
+        body = {'volume': {'size': 1, 'count': 2}}
+        self.assertRaises(exception.ValidationError,
+                          self.controller.create, req, body=body)
+
     def test_volume_create_extra_params(self):
         self.mock_object(volume_api.API, 'get', v3_fakes.fake_volume_get)
         self.mock_object(volume_api.API, "create",
@@ -1497,6 +1497,68 @@ class BackupCephTestCase(test.TestCase):
         self.assertEqual(['popen_init', 'popen_init', 'stdout_close',
                           'communicate', 'wait'], self.callstack)
 
+    @common_mocks
+    def test_rbd_diff_transfer_librbd(self):
+        self.flags(backup_ceph_diff_transfer='librbd')
+        src = mock.Mock()
+        dest = mock.Mock()
+        self.mock_rbd.Image.side_effect = [src, dest]
+        src.size.return_value = 8 * units.Mi
+        src.stat.return_value = {'obj_size': 4 * units.Mi}
+        src.read.side_effect = lambda offset, length: b'x' * length
+        dest.size.return_value = 4 * units.Mi
+        dest.list_snaps.return_value = [{'name': 'snap1'}]
+
+        def diff_iterate(offset, length, from_snap, iterate_cb):
+            iterate_cb(3 * units.Mi, 2 * units.Mi, True)
+            iterate_cb(6 * units.Mi, units.Mi, False)
+
+        src.diff_iterate.side_effect = diff_iterate
+
+        self.service._rbd_diff_transfer('src', 'src_pool', 'dest',
+                                        'dest_pool', 'src_user', 'src_conf',
+                                        'dest_user', 'dest_conf',
+                                        src_snap='snap2', from_snap='snap1')
+
+        self.mock_rbd.Image.assert_has_calls([
+            mock.call(mock.ANY, 'src', snapshot='snap2', read_only=True),
+            mock.call(mock.ANY, 'dest')])
+        self.mock_rados.Rados.assert_has_calls([
+            mock.call(rados_id='src_user', conffile='src_conf'),
+            mock.call(rados_id='dest_user', conffile='dest_conf')],
+            any_order=True)
+        dest.resize.assert_called_once_with(8 * units.Mi)
+        src.diff_iterate.assert_called_once_with(0, 8 * units.Mi, 'snap1',
+                                                 mock.ANY)
+        # Extents are split at object boundaries
+        dest.write.assert_has_calls([
+            mock.call(b'x' * units.Mi, 3 * units.Mi),
+            mock.call(b'x' * units.Mi, 4 * units.Mi)], any_order=True)
+        dest.discard.assert_called_once_with(6 * units.Mi, units.Mi)
+        dest.create_snap.assert_called_once_with('snap2')
+        src.close.assert_called_once_with()
+        dest.close.assert_called_once_with()
+
+    @common_mocks
+    def test_rbd_diff_transfer_librbd_missing_from_snap(self):
+        self.flags(backup_ceph_diff_transfer='librbd')
+        src = mock.Mock()
+        dest = mock.Mock()
+        self.mock_rbd.Image.side_effect = [src, dest]
+        src.size.return_value = units.Mi
+        dest.size.return_value = units.Mi
+        dest.list_snaps.return_value = []
+
+        self.assertRaises(exception.BackupRBDOperationFailed,
+                          self.service._rbd_diff_transfer,
+                          'src', 'src_pool', 'dest', 'dest_pool',
+                          'src_user', 'src_conf', 'dest_user', 'dest_conf',
+                          src_snap='snap2', from_snap='snap1')
+
+        src.diff_iterate.assert_not_called()
+        dest.create_snap.assert_not_called()
+        dest.close.assert_called_once_with()
+
     @common_mocks
     def test_restore_metdata(self):
         version = 2
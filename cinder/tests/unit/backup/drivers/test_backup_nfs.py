@@ -32,6 +32,7 @@ from oslo_config import cfg
 import zstd
 
 from cinder.backup.drivers import nfs
+from cinder.backup import status_monitor
 from cinder import context
 from cinder.db import api as db
 from cinder import exception
@@ -312,13 +313,14 @@ class BackupNFSTestCase(test.TestCase):
         """Test the backup abort mechanism when backup is force deleted."""
         count = set()
 
-        def my_refresh():
-            # This refresh method will abort the backup after 1 chunk
+        def my_poll(backup_ids):
+            # This poll method will abort the backup after 1 chunk
             count.add(len(count) + 1)
             if len(count) == 2:
                 backup.destroy()
-            original_refresh()
+            original_poll(backup_ids)
 
+        self.flags(backup_status_check_interval=0)
         volume_id = fake.VOLUME_ID
         self._create_backup_db_entry(volume_id=volume_id,
                                      container=None,
@@ -326,12 +328,10 @@ class BackupNFSTestCase(test.TestCase):
         service = nfs.NFSBackupDriver(self.ctxt)
         self.volume_file.seek(0)
         backup = objects.Backup.get_by_id(self.ctxt, FAKE_BACKUP_ID)
-        original_refresh = backup.refresh
+        original_poll = status_monitor.MONITOR._poll
 
-        # We cannot mock refresh method in backup object directly because
-        # mock will raise AttributeError on context manager exit.
-        with mock.patch('cinder.objects.base.CinderPersistentObject.refresh',
-                        side_effect=my_refresh), \
+        with mock.patch.object(status_monitor.MONITOR, '_poll',
+                               side_effect=my_poll), \
                 mock.patch.object(service, 'delete_object',
                                   side_effect=service.delete_object) as delete:
             # Driver shouldn't raise the NotFound exception
@@ -794,13 +794,13 @@ class BackupNFSTestCase(test.TestCase):
             prefix = volume + '_' + backup_name
             return prefix
 
-        def my_refresh():
-            # This refresh method will abort the backup after 1 chunk
+        def my_poll(backup_ids):
+            # This poll method will abort the restore after 1 chunk
             count.add(len(count) + 1)
             if len(count) == 2:
                 backup.status = objects.fields.BackupStatus.AVAILABLE
                 backup.save()
-            original_refresh()
+            original_poll(backup_ids)
 
         self.mock_object(nfs.NFSBackupDriver,
                          '_generate_object_name_prefix',
@@ -837,11 +837,12 @@ class BackupNFSTestCase(test.TestCase):
         deltabackup = objects.Backup.get_by_id(self.ctxt, fake.BACKUP2_ID)
 
         backup = objects.Backup.get_by_id(self.ctxt, fake.BACKUP2_ID)
-        original_refresh = backup.refresh
+        original_poll = status_monitor.MONITOR._poll
+        self.flags(backup_status_check_interval=0)
 
         with tempfile.NamedTemporaryFile() as restored_file, \
-                mock.patch('cinder.objects.Backup.refresh',
-                           side_effect=my_refresh):
+                mock.patch.object(status_monitor.MONITOR, '_poll',
+                                  side_effect=my_poll):
 
             self.assertRaises(exception.BackupRestoreCancel,
                               service.restore, backup, volume_id,
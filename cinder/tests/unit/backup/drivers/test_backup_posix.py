@@ -21,6 +21,7 @@ import tempfile
 from unittest import mock
 import uuid
 
+from cinder.backup import chunkeddriver
 from cinder.backup.drivers import posix
 from cinder.common import config
 from cinder import context
@@ -92,6 +93,16 @@ class PosixBackupDriverTestCase(test.TestCase):
 
         self.assertEqual(UPDATED_CONTAINER_NAME, result)
 
+    def test_update_container_name_dedup(self):
+        self.driver.dedup_backups = True
+
+        result = self.driver.update_container_name(FAKE_BACKUP, None)
+        self.assertEqual(posix.DEDUP_CONTAINER, result)
+
+        self.driver.backup_default_container = FAKE_CONTAINER
+        result = self.driver.update_container_name(FAKE_BACKUP, None)
+        self.assertEqual(FAKE_CONTAINER, result)
+
     def test_put_container(self):
         self.mock_object(os.path, 'exists', return_value=False)
         self.mock_object(os, 'makedirs')
@@ -333,3 +344,31 @@ class PosixBackupTestWithData(test.TestCase):
 
         statb = os.stat(self.vol_path)
         self.assertLess(statb.st_blocks * 512, (3 * chunk_size + 512) / 512)
+
+    @mock.patch('cinder.volume.volume_utils.notify_about_backup_usage')
+    def test_backup_dedup_shares_chunks(self, mock_notify):
+        self.override_config('backup_deduplication', True)
+        self.override_config('backup_compression_algorithm', 'none')
+        driver = posix.PosixBackupDriver(self.ctxt)
+        vol_id = self._create_volume_db_entry()
+        data = os.urandom(3 * FAKE_SHA_BLOCK_SIZE_BYTES)
+        backups = [self._create_backup_db_entry(volume_id=vol_id,
+                                                container=None)
+                   for i in range(2)]
+
+        for backup in backups:
+            with tempfile.TemporaryFile() as volume_file:
+                volume_file.write(data)
+                volume_file.seek(0)
+                driver.backup(backup, volume_file)
+
+        self.assertEqual({posix.DEDUP_CONTAINER},
+                         {backup.container for backup in backups})
+        container_path = os.path.join(driver.backup_path,
+                                      posix.DEDUP_CONTAINER)
+        chunks = [name for name in os.listdir(container_path)
+                  if name.startswith(chunkeddriver.DEDUP_OBJECT_PREFIX) and
+                  name != chunkeddriver.DEDUP_INDEX_NAME]
+        self.assertEqual(1, len(chunks))
+        index = driver._read_dedup_index(posix.DEDUP_CONTAINER)
+        self.assertEqual(2, index[chunks[0]]['refcount'])
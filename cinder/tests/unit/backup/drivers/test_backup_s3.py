@@ -25,6 +25,7 @@ import threading
 from unittest import mock
 import zlib
 
+from botocore import exceptions as boto_exc
 from moto import mock_aws
 from oslo_utils import units
 
@@ -630,3 +631,47 @@ class BackupS3TestCase(test.TestCase):
 
         with tempfile.NamedTemporaryFile() as volume_file:
             service.restore(backup, volume_id, volume_file, False)
+
+    @mock_aws
+    def test_multipart_upload_and_ranged_read(self):
+        self.flags(backup_s3_multipart_concurrency=3,
+                   backup_s3_multipart_part_size=5 * units.Mi)
+        bucket = s3_dr.CONF.backup_s3_store_bucket
+        service = s3_dr.S3BackupDriver(self.ctxt)
+        service.put_container(bucket)
+        data = os.urandom(11 * units.Mi)
+
+        with mock.patch.object(service.conn, 'upload_part',
+                               wraps=service.conn.upload_part) as upload:
+            with service.get_object_writer(bucket, 'obj') as writer:
+                writer.write(data)
+        self.assertEqual(3, upload.call_count)
+
+        with mock.patch.object(service.conn, 'get_object',
+                               wraps=service.conn.get_object) as get:
+            with service.get_object_reader(bucket, 'obj') as reader:
+                read_data = reader.read()
+        self.assertEqual(data, read_data)
+        self.assertIsInstance(read_data, bytes)
+        self.assertEqual(['bytes=0-5242879',
+                          'bytes=10485760-11534335',
+                          'bytes=5242880-10485759'],
+                         sorted(call.kwargs['Range']
+                                for call in get.call_args_list))
+
+    def test_multipart_upload_failure(self):
+        self.flags(backup_s3_multipart_concurrency=2,
+                   backup_s3_multipart_part_size=5 * units.Mi)
+        conn = mock.Mock()
+        conn.create_multipart_upload.return_value = {'UploadId': 'upload'}
+        conn.upload_part.side_effect = boto_exc.ClientError(
+            error_response={'Error': {'Code': 'MyCode',
+                                      'Message': 'MyMessage'}},
+            operation_name='upload_part')
+        writer = s3_dr.S3ObjectWriter('bucket', 'obj', conn)
+        writer.write(bytes(6 * units.Mi))
+
+        self.assertRaises(s3_dr.S3ClientError, writer.close)
+        conn.abort_multipart_upload.assert_called_once_with(
+            Bucket='bucket', Key='obj', UploadId='upload')
+        conn.complete_multipart_upload.assert_not_called()
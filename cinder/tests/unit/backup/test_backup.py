@@ -16,6 +16,7 @@
 
 import copy
 import os
+import stat
 from unittest import mock
 import uuid
 
@@ -30,6 +31,7 @@ from oslo_utils import timeutils
 import cinder
 from cinder.backup import api
 from cinder.backup import manager
+from cinder.backup import status_monitor
 from cinder import context
 from cinder.db import api as db
 from cinder import exception
@@ -1752,6 +1754,57 @@ class BackupTestCase(BaseBackupTest):
         self.assertGreaterEqual(timeutils.utcnow(), backup.deleted_at)
         self.assertEqual(fields.BackupStatus.DELETED, backup.status)
 
+    @mock.patch('os.stat')
+    @mock.patch('builtins.open')
+    def test_open_backup_device_direct_io(self, mock_open, mock_stat):
+        self.flags(backup_direct_io=True)
+        mock_stat.return_value.st_mode = stat.S_IFBLK
+        backup_service = mock.Mock(support_direct_io=True)
+
+        result = self.backup_mgr._open_backup_device(backup_service,
+                                                     '/dev/sdb')
+
+        self.assertEqual(mock_open.return_value, result)
+        mock_open.assert_called_once_with(
+            '/dev/sdb', 'rb', buffering=0,
+            opener=manager._direct_io_opener)
+
+    @mock.patch('os.stat')
+    @mock.patch('builtins.open')
+    def test_open_backup_device_direct_io_fails(self, mock_open, mock_stat):
+        self.flags(backup_direct_io=True)
+        mock_stat.return_value.st_mode = stat.S_IFBLK
+        mock_file = mock.Mock()
+        mock_open.side_effect = [OSError(), mock_file]
+        backup_service = mock.Mock(support_direct_io=True)
+
+        result = self.backup_mgr._open_backup_device(backup_service,
+                                                     '/dev/sdb')
+
+        self.assertEqual(mock_file, result)
+        mock_open.assert_called_with('/dev/sdb', 'rb')
+
+    @mock.patch('os.stat')
+    @mock.patch('builtins.open')
+    def test_open_backup_device_not_block(self, mock_open, mock_stat):
+        self.flags(backup_direct_io=True)
+        mock_stat.return_value.st_mode = stat.S_IFREG
+        backup_service = mock.Mock(support_direct_io=True)
+
+        self.backup_mgr._open_backup_device(backup_service, '/tmp/volume')
+
+        mock_open.assert_called_once_with('/tmp/volume', 'rb')
+
+    @mock.patch.object(status_monitor.MONITOR, 'notify')
+    def test_delete_backup_notifies_status_monitor(self, mock_notify):
+        vol_id = self._create_volume_db_entry(size=1)
+        backup = self._create_backup_db_entry(
+            status=fields.BackupStatus.DELETING, volume_id=vol_id,
+            service='cinder.tests.unit.backup.fake_service.FakeBackupService')
+        self.backup_mgr.delete_backup(self.ctxt, backup)
+        mock_notify.assert_called_once_with(backup.id,
+                                            fields.BackupStatus.DELETING)
+
     @mock.patch('cinder.volume.volume_utils.delete_encryption_key')
     def test_delete_backup_of_encrypted_volume(self,
                                                mock_delete_encryption_key):
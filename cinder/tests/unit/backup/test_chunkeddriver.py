@@ -13,9 +13,12 @@
 #    under the License.
 """Tests for the base chunkedbackupdriver class."""
 
+import hashlib
+import io
 import json
 from unittest import mock
 
+import ddt
 from oslo_config import cfg
 from oslo_utils import units
 
@@ -78,7 +81,7 @@ class TestObjectWriter(object):
         pass
 
     def write(self, data):
-        self.written_data = data
+        self.written_data = bytes(data)
         self.write_count += 1
 
 
@@ -94,7 +97,9 @@ class TestObjectReader(object):
         metadata['volume_id'] = 'volumeid'
         metadata['backup_name'] = 'backup_name'
         metadata['backup_description'] = 'backup_description'
-        metadata['objects'] = ['obj1']
+        metadata['objects'] = [{'obj1': {'offset': 0, 'length': 1,
+                                         'compression': 'none',
+                                         'md5': 'md5'}}]
         metadata['parent_id'] = 'parent_id'
         metadata['extra_metadata'] = 'extra_metadata'
         metadata['chunk_size'] = 1
@@ -113,6 +118,60 @@ class TestObjectReader(object):
         return json.dumps(self.metadata).encode('utf-8')
 
 
+class MemoryObjectWriter(object):
+    def __init__(self, objects, key):
+        self.objects = objects
+        self.key = key
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        pass
+
+    def write(self, data):
+        self.objects[self.key] = bytes(data)
+
+
+class MemoryObjectReader(object):
+    def __init__(self, data):
+        self.data = data
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        pass
+
+    def read(self):
+        return self.data
+
+
+class MemoryChunkedDriver(ConcreteChunkedDriver):
+    """Chunked driver that stores the objects in memory."""
+
+    def __init__(self, ctxt):
+        super(MemoryChunkedDriver, self).__init__(ctxt)
+        self.objects = {}
+
+    def _generate_object_name_prefix(self, backup):
+        return 'test-%s' % backup.id
+
+    def delete_object(self, container, object_name):
+        del self.objects[(container, object_name)]
+
+    def get_container_entries(self, container, prefix):
+        return [name for cont, name in self.objects
+                if cont == container and name.startswith(prefix)]
+
+    def get_object_reader(self, container, object_name, extra_metadata=None):
+        return MemoryObjectReader(self.objects[(container, object_name)])
+
+    def get_object_writer(self, container, object_name, extra_metadata=None):
+        return MemoryObjectWriter(self.objects, (container, object_name))
+
+
+@ddt.ddt
 class ChunkedDriverTestCase(test.TestCase):
 
     def _create_backup_db_entry(self, volume_id=fake.VOLUME_ID,
@@ -272,10 +331,11 @@ class ChunkedDriverTestCase(test.TestCase):
 
     def test_write_sha256file(self):
         obj_writer = TestObjectWriter('', '')
+        digests = hashlib.sha256(b'a').digest() + hashlib.sha256(b'b').digest()
         with mock.patch.object(self.driver, 'get_object_writer',
                                return_value=obj_writer):
             self.driver._write_sha256file(self.backup, 'volid', 'contain_name',
-                                          ['sha'])
+                                          digests)
 
             self.assertIsNotNone(obj_writer.written_data)
             written_data = obj_writer.written_data.decode('utf-8')
@@ -290,7 +350,76 @@ class ChunkedDriverTestCase(test.TestCase):
                              metadata.get('backup_description'))
             self.assertEqual(self.driver.sha_block_size_bytes,
                              metadata.get('chunk_size'))
-            self.assertEqual(['sha'], metadata.get('sha256s'))
+            self.assertEqual([hashlib.sha256(b'a').hexdigest(),
+                              hashlib.sha256(b'b').hexdigest()],
+                             metadata.get('sha256s'))
+
+    def _write_and_read_sha256_index(self, digests):
+        obj_writer = TestObjectWriter('', '')
+        with mock.patch.object(self.driver, 'get_object_writer',
+                               return_value=obj_writer):
+            self.driver._write_sha256file(self.backup, 'volid', 'contain_name',
+                                          digests)
+        with mock.patch.object(TestObjectReader, 'read',
+                               return_value=obj_writer.written_data):
+            return (obj_writer.written_data,
+                    self.driver._read_sha256_index(self.backup),
+                    self.driver._read_sha256file(self.backup))
+
+    def test_sha256_index_binary(self):
+        self.driver.sha256_index_format = 'binary'
+        digests = hashlib.sha256(b'a').digest() + hashlib.sha256(b'b').digest()
+
+        data, (header, read_digests), sha256file = (
+            self._write_and_read_sha256_index(digests))
+
+        self.assertTrue(data.startswith(cbd.SHA256_INDEX_MAGIC))
+        self.assertEqual(digests, read_digests)
+        self.assertEqual(self.backup.id, header['backup_id'])
+        self.assertEqual(self.driver.sha_block_size_bytes,
+                         header['chunk_size'])
+        self.assertEqual(2, header['count'])
+        self.assertEqual('none', header['compression'])
+        self.assertEqual([hashlib.sha256(b'a').hexdigest(),
+                          hashlib.sha256(b'b').hexdigest()],
+                         sha256file['sha256s'])
+
+    @ddt.data('zlib', 'zstd')
+    def test_sha256_index_binary_compressed(self, algorithm):
+        self.override_config('backup_compression_algorithm', algorithm)
+        self.driver.sha256_index_format = 'binary'
+        self.driver.compressor = self.driver._get_compressor(algorithm)
+        digests = hashlib.sha256(b'\0').digest() * 100
+
+        data, (header, read_digests), sha256file = (
+            self._write_and_read_sha256_index(digests))
+
+        self.assertLess(len(data), len(digests))
+        self.assertEqual(algorithm, header['compression'])
+        self.assertEqual(digests, read_digests)
+
+    def test_sha256_index_json(self):
+        digests = hashlib.sha256(b'a').digest() + hashlib.sha256(b'b').digest()
+
+        data, (header, read_digests), sha256file = (
+            self._write_and_read_sha256_index(digests))
+
+        self.assertEqual(digests, read_digests)
+        self.assertNotIn('sha256s', header)
+        self.assertEqual(self.driver.sha_block_size_bytes,
+                         header['chunk_size'])
+
+    def test_sha256_index_corrupted(self):
+        self.driver.sha256_index_format = 'binary'
+        obj_writer = TestObjectWriter('', '')
+        with mock.patch.object(self.driver, 'get_object_writer',
+                               return_value=obj_writer):
+            self.driver._write_sha256file(self.backup, 'volid', 'contain_name',
+                                          hashlib.sha256(b'a').digest())
+        with mock.patch.object(TestObjectReader, 'read',
+                               return_value=obj_writer.written_data[:-1]):
+            self.assertRaises(exception.InvalidBackup,
+                              self.driver._read_sha256_index, self.backup)
 
     def test_read_metadata(self):
         obj_reader = TestObjectReader('', '')
@@ -342,7 +471,7 @@ class ChunkedDriverTestCase(test.TestCase):
                               },
                              object_meta)
         self.assertDictEqual({'id': 1,
-                              'sha256s': [],
+                              'digests': bytearray(),
                               'prefix': 'test-',
                               },
                              object_sha256)
@@ -437,7 +566,7 @@ class ChunkedDriverTestCase(test.TestCase):
 
     @mock.patch('cinder.tests.unit.fake_notifier.FakeNotifier._notify')
     def test_backup(self, mock_notify):
-        volume_file = mock.Mock()
+        volume_file = mock.Mock(spec=['read', 'tell'])
         volume_file.tell.side_effect = [0, len(TEST_DATA)]
         volume_file.read.side_effect = [TEST_DATA, b'']
         obj_writer = TestObjectWriter('', '')
@@ -447,6 +576,356 @@ class ChunkedDriverTestCase(test.TestCase):
         self.assert_notify_called(mock_notify,
                                   (['INFO', 'backup.createprogress'],))
 
+    def test_backup_chunk_pipeline(self):
+        (object_meta, object_sha256, extra_metadata, container,
+         volume_size_bytes) = self.driver._prepare_backup(self.backup)
+        pipeline = mock.Mock()
+
+        self.driver._backup_chunk(self.backup, self.backup.container,
+                                  TEST_DATA, 0, object_meta, extra_metadata,
+                                  pipeline=pipeline)
+
+        self.assertEqual(
+            [{'test--00001': {'offset': 0, 'length': len(TEST_DATA)}}],
+            object_meta['list'])
+        self.assertEqual(2, object_meta['id'])
+        pipeline.submit.assert_called_once_with(
+            self.driver._write_chunk, self.backup.container, 'test--00001',
+            TEST_DATA, extra_metadata, object_meta['list'][0]['test--00001'])
+
+    @mock.patch('cinder.volume.volume_utils.notify_about_backup_usage')
+    def test_backup_pipelined(self, mock_notify):
+        self.driver.max_inflight_chunks = 2
+        self.driver.chunk_size_bytes = 4
+        self.driver.sha_block_size_bytes = 2
+        data = b'abcdefghijklmn'
+        writers = {}
+
+        def get_writer(container, object_name, extra_metadata=None):
+            writers[object_name] = TestObjectWriter(container, object_name)
+            return writers[object_name]
+
+        with mock.patch.object(self.driver, 'get_object_writer',
+                               side_effect=get_writer), \
+                mock.patch.object(self.driver,
+                                  '_finalize_backup') as mock_finalize:
+            self.driver.backup(self.backup, io.BytesIO(data),
+                               backup_metadata=False)
+
+        object_meta = mock_finalize.call_args[0][2]
+        self.assertEqual(['test--00001', 'test--00002', 'test--00003',
+                          'test--00004'],
+                         [list(obj)[0] for obj in object_meta['list']])
+        for obj in object_meta['list']:
+            (name, meta), = obj.items()
+            chunk = data[meta['offset']:meta['offset'] + meta['length']]
+            self.assertEqual(chunk, writers[name].written_data)
+            self.assertEqual(hashlib.md5(chunk).hexdigest(), meta['md5'])
+            self.assertEqual('none', meta['compression'])
+        self.assertEqual(7 * cbd.SHA256_DIGEST_SIZE,
+                         len(mock_finalize.call_args[0][3]['digests']))
+
+    @mock.patch.object(cbd, '_ChunkPipeline')
+    def test_backup_pipeline_failure(self, mock_pipeline):
+        self.driver.max_inflight_chunks = 2
+        pipeline = mock_pipeline.return_value
+        pipeline.submit.side_effect = exception.BackupOperationError()
+
+        self.assertRaises(exception.BackupOperationError,
+                          self.driver.backup,
+                          self.backup, io.BytesIO(TEST_DATA))
+
+        mock_pipeline.assert_called_once_with(2)
+        pipeline.wait.assert_not_called()
+        pipeline.shutdown.assert_called_once_with()
+
+    def test_chunk_pipeline_wait_for(self):
+        pipeline = cbd._ChunkPipeline(3)
+        self.addCleanup(pipeline.shutdown)
+        for i in range(3):
+            pipeline.submit(int, i)
+
+        pipeline.wait_for(2)
+
+        self.assertEqual(3, pipeline.submitted)
+        self.assertEqual(1, len(pipeline._futures))
+
+    def test_chunk_buffers(self):
+        pipeline = mock.Mock(submitted=0)
+        buffers = cbd._ChunkBuffers(16, 2, pipeline)
+
+        buf1 = buffers.get()
+        pipeline.submitted = 3
+        buf2 = buffers.get()
+        pipeline.submitted = 5
+
+        # The first buffer is reused once the jobs of its chunk are done
+        self.assertIs(buf1, buffers.get())
+        self.assertIsNot(buf1, buf2)
+        self.assertEqual(16, len(buf1))
+        self.assertEqual([mock.call(0), mock.call(0), mock.call(3)],
+                         pipeline.wait_for.call_args_list)
+
+    def test_read_chunk(self):
+        class ShortReader(io.RawIOBase):
+            def __init__(self, data):
+                self.data = data
+
+            def readinto(self, view):
+                count = min(3, len(view), len(self.data))
+                view[:count] = self.data[:count]
+                self.data = self.data[count:]
+                return count
+
+        volume_file = ShortReader(b'abcdefghij')
+        buf = bytearray(8)
+
+        data = cbd._read_chunk(volume_file, buf, 8)
+        self.assertEqual(b'abcdefgh', data)
+        self.assertIs(buf, data.obj)
+        self.assertEqual(b'ij', cbd._read_chunk(volume_file, buf, 8))
+        self.assertEqual(b'', cbd._read_chunk(volume_file, buf, 8))
+
+    def test_read_chunk_no_readinto(self):
+        volume_file = mock.Mock(spec=['read'])
+        volume_file.read.return_value = b'abc'
+
+        self.assertEqual(b'abc', cbd._read_chunk(volume_file,
+                                                 bytearray(8), 8))
+        volume_file.read.assert_called_once_with(8)
+
+    @mock.patch('cinder.volume.volume_utils.notify_about_backup_usage')
+    def _backup_sparse(self, data, mock_notify):
+        self.driver.sparse_backups = True
+        self.driver.chunk_size_bytes = 4
+        self.driver.sha_block_size_bytes = 2
+
+        with mock.patch.object(self.driver, 'get_object_writer',
+                               side_effect=TestObjectWriter), \
+                mock.patch.object(self.driver,
+                                  '_finalize_backup') as mock_finalize:
+            self.driver.backup(self.backup, io.BytesIO(data),
+                               backup_metadata=False)
+
+        object_meta = mock_finalize.call_args[0][2]
+        object_sha256 = mock_finalize.call_args[0][3]
+        self.assertEqual(
+            cbd._split_digests(self.driver._calculate_sha(data)),
+            cbd._split_digests(object_sha256['digests']))
+        return object_meta
+
+    def test_backup_sparse(self):
+        object_meta = self._backup_sparse(b'ab\0\0\0\0\0\0cd')
+
+        self.assertEqual(
+            [{'test--00001': {'offset': 0, 'length': 2, 'md5': mock.ANY,
+                              'compression': 'none'}},
+             {'test--00002': {'offset': 8, 'length': 2, 'md5': mock.ANY,
+                              'compression': 'none'}}],
+            object_meta['list'])
+        self.assertEqual([[2, 6]], object_meta['zero_extents'])
+
+    @mock.patch.object(cbd, '_get_hole_length', side_effect=[4, 0, 0])
+    def test_backup_sparse_hole(self, mock_hole):
+        # The first chunk is reported as a hole, so it's not read
+        object_meta = self._backup_sparse(b'\0\0\0\0abcd')
+
+        self.assertEqual(
+            [{'test--00001': {'offset': 4, 'length': 4, 'md5': mock.ANY,
+                              'compression': 'none'}}],
+            object_meta['list'])
+        self.assertEqual([[0, 4]], object_meta['zero_extents'])
+
+    def test_write_metadata_zero_extents(self):
+        obj_writer = TestObjectWriter('', '')
+        with mock.patch.object(self.driver, 'get_object_writer',
+                               return_value=obj_writer):
+            self.driver._write_metadata(self.backup, 'volid', 'contain_name',
+                                        ['obj1'], 'volume_meta',
+                                        zero_extents=[[0, 4]])
+
+        metadata = json.loads(obj_writer.written_data.decode('utf-8'))
+        self.assertEqual(self.driver.SPARSE_DRIVER_VERSION,
+                         metadata['version'])
+        self.assertEqual([[0, 4]], metadata['zero_extents'])
+
+    def _create_dedup_driver(self):
+        driver = MemoryChunkedDriver(self.ctxt)
+        driver.compressor = None
+        driver.dedup_backups = True
+        driver.chunk_size_bytes = 4
+        driver.sha_block_size_bytes = 2
+        return driver
+
+    def _get_dedup_objects(self, driver):
+        return {name: data for (container, name), data
+                in driver.objects.items()
+                if name.startswith(cbd.DEDUP_OBJECT_PREFIX) and
+                name != cbd.DEDUP_INDEX_NAME}
+
+    @mock.patch('cinder.volume.volume_utils.notify_about_backup_usage')
+    def test_backup_dedup(self, mock_notify):
+        driver = self._create_dedup_driver()
+        backup2 = self._create_backup_db_entry(volume_id=self.volume)
+
+        driver.backup(self.backup, io.BytesIO(b'abcdabcdefgh'),
+                      backup_metadata=False)
+        dedup_objects = self._get_dedup_objects(driver)
+        driver.backup(backup2, io.BytesIO(b'efghabcdefgh'),
+                      backup_metadata=False)
+
+        # The second backup didn't upload any chunk
+        self.assertEqual(dedup_objects, self._get_dedup_objects(driver))
+        self.assertEqual({b'abcd', b'efgh'}, set(dedup_objects.values()))
+        index = driver._read_dedup_index(self.backup.container)
+        self.assertEqual({2}, {entry['refcount'] for entry in index.values()})
+
+        metadata = driver._read_metadata(self.backup)
+        self.assertEqual(driver.DEDUP_DRIVER_VERSION, metadata['version'])
+        names = [list(obj)[0] for obj in metadata['objects']]
+        self.assertEqual(names[0], names[1])
+        for obj in metadata['objects']:
+            (name, meta), = obj.items()
+            self.assertIn(name, dedup_objects)
+            self.assertEqual(hashlib.md5(dedup_objects[name]).hexdigest(),
+                             meta['md5'])
+            self.assertEqual('none', meta['compression'])
+
+        # Objects are only deleted with the last backup that uses them
+        driver.delete_backup(self.backup)
+        self.assertEqual(dedup_objects, self._get_dedup_objects(driver))
+        index = driver._read_dedup_index(self.backup.container)
+        self.assertEqual({1}, {entry['refcount'] for entry in index.values()})
+
+        # and once the grace period expires
+        self.override_config('backup_dedup_gc_grace_period', 0)
+        driver.delete_backup(backup2)
+        self.assertEqual({}, self._get_dedup_objects(driver))
+        self.assertEqual({}, driver._read_dedup_index(self.backup.container))
+
+    @mock.patch('cinder.volume.volume_utils.notify_about_backup_usage')
+    def test_backup_dedup_concurrent_delete(self, mock_notify):
+        driver = self._create_dedup_driver()
+        driver.backup(self.backup, io.BytesIO(b'abcd'), backup_metadata=False)
+        dedup_objects = self._get_dedup_objects(driver)
+        backup2 = self._create_backup_db_entry(volume_id=self.volume)
+        register = driver._register_dedup_references
+
+        def delete_and_register(container, dedup):
+            # The backup found the chunk in the index when it started
+            self.assertEqual(set(dedup_objects), set(dedup.index))
+            driver.delete_backup(self.backup)
+            register(container, dedup)
+
+        with mock.patch.object(driver, '_register_dedup_references',
+                               side_effect=delete_and_register):
+            driver.backup(backup2, io.BytesIO(b'abcd'),
+                          backup_metadata=False)
+
+        self.assertEqual(dedup_objects, self._get_dedup_objects(driver))
+        index = driver._read_dedup_index(self.backup.container)
+        self.assertEqual([{'refcount': 1, 'compression': 'none',
+                           'md5': hashlib.md5(b'abcd').hexdigest()}],
+                         list(index.values()))
+
+    @mock.patch('cinder.volume.volume_utils.notify_about_backup_usage')
+    def test_restore_dedup(self, mock_notify):
+        driver = self._create_dedup_driver()
+        data = b'abcdabcdefgh'
+        driver.backup(self.backup, io.BytesIO(data), backup_metadata=False)
+        self.backup.status = fields.BackupStatus.RESTORING
+        self.backup.save()
+        volume_file = io.BytesIO(bytes(len(data)))
+
+        driver.restore(self.backup, self.volume, volume_file, False)
+
+        self.assertEqual(data, volume_file.getvalue())
+
+    @mock.patch('cinder.volume.volume_utils.notify_about_backup_usage')
+    def test_backup_dedup_failure(self, mock_notify):
+        driver = self._create_dedup_driver()
+        volume_file = mock.Mock(spec=['read', 'tell'])
+        volume_file.tell.side_effect = [0, 4]
+        volume_file.read.side_effect = [b'abcd', IOError]
+
+        self.assertRaises(IOError, driver.backup, self.backup, volume_file)
+
+        # The uploaded chunk is kept without references for later backups
+        dedup_objects = self._get_dedup_objects(driver)
+        self.assertEqual([b'abcd'], list(dedup_objects.values()))
+        index = driver._read_dedup_index(self.backup.container)
+        self.assertEqual({0}, {entry['refcount'] for entry in index.values()})
+
+        backup2 = self._create_backup_db_entry(volume_id=self.volume)
+        driver.backup(backup2, io.BytesIO(b'abcd'), backup_metadata=False)
+
+        self.assertEqual(dedup_objects, self._get_dedup_objects(driver))
+        index = driver._read_dedup_index(self.backup.container)
+        self.assertEqual({1}, {entry['refcount'] for entry in index.values()})
+
+    @mock.patch('cinder.volume.volume_utils.notify_about_backup_usage')
+    @mock.patch.object(cbd, 'time')
+    def test_delete_backup_dedup_garbage(self, mock_time, mock_notify):
+        self.override_config('backup_dedup_gc_grace_period', 100)
+        mock_time.time.return_value = 1000
+        driver = self._create_dedup_driver()
+        volume_file = mock.Mock(spec=['read', 'tell'])
+        volume_file.tell.side_effect = [0, 4]
+        volume_file.read.side_effect = [b'abcd', IOError]
+        self.assertRaises(IOError, driver.backup, self.backup, volume_file)
+        backup2 = self._create_backup_db_entry(volume_id=self.volume)
+        driver.backup(backup2, io.BytesIO(b'efgh'), backup_metadata=False)
+        backup3 = self._create_backup_db_entry(volume_id=self.volume)
+        driver.backup(backup3, io.BytesIO(b'efgh'), backup_metadata=False)
+
+        # The unreferenced chunk is kept during the grace period
+        mock_time.time.return_value = 1099
+        driver.delete_backup(backup2)
+        self.assertEqual({b'abcd', b'efgh'},
+                         set(self._get_dedup_objects(driver).values()))
+
+        # Chunks of deleted backups are kept for the grace period too
+        mock_time.time.return_value = 1100
+        driver.delete_backup(backup3)
+        self.assertEqual([b'efgh'],
+                         list(self._get_dedup_objects(driver).values()))
+        index = driver._read_dedup_index(self.backup.container)
+        self.assertEqual([{'refcount': 0, 'compression': 'none',
+                           'md5': hashlib.md5(b'efgh').hexdigest(),
+                           'unreferenced_at': 1100}],
+                         list(index.values()))
+
+        mock_time.time.return_value = 1200
+        driver._release_dedup_references(self.backup.container, set())
+        self.assertEqual({}, self._get_dedup_objects(driver))
+        self.assertEqual({}, driver._read_dedup_index(self.backup.container))
+
+    @mock.patch('cinder.volume.volume_utils.notify_about_backup_usage')
+    @mock.patch.object(cbd, 'time')
+    def test_backup_dedup_references_garbage(self, mock_time, mock_notify):
+        self.override_config('backup_dedup_gc_grace_period', 100)
+        mock_time.time.return_value = 1000
+        driver = self._create_dedup_driver()
+        volume_file = mock.Mock(spec=['read', 'tell'])
+        volume_file.tell.side_effect = [0, 4]
+        volume_file.read.side_effect = [b'abcd', IOError]
+        self.assertRaises(IOError, driver.backup, self.backup, volume_file)
+
+        # A chunk referenced again is no longer garbage
+        backup2 = self._create_backup_db_entry(volume_id=self.volume)
+        driver.backup(backup2, io.BytesIO(b'abcd'), backup_metadata=False)
+        backup3 = self._create_backup_db_entry(volume_id=self.volume)
+        driver.backup(backup3, io.BytesIO(b'abcd'), backup_metadata=False)
+        mock_time.time.return_value = 2000
+        driver.delete_backup(backup2)
+
+        self.assertEqual([b'abcd'],
+                         list(self._get_dedup_objects(driver).values()))
+        index = driver._read_dedup_index(self.backup.container)
+        self.assertEqual([{'refcount': 1, 'compression': 'none',
+                           'md5': hashlib.md5(b'abcd').hexdigest()}],
+                         list(index.values()))
+
     def test_backup_invalid_size(self):
         self.driver.chunk_size_bytes = 999
         self.driver.sha_block_size_bytes = 1024
@@ -468,7 +947,94 @@ class ChunkedDriverTestCase(test.TestCase):
             self.driver.restore(backup, self.volume, volume_file, False)
             self.assertEqual(2, mock_put.call_count)
 
-        restore_test.assert_called()
+        # The incremental backup has all the data of the full one
+        self.assertEqual(2, restore_test.call_count)
+        self.assertEqual({}, restore_test.call_args_list[0][1]['extents'])
+        self.assertEqual({'obj1': [(0, 1)]},
+                         restore_test.call_args_list[1][1]['extents'])
+        self.assertEqual([], restore_test.call_args_list[1][1]['zero_extents'])
+
+    def test_extent_map_claim(self):
+        extent_map = cbd._ExtentMap()
+
+        self.assertEqual([(10, 20)], extent_map.claim(10, 20))
+        self.assertEqual([(30, 40)], extent_map.claim(30, 40))
+        self.assertEqual([(5, 10), (20, 30), (40, 45)],
+                         extent_map.claim(5, 45))
+        self.assertEqual([], extent_map.claim(15, 35))
+        self.assertEqual([(45, 50)], extent_map.claim(45, 50))
+
+    def test_plan_restore(self):
+        def _metadata(*objs, zero_extents=None):
+            metadata = {'objects': [
+                {name: {'offset': offset, 'length': length}}
+                for name, offset, length in objs]}
+            if zero_extents:
+                metadata['zero_extents'] = zero_extents
+            return metadata
+
+        full = _metadata(('full-1', 0, 10), ('full-2', 10, 10),
+                         ('full-3', 20, 10))
+        incr1 = _metadata(('incr1-1', 5, 10), ('incr1-2', 25, 5))
+        incr2 = _metadata(('incr2-1', 8, 4), zero_extents=[[16, 12]])
+
+        plans = self.driver._plan_restore([incr2, incr1, full])
+
+        self.assertEqual([({'incr2-1': [(8, 12)]}, [(16, 28)]),
+                          ({'incr1-1': [(5, 8), (12, 15)],
+                            'incr1-2': [(28, 30)]}, []),
+                          ({'full-1': [(0, 5)],
+                            'full-2': [(15, 16)]}, [])],
+                         plans)
+
+    def _restore_v1_extents(self):
+        backup = self._create_backup_db_entry(
+            volume_id=self.volume, status=fields.BackupStatus.RESTORING)
+        metadata = {'objects': [
+            {'test-00001': {'offset': 0, 'length': 4, 'compression': 'none'}},
+            {'test-00002': {'offset': 4, 'length': 4, 'compression': 'none'}},
+            {'test-00003': {'offset': 8, 'length': 4, 'compression': 'none'}},
+        ]}
+        extents = {'test-00002': [(5, 7)], 'test-00003': [(8, 9), (11, 12)]}
+        volume_file = io.BytesIO(b'\0' * 12)
+
+        with mock.patch.object(self.driver, '_generate_object_names',
+                               return_value=['test-00001', 'test-00002',
+                                             'test-00003']), \
+                mock.patch.object(TestObjectReader, 'read',
+                                  return_value=b'abcd') as mock_read:
+            self.driver._restore_v1(backup, self.volume, metadata,
+                                    volume_file, False, backup,
+                                    extents=extents)
+
+        self.assertEqual(2, mock_read.call_count)
+        self.assertEqual(b'\0\0\0\0\0bc\0a\0\0d', volume_file.getvalue())
+
+    def test_restore_v1_extents(self):
+        self._restore_v1_extents()
+
+    def test_restore_v1_extents_pipelined(self):
+        self.driver.max_inflight_chunks = 2
+        self._restore_v1_extents()
+
+    def _restore_v1_zero_extents(self, volume_is_new):
+        backup = self._create_backup_db_entry(
+            volume_id=self.volume, status=fields.BackupStatus.RESTORING)
+        metadata = {'objects': [], 'zero_extents': [[2, 3], [8, 2]]}
+        volume_file = io.BytesIO(b'x' * 12)
+
+        with mock.patch.object(self.driver, '_generate_object_names',
+                               return_value=[]):
+            self.driver._restore_v1(backup, self.volume, metadata,
+                                    volume_file, volume_is_new, backup)
+        return volume_file.getvalue()
+
+    def test_restore_v1_zero_extents(self):
+        self.assertEqual(b'xx\0\0\0xxx\0\0xx',
+                         self._restore_v1_zero_extents(False))
+
+    def test_restore_v1_zero_extents_new_volume(self):
+        self.assertEqual(b'x' * 12, self._restore_v1_zero_extents(True))
 
     def test_delete_backup(self):
         with mock.patch.object(self.driver, 'delete_object') as mock_delete:
@@ -0,0 +1,84 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for the status monitor of the backups in progress."""
+
+from unittest import mock
+
+from cinder.backup import status_monitor
+from cinder import context
+from cinder.objects import fields
+from cinder.tests.unit import fake_constants as fake
+from cinder.tests.unit import test
+from cinder.tests.unit import utils as test_utils
+
+
+class BackupStatusMonitorTestCase(test.TestCase):
+    def setUp(self):
+        super(BackupStatusMonitorTestCase, self).setUp()
+        self.ctxt = context.get_admin_context()
+        self.monitor = status_monitor.BackupStatusMonitor()
+        self.volume = test_utils.create_volume(self.ctxt)
+
+    def _create_backup(self, status):
+        return test_utils.create_backup(self.ctxt, self.volume.id,
+                                        status=status)
+
+    def test_get_status(self):
+        self.flags(backup_status_check_interval=5)
+        backup = self._create_backup(fields.BackupStatus.CREATING)
+        backup2 = self._create_backup(fields.BackupStatus.RESTORING)
+        watch = self.monitor.watch(backup)
+        watch2 = self.monitor.watch(backup2)
+        backup.status = fields.BackupStatus.DELETING
+        backup.save()
+        backup2.destroy()
+
+        with mock.patch.object(self.monitor, '_poll',
+                               side_effect=self.monitor._poll) as mock_poll, \
+                mock.patch.object(status_monitor, 'time') as mock_time:
+            mock_time.monotonic.side_effect = [10, 12, 16]
+            # First poll
+            self.assertEqual(fields.BackupStatus.DELETING, watch.get_status())
+            # Not due yet
+            self.assertEqual(fields.BackupStatus.DELETED, watch2.get_status())
+            # Due again
+            watch2.get_status()
+
+        # All the watched backups are read with one query per poll
+        self.assertEqual(2, mock_poll.call_count)
+        mock_poll.assert_called_with([backup.id, backup2.id])
+
+    def test_watch_shared(self):
+        backup = self._create_backup(fields.BackupStatus.RESTORING)
+        watch = self.monitor.watch(backup)
+        self.assertIs(watch, self.monitor.watch(backup))
+
+        self.monitor.unwatch(watch)
+        self.monitor.notify(backup.id, fields.BackupStatus.AVAILABLE)
+        self.assertEqual(fields.BackupStatus.AVAILABLE, watch.status)
+
+        self.monitor.unwatch(watch)
+        self.assertIsNot(watch, self.monitor.watch(backup))
+
+    @mock.patch.object(status_monitor.BackupStatusMonitor, '_poll')
+    def test_notify(self, mock_poll):
+        self.flags(backup_status_check_interval=5)
+        backup = self._create_backup(fields.BackupStatus.CREATING)
+        watch = self.monitor.watch(backup)
+        self.monitor._last_poll = float('inf')
+
+        self.monitor.notify(backup.id, fields.BackupStatus.DELETING)
+        self.monitor.notify(fake.BACKUP2_ID, fields.BackupStatus.DELETING)
+
+        self.assertEqual(fields.BackupStatus.DELETING, watch.get_status())
+        mock_poll.assert_not_called()
@@ -440,6 +440,14 @@ class MigrationsWalk(
         self.assertEqual({'backups', 'backup_gigabytes'},
                          {r[0] for r in res})
 
+    def _check_4437bdd33d5f(self, connection):
+        """Test image volume cache entries have hit statistics."""
+        entries = db_utils.get_table(connection, 'image_volume_cache_entries')
+        self.assertIn('created_at', entries.c)
+        self.assertTrue(entries.c.created_at.nullable)
+        self.assertIn('hit_count', entries.c)
+        self.assertFalse(entries.c.hit_count.nullable)
+
     # TODO: (D Release) Uncomment method _check_afd7494d43b7 and create a
     # migration with hash afd7494d43b7 using the following command:
     #   $ tox -e venv -- alembic -c cinder/db/alembic.ini revision \
@@ -13,6 +13,7 @@
 #    under the License.
 
 from datetime import timedelta
+import threading
 from unittest import mock
 
 import ddt
@@ -131,6 +132,46 @@ class ImageVolumeCacheTestCase(test.TestCase):
         self.assertEqual(entry['image_id'], msg['payload']['image_id'])
         self.assertEqual(1, len(self.notifier.notifications))
 
+    @ddt.data((True, True, 'cluster'), (True, False, 'cluster'),
+              (False, True, 'foo@bar'), (False, False, 'foo@bar#whatever'))
+    @ddt.unpack
+    def test_get_scope(self, clustered, clone_across_pools, expected):
+        cache = self._build_cache()
+        if not clustered:
+            self.volume_ovo.cluster_name = None
+        self.assertEqual(expected, cache.get_scope(
+            self.volume_ovo, clone_across_pools=clone_across_pools))
+
+    def test_pending_entry(self):
+        cache = self._build_cache()
+        image_id = fake.IMAGE_ID
+        other_volume = objects.Volume(self.context, id=fake.VOLUME2_ID,
+                                      host='foo@bar#other',
+                                      cluster_name=None)
+        self.volume_ovo.cluster_name = None
+        results = []
+
+        def wait():
+            with cache.pending_entry(self.volume_ovo, image_id) as first:
+                results.append(first)
+
+        with cache.pending_entry(self.volume_ovo, image_id) as first:
+            self.assertTrue(first)
+            waiter = threading.Thread(target=wait)
+            waiter.start()
+            # Other backends don't wait
+            with cache.pending_entry(other_volume, image_id) as other_first:
+                self.assertTrue(other_first)
+            waiter.join(0.1)
+            self.assertEqual([], results)
+
+        waiter.join()
+        self.assertEqual([False], results)
+        self.assertEqual({}, cache._pending)
+        # The next creates populate the cache again if it has no entry
+        with cache.pending_entry(self.volume_ovo, image_id) as first:
+            self.assertTrue(first)
+
     def test_get_entry_not_exists(self):
         cache = self._build_cache()
         image_meta = {
@@ -296,6 +337,121 @@ class ImageVolumeCacheTestCase(test.TestCase):
         mock_delete.assert_any_call(self.context, entry2, mock.ANY)
         mock_delete.assert_any_call(self.context, entry3, mock.ANY)
 
+    def _build_scored_entry(self, image_id, size, hit_count, age_hours):
+        created_at = timeutils.utcnow() - timedelta(hours=age_hours)
+        return {'id': image_id, 'image_id': image_id, 'host': 'foo@bar',
+                'volume_id': image_id, 'image_updated_at': created_at,
+                'size': size, 'created_at': created_at,
+                'last_used': created_at, 'hit_count': hit_count}
+
+    def test_ensure_space_cost_policy(self):
+        cache = self._build_cache(max_gb=30)
+        cache.eviction_policy = 'cost'
+        mock_delete = mock.patch.object(cache, 'delete_cached_volume').start()
+        # Most recently used first
+        small_rare = self._build_scored_entry('image1', 2, 0, 10)
+        large_popular = self._build_scored_entry('image2', 12, 100, 10)
+        large_rare = self._build_scored_entry('image3', 12, 1, 10)
+        self.mock_db.image_volume_cache_get_all.return_value = [
+            large_rare, small_rare, large_popular]
+
+        self.volume_ovo.size = 10
+        has_space = cache.ensure_space(self.context, self.volume_ovo)
+
+        # LRU would evict the popular entry instead
+        self.assertTrue(has_space)
+        mock_delete.assert_called_once_with(self.context, large_rare,
+                                            mock.ANY)
+
+    @ddt.data('lru', 'cost')
+    def test_ensure_space_pinned(self, eviction_policy):
+        cache = self._build_cache(max_gb=30)
+        cache.eviction_policy = eviction_policy
+        cache.pinned_images = ['image1']
+        mock_delete = mock.patch.object(cache, 'delete_cached_volume').start()
+        pinned = self._build_scored_entry('image1', 12, 0, 10)
+        entry = self._build_scored_entry('image2', 12, 0, 1)
+        self.mock_db.image_volume_cache_get_all.return_value = [entry,
+                                                                pinned]
+
+        self.volume_ovo.size = 10
+        self.assertTrue(cache.ensure_space(self.context, self.volume_ovo))
+        mock_delete.assert_called_once_with(self.context, entry, mock.ANY)
+
+        mock_delete.reset_mock()
+        self.volume_ovo.size = 20
+        self.assertFalse(cache.ensure_space(self.context, self.volume_ovo))
+        mock_delete.assert_called_once_with(self.context, entry, mock.ANY)
+
+    def test_ensure_space_pinned_count(self):
+        cache = self._build_cache(max_gb=0, max_count=2)
+        cache.pinned_images = ['image1', 'image2']
+        mock_delete = mock.patch.object(cache, 'delete_cached_volume').start()
+        self.mock_db.image_volume_cache_get_all.return_value = [
+            self._build_scored_entry('image1', 12, 0, 1),
+            self._build_scored_entry('image2', 12, 0, 1)]
+
+        self.volume_ovo.size = 1
+        self.assertFalse(cache.ensure_space(self.context, self.volume_ovo))
+        mock_delete.assert_not_called()
+
+    def test_has_space(self):
+        cache = self._build_cache(max_gb=30, max_count=2)
+        self.mock_db.image_volume_cache_get_all.return_value = [
+            self._build_scored_entry('image1', 12, 0, 1)]
+
+        self.volume_ovo.size = 18
+        self.assertTrue(cache.has_space(self.context, self.volume_ovo))
+        self.volume_ovo.size = 19
+        self.assertFalse(cache.has_space(self.context, self.volume_ovo))
+        cache.max_cache_size_count = 1
+        self.volume_ovo.size = 1
+        self.assertFalse(cache.has_space(self.context, self.volume_ovo))
+
+    def test_can_fit(self):
+        cache = self._build_cache(max_gb=30, max_count=2)
+        cache.pinned_images = ['image1']
+        self.mock_db.image_volume_cache_get_all.return_value = [
+            self._build_scored_entry('image1', 12, 0, 1),
+            self._build_scored_entry('image2', 12, 0, 1)]
+
+        # Entries that aren't pinned can be evicted
+        self.volume_ovo.size = 18
+        self.assertTrue(cache.can_fit(self.context, self.volume_ovo))
+        self.volume_ovo.size = 19
+        self.assertFalse(cache.can_fit(self.context, self.volume_ovo))
+        cache.max_cache_size_count = 1
+        self.volume_ovo.size = 1
+        self.assertFalse(cache.can_fit(self.context, self.volume_ovo))
+
+    def test_has_entry(self):
+        cache = self._build_cache()
+        self.mock_db.image_volume_cache_get_all.return_value = []
+
+        self.assertFalse(cache.has_entry(self.context, self.volume_ovo,
+                                         fake.IMAGE_ID))
+        self.mock_db.image_volume_cache_get_all.assert_called_once_with(
+            self.context, image_id=fake.IMAGE_ID,
+            cluster_name=self.volume_ovo.cluster_name)
+        # Checking for an entry is not a hit
+        self.mock_db.image_volume_cache_get_and_update_last_used.\
+            assert_not_called()
+
+    def test_get_warm_images(self):
+        cache = self._build_cache()
+        self.assertEqual([], cache.get_warm_images(self.context))
+        self.mock_db.image_volume_cache_get_popular_images.assert_not_called()
+
+        cache.pinned_images = ['image1']
+        cache.warm_count = 2
+        self.mock_db.image_volume_cache_get_popular_images.return_value = [
+            'image2', 'image1', 'image3', 'image4']
+
+        self.assertEqual(['image1', 'image2', 'image3'],
+                         cache.get_warm_images(self.context))
+        self.mock_db.image_volume_cache_get_popular_images.\
+            assert_called_once_with(self.context, 3)
+
     def test_ensure_space_cant_free_enough_gb(self):
         cache = self._build_cache(max_gb=30, max_count=10)
         mock_delete = mock.patch.object(cache, 'delete_cached_volume').start()
@@ -0,0 +1,141 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for the image download cache."""
+
+import hashlib
+import os
+from unittest import mock
+
+import fixtures
+
+from cinder import exception
+from cinder.image import download_cache
+from cinder.tests.unit import test
+
+
+def _image_meta(image_id, data):
+    return {'id': image_id,
+            'size': len(data),
+            'os_hash_algo': 'sha512',
+            'os_hash_value': hashlib.sha512(data).hexdigest()}
+
+
+def _downloader(data):
+    def download(path):
+        with open(path, 'wb') as f:
+            f.write(data)
+    return mock.Mock(side_effect=download)
+
+
+class ImageDownloadCacheTestCase(test.TestCase):
+    def setUp(self):
+        super(ImageDownloadCacheTestCase, self).setUp()
+        self.cache_dir = self.useFixture(fixtures.TempDir()).path
+        self.cache = download_cache.ImageDownloadCache(self.cache_dir, 1)
+
+    def test_get_downloads_once(self):
+        data = b'image data'
+        image_meta = _image_meta('image1', data)
+        download = _downloader(data)
+
+        with self.cache.get(image_meta, download) as path:
+            with open(path, 'rb') as f:
+                self.assertEqual(data, f.read())
+        with self.cache.get(image_meta, download) as path2:
+            self.assertEqual(path, path2)
+
+        download.assert_called_once_with(path + download_cache.PART_SUFFIX)
+        self.assertEqual([os.path.basename(path)], os.listdir(self.cache_dir))
+
+    def test_get_md5_checksum(self):
+        data = b'image data'
+        image_meta = {'id': 'image1', 'size': len(data),
+                      'checksum': hashlib.md5(
+                          data, usedforsecurity=False).hexdigest()}
+
+        with self.cache.get(image_meta, _downloader(data)) as path:
+            self.assertIsNotNone(path)
+
+    def test_get_hash_mismatch(self):
+        image_meta = _image_meta('image1', b'image data')
+
+        def get():
+            with self.cache.get(image_meta, _downloader(b'other data')):
+                pass
+
+        self.assertRaises(exception.ImageDownloadFailed, get)
+        self.assertEqual([], os.listdir(self.cache_dir))
+
+    def test_get_not_cacheable(self):
+        data = b'image data'
+        download = _downloader(data)
+        no_hash = {'id': 'image1', 'size': len(data)}
+        too_large = _image_meta('image2', data)
+        self.cache.max_cache_size = len(data) - 1
+
+        for image_meta in (no_hash, too_large):
+            with self.cache.get(image_meta, download) as path:
+                self.assertIsNone(path)
+
+        download.assert_not_called()
+
+    def _add(self, image_id, data, mtime):
+        with self.cache.get(_image_meta(image_id, data),
+                            _downloader(data)) as path:
+            os.utime(path, (mtime, mtime))
+        return path
+
+    def test_get_evicts_least_recently_used(self):
+        self.cache.max_cache_size = 10
+        path1 = self._add('image1', b'1111', 1)
+        path2 = self._add('image2', b'2222', 2)
+        # Using the first image makes it the most recently used
+        with self.cache.get(_image_meta('image1', b'1111'),
+                            mock.Mock()):
+            pass
+
+        path3 = self._add('image3', b'3333', 3)
+
+        self.assertEqual(sorted(os.path.basename(path)
+                                for path in (path1, path3)),
+                         sorted(os.listdir(self.cache_dir)))
+        self.assertFalse(os.path.exists(path2))
+
+    def test_get_keeps_images_in_use(self):
+        self.cache.max_cache_size = 8
+        download = _downloader(b'3333')
+        path1 = self._add('image1', b'1111', 1)
+
+        with self.cache.get(_image_meta('image1', b'1111'),
+                            mock.Mock()):
+            path2 = self._add('image2', b'2222', 2)
+            # Both images are in use while the third one is downloaded
+            with self.cache.get(_image_meta('image2', b'2222'),
+                                mock.Mock()):
+                with self.cache.get(_image_meta('image3', b'3333'),
+                                    download) as path3:
+                    self.assertIsNone(path3)
+
+        download.assert_not_called()
+        self.assertTrue(os.path.exists(path1))
+        self.assertTrue(os.path.exists(path2))
+
+    def test_get_cache(self):
+        self.assertIsNone(download_cache.get_cache())
+
+        self.flags(image_download_cache_size_gb=2,
+                   image_download_cache_dir=self.cache_dir)
+        cache = download_cache.get_cache()
+
+        self.assertEqual(self.cache_dir, cache.cache_dir)
+        self.assertEqual(2 * 1024 ** 3, cache.max_cache_size)
@@ -15,11 +15,14 @@
 
 
 import datetime
+import hashlib
 import itertools
+import os
 import traceback
 from unittest import mock
 
 import ddt
+import fixtures
 import glanceclient.exc
 from keystoneauth1 import loading as ksloading
 from keystoneauth1.loading import session as ks_session
@@ -1052,6 +1055,66 @@ class TestGlanceImageService(test.TestCase):
         self.assertRaises(exception.ImageNotFound, service.download,
                           self.context, image_id, writer)
 
+    def _download_segments(self, data, checksum=None, ranges=True):
+        """Download data with 3 segments, returning the calls to glance."""
+        self.flags(glance_download_concurrency=2,
+                   glance_download_segment_size_mb=1)
+        client = mock.Mock()
+
+        def call(context, method, *args, **kwargs):
+            if method == 'data':
+                return iter([data])
+            start, end = map(int, kwargs['headers']['Range'][6:].split('-'))
+            if not ranges:
+                resp = mock.Mock(status_code=200, headers={})
+                return resp, iter([data])
+            content_range = 'bytes %d-%d/%d' % (start, end, len(data))
+            resp = mock.Mock(status_code=206,
+                             headers={'Content-Range': content_range})
+            return resp, iter([data[start:end + 1]])
+
+        client.call.side_effect = call
+        service = glance.GlanceImageService(client=client)
+        image_meta = {'size': len(data),
+                      'checksum': checksum or hashlib.md5(
+                          data, usedforsecurity=False).hexdigest()}
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                            'image')
+        with mock.patch.object(service, 'show', return_value=image_meta), \
+                open(path, 'wb') as image_file:
+            service.download(self.context, 'image1', image_file)
+        with open(path, 'rb') as image_file:
+            self.assertEqual(data, image_file.read())
+        return client.call.call_args_list
+
+    def test_download_segments(self):
+        data = os.urandom(2 * 1024 * 1024 + 1024)
+
+        calls = self._download_segments(data)
+
+        ranges = [c.kwargs['headers']['Range'] for c in calls]
+        self.assertEqual(['bytes=0-1048575', 'bytes=1048576-2097151',
+                          'bytes=2097152-2098175'], ranges)
+        for c in calls:
+            self.assertEqual(
+                mock.call(self.context, 'get', '/v2/images/image1/file',
+                          headers=mock.ANY, controller='http_client'), c)
+
+    def test_download_segments_ranges_unsupported(self):
+        data = os.urandom(2 * 1024 * 1024)
+
+        calls = self._download_segments(data, ranges=False)
+
+        # The image is downloaded with a single request instead
+        self.assertEqual(2, len(calls))
+        self.assertEqual(mock.call(self.context, 'data', 'image1'), calls[1])
+
+    def test_download_segments_hash_mismatch(self):
+        data = os.urandom(2 * 1024 * 1024)
+
+        self.assertRaises(exception.ImageDownloadFailed,
+                          self._download_segments, data, checksum='0' * 32)
+
     @mock.patch('builtins.open', new_callable=mock.mock_open)
     @mock.patch('shutil.copyfileobj')
     @mock.patch('cinder.image.glance.get_api_servers',
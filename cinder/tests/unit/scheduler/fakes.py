@@ -253,6 +253,7 @@ class FakeHostManager(host_manager.HostManager):
         self.weight_classes = helpers.ALL_WEIGHER_CLASSES[:]
 
         self._no_capabilities_backends = set()  # Services without capabilities
+        self._capabilities_reports = {}
         self._update_backend_state_map(cinder_context.get_admin_context())
         self.service_states_last_update = {}
 
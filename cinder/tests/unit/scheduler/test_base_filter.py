@@ -102,6 +102,13 @@ class FilterB(base_filter.BaseFilter):
         return None
 
 
+class FilterEven(base_filter.BaseFilter):
+    run_parallel = True
+
+    def _filter_one(self, obj, filter_properties):
+        return obj % 2 == 0
+
+
 class FakeExtensionManager(list):
 
     def __init__(self, namespace):
@@ -154,6 +161,29 @@ class TestBaseFilterHandler(test.TestCase):
         result = self._get_filtered_objects(filter_classes)
         self.assertEqual(filter_objs_expected, result)
 
+    def test_get_filtered_objects_parallel(self):
+        self.handler.init_executor(2)
+        self.addCleanup(self.handler._executor.shutdown)
+
+        with mock.patch.object(self.handler, '_filter_parallel',
+                               wraps=self.handler._filter_parallel
+                               ) as mock_filter_parallel:
+            result = self.handler.get_filtered_objects(
+                [FilterEven], list(range(10)), {})
+
+        self.assertEqual([0, 2, 4, 6, 8], result)
+        mock_filter_parallel.assert_called_once()
+
+    def test_get_filtered_objects_parallel_custom_filter_all(self):
+        self.handler.init_executor(2)
+        self.addCleanup(self.handler._executor.shutdown)
+        FilterA.run_parallel = True
+        self.addCleanup(setattr, FilterA, 'run_parallel', False)
+
+        result = self._get_filtered_objects([FilterA])
+
+        self.assertEqual([2, 3, 4], result)
+
     def test_get_filtered_objects_with_filter_run_once(self):
         filter_objs_expected = [1, 2, 3, 4]
         filter_classes = [FakeFilter5]
@@ -0,0 +1,192 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for the scheduler shared capacity ledger."""
+
+import datetime
+from unittest import mock
+
+from oslo_utils import timeutils
+from tooz import coordination as tooz_coordination
+
+from cinder.scheduler import capacity_ledger
+from cinder.scheduler import host_manager
+from cinder.tests.unit.scheduler import helpers
+from cinder.tests.unit import test
+
+
+class CapacityLedgerTestCase(test.TestCase):
+    def setUp(self):
+        super(CapacityLedgerTestCase, self).setUp()
+        members = {}
+        self.ledger = capacity_ledger.CapacityLedger('sched1', members)
+        self.other = capacity_ledger.CapacityLedger('sched2', members)
+
+    def test_get_foreign_reservations(self):
+        now = datetime.datetime(2024, 1, 1, 10, 0, 0)
+        with mock.patch.object(timeutils, 'utcnow', return_value=now):
+            self.ledger.reserve('host1@lvm#pool1', 10)
+            self.other.reserve('host1@lvm#pool1', 20)
+            self.other.reserve('host1@lvm#pool2', -5)
+
+        self.assertEqual({'host1@lvm#pool1': [(20, now)],
+                          'host1@lvm#pool2': [(-5, now)]},
+                         self.ledger.get_foreign_reservations())
+        self.assertEqual({'host1@lvm#pool1': [(10, now)]},
+                         self.other.get_foreign_reservations())
+
+    def test_reconcile(self):
+        before = datetime.datetime(2024, 1, 1, 10, 0, 0)
+        after = datetime.datetime(2024, 1, 1, 10, 0, 10)
+        with mock.patch.object(timeutils, 'utcnow', return_value=before):
+            self.other.reserve('host1@lvm#pool1', 10)
+            self.other.reserve('host2@lvm#pool1', 10)
+        with mock.patch.object(timeutils, 'utcnow', return_value=after):
+            self.other.reserve('host1@lvm#pool1', 20)
+
+        self.other.reconcile('host1@lvm',
+                             datetime.datetime(2024, 1, 1, 10, 0, 5))
+
+        self.assertEqual({'host1@lvm#pool1': [(20, after)],
+                          'host2@lvm#pool1': [(10, before)]},
+                         self.ledger.get_foreign_reservations())
+
+
+class CoordinationCapacityLedgerTestCase(test.TestCase):
+    def setUp(self):
+        super(CoordinationCapacityLedgerTestCase, self).setUp()
+        self.coordinator = mock.MagicMock(prefix='cinder-',
+                                          agent_id='sched1')
+        self.tooz = self.coordinator.coordinator
+        self.ledger = capacity_ledger.CoordinationCapacityLedger(
+            self.coordinator)
+
+    def test_reserve(self):
+        self.tooz.create_group.return_value.get.side_effect = (
+            tooz_coordination.GroupAlreadyExist(
+                capacity_ledger.GROUP_NAME))
+
+        self.ledger.reserve('host1@lvm#pool1', 10)
+        self.ledger.reserve('host1@lvm#pool1', 20)
+
+        self.coordinator.start.assert_called_once_with()
+        self.tooz.join_group.assert_called_once_with(
+            capacity_ledger.GROUP_NAME)
+        self.assertEqual(2, self.tooz.update_capabilities.call_count)
+        group, reservations = self.tooz.update_capabilities.call_args[0]
+        self.assertEqual(capacity_ledger.GROUP_NAME, group)
+        self.assertEqual([10, 20],
+                         [r[0] for r in reservations['host1@lvm#pool1']])
+
+    def test_get_foreign_reservations(self):
+        self.tooz.get_members.return_value.get.return_value = {
+            b'cinder-sched1', b'cinder-sched2', b'cinder-sched3'}
+        timestamp = '2024-01-01T10:00:00.000000'
+        capabilities = {
+            b'cinder-sched1': {'host1@lvm#pool1': [[5, timestamp]]},
+            b'cinder-sched2': {'host1@lvm#pool1': [[10, timestamp]]},
+        }
+
+        def get_member_capabilities(group, member):
+            result = mock.Mock()
+            if member in capabilities:
+                result.get.return_value = capabilities[member]
+            else:
+                result.get.side_effect = tooz_coordination.MemberNotJoined(
+                    group, member)
+            return result
+
+        self.tooz.get_member_capabilities.side_effect = (
+            get_member_capabilities)
+
+        self.assertEqual(
+            {'host1@lvm#pool1': [(10, datetime.datetime(2024, 1, 1, 10))]},
+            self.ledger.get_foreign_reservations())
+
+    def test_lock(self):
+        with self.ledger.lock('host1@lvm#pool1'):
+            pass
+
+        self.coordinator.get_lock.assert_called_once_with(
+            'scheduler-ledger-host1@lvm#pool1')
+
+
+class HostManagerCapacityLedgerTestCase(test.TestCase):
+    def setUp(self):
+        super(HostManagerCapacityLedgerTestCase, self).setUp()
+        self.mock_object(host_manager.HostManager,
+                         '_update_backend_state_map')
+        members = {}
+        with mock.patch('cinder.scheduler.filters.BackendFilterHandler.'
+                        'get_all_classes',
+                        return_value=helpers.ALL_FILTER_CLASSES[:]):
+            self.host_manager = host_manager.HostManager()
+        self.host_manager.shared_capacity_ledger = (
+            capacity_ledger.CapacityLedger('sched1', members))
+        self.other_ledger = capacity_ledger.CapacityLedger('sched2', members)
+        self.reported_at = datetime.datetime(2024, 1, 1, 10, 0, 0)
+        self.pool = host_manager.PoolState('host1@lvm', None, {}, 'pool1')
+        self.pool.update_from_volume_capability(
+            {'total_capacity_gb': 100, 'free_capacity_gb': 100,
+             'allocated_capacity_gb': 0, 'timestamp': self.reported_at})
+
+    def _reserve(self, size, timestamp):
+        with mock.patch.object(timeutils, 'utcnow', return_value=timestamp):
+            self.other_ledger.reserve(self.pool.backend_id, size)
+
+    def test_apply_capacity_ledger(self):
+        self._reserve(50, self.reported_at - datetime.timedelta(seconds=1))
+        self._reserve(10, self.reported_at + datetime.timedelta(seconds=1))
+
+        self.host_manager._apply_capacity_ledger([self.pool])
+        self.assertEqual(90, self.pool.free_capacity_gb)
+        self.assertEqual(10, self.pool.allocated_capacity_gb)
+
+        # Already applied reservations are not consumed again
+        self.host_manager._apply_capacity_ledger([self.pool])
+        self.assertEqual(90, self.pool.free_capacity_gb)
+
+        # Reconciled reservations are given back
+        self.other_ledger.reconcile('host1@lvm', datetime.datetime.max)
+        self.host_manager._apply_capacity_ledger([self.pool])
+        self.assertEqual(100, self.pool.free_capacity_gb)
+
+    def test_apply_capacity_ledger_new_report(self):
+        self._reserve(10, self.reported_at + datetime.timedelta(seconds=1))
+        self.host_manager._apply_capacity_ledger([self.pool])
+
+        self.pool.update_from_volume_capability(
+            {'total_capacity_gb': 100, 'free_capacity_gb': 80,
+             'allocated_capacity_gb': 20,
+             'timestamp': self.reported_at + datetime.timedelta(seconds=2)})
+        self.host_manager._apply_capacity_ledger([self.pool])
+
+        self.assertEqual(80, self.pool.free_capacity_gb)
+        self.assertEqual(0, self.pool.ledger_consumed_gb)
+
+    def test_consume_from_volume(self):
+        self._reserve(10, self.reported_at + datetime.timedelta(seconds=1))
+
+        self.host_manager.consume_from_volume(self.pool, {'size': 5})
+
+        self.assertEqual(85, self.pool.free_capacity_gb)
+        self.assertEqual(
+            [5], [r[0] for r in self.other_ledger.get_foreign_reservations()[
+                self.pool.backend_id]])
+
+    def test_consume_from_volume_no_ledger(self):
+        self.host_manager.shared_capacity_ledger = None
+
+        self.host_manager.consume_from_volume(self.pool, {'size': 5})
+
+        self.assertEqual(95, self.pool.free_capacity_gb)
+        self.assertEqual({}, self.other_ledger.get_foreign_reservations())
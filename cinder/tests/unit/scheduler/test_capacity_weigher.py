@@ -416,3 +416,16 @@ class CapacityWeigherTestCase(test.TestCase):
         self.assertEqual(-1.0, worst_host.weight)
         self.assertEqual('host5',
                          volume_utils.extract_host(worst_host.obj.host))
+
+    def test_capacity_weight_all_infinite(self):
+        self.flags(capacity_weight_multiplier=-1.0)
+        backends = [fakes.FakeBackendState('host%s' % i,
+                                           {'total_capacity_gb': 'infinite',
+                                            'free_capacity_gb': 'infinite'})
+                    for i in range(1, 3)]
+
+        weighed_hosts = self._get_weighed_hosts(backends)
+
+        self.assertEqual(['host1', 'host2'],
+                         [w.obj.host for w in weighed_hosts])
+        self.assertEqual([0.0, 0.0], [w.weight for w in weighed_hosts])
@@ -181,6 +181,61 @@ class FilterSchedulerTestCase(test_scheduler.SchedulerTestCase):
         self.assertIsNotNone(weighed_host.obj)
         self.assertTrue(_mock_service_get_all.called)
 
+    @mock.patch('cinder.volume.rpcapi.VolumeAPI.create_volume')
+    @mock.patch('cinder.scheduler.driver.volume_update_db')
+    @mock.patch('cinder.db.api.service_get_all')
+    def test_schedule_create_volumes(self, _mock_service_get_all,
+                                     _mock_vol_update, _mock_vol_create):
+        sched = fakes.FakeFilterScheduler()
+        fake_context = context.RequestContext('user', 'project',
+                                              is_admin=True)
+        fakes.mock_host_manager_db_calls(_mock_service_get_all)
+
+        volume_ids = (fake.VOLUME_ID, fake.VOLUME2_ID, fake.VOLUME3_ID)
+        request_spec_list = [
+            objects.RequestSpec.from_primitives(
+                {'volume_type': {'name': 'LVM_iSCSI'},
+                 'volume_properties': {'project_id': 1, 'size': 1},
+                 'volume_id': volume_id})
+            for volume_id in volume_ids]
+        filter_properties_list = [{} for __ in volume_ids]
+
+        with mock.patch.object(sched.host_manager, 'get_all_backend_states',
+                               wraps=sched.host_manager.
+                               get_all_backend_states) as mock_get_all:
+            results = sched.schedule_create_volumes(fake_context,
+                                                    request_spec_list,
+                                                    filter_properties_list)
+            mock_get_all.assert_called_once()
+
+        self.assertEqual([None, None, None], results)
+        self.assertEqual(3, _mock_vol_create.call_count)
+        self.assertEqual(
+            list(volume_ids),
+            [call[0][1] for call in _mock_vol_update.call_args_list])
+        for filter_properties in filter_properties_list:
+            self.assertEqual(1, filter_properties['retry']['num_attempts'])
+            self.assertEqual(1, len(filter_properties['retry']['backends']))
+
+    @mock.patch('cinder.volume.rpcapi.VolumeAPI.create_volume')
+    def test_schedule_create_volumes_no_hosts(self, _mock_vol_create):
+        sched = fakes.FakeFilterScheduler()
+        fake_context = context.RequestContext('user', 'project')
+        request_spec_list = [
+            objects.RequestSpec.from_primitives(
+                {'volume_type': {'name': 'LVM_iSCSI'},
+                 'volume_properties': {'project_id': 1, 'size': 1},
+                 'volume_id': volume_id})
+            for volume_id in (fake.VOLUME_ID, fake.VOLUME2_ID)]
+
+        results = sched.schedule_create_volumes(fake_context,
+                                                request_spec_list, [{}, {}])
+
+        self.assertEqual(2, len(results))
+        for result in results:
+            self.assertIsInstance(result, exception.NoValidBackend)
+        _mock_vol_create.assert_not_called()
+
     @ddt.data(('host10@BackendA', True),
               ('host10@BackendB#openstack_nfs_1', True),
               ('host10', False))
@@ -24,6 +24,7 @@ from cinder import context
 from cinder.db import api as db
 from cinder import exception
 from cinder.scheduler import filters
+from cinder.scheduler.filters import capabilities_filter
 from cinder.scheduler.filters import extra_specs_ops
 from cinder.tests.unit import fake_constants as fake
 from cinder.tests.unit.scheduler import fakes
@@ -718,6 +719,37 @@ class AffinityFilterTestCase(BackendFiltersTestCase):
 
         self.assertFalse(filt_cls.backend_passes(host, filter_properties))
 
+    def test_different_filter_loads_volumes_once(self):
+        filt_cls = self.class_map['DifferentBackendFilter']()
+        volume = utils.create_volume(self.context, host='host1@lvm#pool1')
+        backends = [fakes.FakeBackendState('host1@lvm#pool0', {}),
+                    fakes.FakeBackendState('host1@lvm#pool1', {}),
+                    fakes.FakeBackendState('host2@lvm#pool1', {})]
+
+        filter_properties = {'context': self.context.elevated(),
+                             'scheduler_hints': {
+            'different_host': [volume.id], }}
+
+        with mock.patch.object(filt_cls.volume_api, 'get_all',
+                               wraps=filt_cls.volume_api.get_all) as get_all:
+            result = list(filt_cls.filter_all(backends, filter_properties))
+
+        self.assertEqual([backends[0], backends[2]], result)
+        get_all.assert_called_once()
+
+    def test_same_filter_cluster_passes(self):
+        filt_cls = self.class_map['SameBackendFilter']()
+        host = fakes.FakeBackendState('host2@lvm#pool0',
+                                      {'cluster_name': 'cluster@lvm#pool0'})
+        volume = utils.create_volume(self.context, host='host1@lvm#pool0',
+                                     cluster_name='cluster@lvm#pool0')
+
+        filter_properties = {'context': self.context.elevated(),
+                             'scheduler_hints': {
+            'same_host': [volume.id], }}
+
+        self.assertTrue(filt_cls.backend_passes(host, filter_properties))
+
     def test_same_filter_no_list_passes(self):
         filt_cls = self.class_map['SameBackendFilter']()
         host = fakes.FakeBackendState('host1', {})
@@ -752,8 +784,7 @@ class AffinityFilterTestCase(BackendFiltersTestCase):
                              'scheduler_hints': {
             'same_host': [vol_id], }}
 
-        result = filt_cls.backend_passes(host, filter_properties)
-        self.assertEqual([], result.objects)
+        self.assertFalse(filt_cls.backend_passes(host, filter_properties))
 
     def test_same_filter_fails(self):
         filt_cls = self.class_map['SameBackendFilter']()
@@ -765,8 +796,7 @@ class AffinityFilterTestCase(BackendFiltersTestCase):
                              'scheduler_hints': {
             'same_host': [vol_id], }}
 
-        result = filt_cls.backend_passes(host, filter_properties)
-        self.assertEqual([], result.objects)
+        self.assertFalse(filt_cls.backend_passes(host, filter_properties))
 
     def test_same_filter_vol_list_pass(self):
         filt_cls = self.class_map['SameBackendFilter']()
@@ -802,8 +832,7 @@ class AffinityFilterTestCase(BackendFiltersTestCase):
                              'scheduler_hints': {
             'same_host': [vol_id], }}
 
-        result = filt_cls.backend_passes(host, filter_properties)
-        self.assertEqual([], result.objects)
+        self.assertFalse(filt_cls.backend_passes(host, filter_properties))
 
     def test_same_filter_fail_nonuuid_hint(self):
         filt_cls = self.class_map['SameBackendFilter']()
@@ -1109,6 +1138,13 @@ class ExtraSpecsOpsTestCase(test.TestCase):
         assertion = self.assertTrue if matches else self.assertFalse
         assertion(extra_specs_ops.match(value, req))
 
+    def test_compile_match(self):
+        matcher = extra_specs_ops.compile_match('<or> a <or> b')
+        self.assertTrue(matcher('b'))
+        self.assertFalse(matcher('c'))
+        self.assertFalse(matcher(None))
+        self.assertIs(matcher, extra_specs_ops.compile_match('<or> a <or> b'))
+
     def test_extra_specs_fails_with_bogus_ops(self):
         self._do_extra_specs_ops_test(
             value='4',
@@ -1248,6 +1284,29 @@ class BasicFiltersTestCase(BackendFiltersTestCase):
         assertion = self.assertTrue if passes else self.assertFalse
         assertion(filt_cls.backend_passes(host, filter_properties))
 
+    @mock.patch('cinder.scheduler.filters.extra_specs_ops.compile_match',
+                wraps=extra_specs_ops.compile_match)
+    def test_capability_filter_compiles_extra_specs_once(self, mock_compile):
+        filt_cls = self.class_map['CapabilitiesFilter']()
+        capabilities_filter._compile_extra_specs.cache_clear()
+        self.addCleanup(capabilities_filter._compile_extra_specs.cache_clear)
+        especs = {'opt1': '<is> True', 'capabilities:opt2': '>= 2',
+                  'vendor:opt3': 'ignored'}
+        filter_properties = {'resource_type': {'name': 'fake_type',
+                                               'extra_specs': especs},
+                             'request_spec': {'volume_id': fake.VOLUME_ID}}
+        backends = [
+            fakes.FakeBackendState('host%s' % i,
+                                   {'capabilities': {'opt1': True,
+                                                     'opt2': i}})
+            for i in range(4)]
+
+        result = [filt_cls.backend_passes(backend, filter_properties)
+                  for backend in backends]
+
+        self.assertEqual([False, False, True, True], result)
+        self.assertEqual(2, mock_compile.call_count)
+
     def test_capability_filter_passes_extra_specs_simple(self):
         self._do_test_type_filter_extra_specs(
             ecaps={'opt1': '1', 'opt2': '2'},
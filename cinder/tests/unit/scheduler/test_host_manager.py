@@ -16,6 +16,7 @@
 
 from datetime import datetime
 from datetime import timedelta
+import time
 from unittest import mock
 
 import ddt
@@ -30,6 +31,7 @@ from cinder import exception
 from cinder import objects
 from cinder.scheduler import filters
 from cinder.scheduler import host_manager
+from cinder.scheduler import sched_utils
 from cinder.tests.unit import fake_constants as fake
 from cinder.tests.unit.objects import test_service
 from cinder.tests.unit.scheduler import helpers
@@ -168,6 +170,56 @@ class HostManagerTestCase(test.TestCase):
                     'host3': host3_volume_capabs}
         self.assertDictEqual(expected, service_states)
 
+    @mock.patch(
+        'cinder.scheduler.host_manager.HostManager._is_just_initialized',
+        return_value=False)
+    @mock.patch('cinder.scheduler.host_manager.HostManager._get_updated_pools')
+    def test_update_service_capabilities_delta(self, _mock_get_updated_pools,
+                                               _mock_is_just_initialized):
+        _mock_get_updated_pools.return_value = []
+        pool1 = {'pool_name': 'pool1', 'total_capacity_gb': 10,
+                 'free_capacity_gb': 10}
+        pool2 = {'pool_name': 'pool2', 'total_capacity_gb': 20,
+                 'free_capacity_gb': 20}
+        capabs = {'volume_backend_name': 'lvm', 'pools': [pool1, pool2]}
+        new_capabs = {'volume_backend_name': 'lvm',
+                      'pools': [dict(pool1, free_capacity_gb=5), pool2]}
+        delta = sched_utils.get_capabilities_delta(capabs, new_capabs)
+        self.assertEqual(
+            {'pools': {'pool1': {'set': {'free_capacity_gb': 5}}}}, delta)
+
+        timestamp = datetime.utcnow()
+        self.host_manager.update_service_capabilities(
+            'volume', 'host1', capabs, None, timestamp, generation=1)
+        self.host_manager.update_service_capabilities(
+            'volume', 'host1', None, None, timestamp + timedelta(seconds=1),
+            generation=2, capabilities_delta=delta)
+
+        result = dict(self.host_manager.service_states['host1'])
+        self.assertEqual(timestamp + timedelta(seconds=1),
+                         result.pop('timestamp'))
+        self.assertEqual(new_capabs, result)
+        # Only the full report needs the pools to be compared
+        _mock_get_updated_pools.assert_called_once()
+
+    @mock.patch(
+        'cinder.scheduler.host_manager.HostManager._is_just_initialized',
+        return_value=False)
+    def test_update_service_capabilities_delta_missed_report(
+            self, _mock_is_just_initialized):
+        capabs = {'volume_backend_name': 'lvm', 'free_capacity_gb': 10}
+        timestamp = datetime.utcnow()
+        self.host_manager.update_service_capabilities(
+            'volume', 'host1', capabs, None, timestamp, generation=1)
+        # Generation 2 was lost, so this delta cannot be applied
+        self.host_manager.update_service_capabilities(
+            'volume', 'host1', None, None, timestamp + timedelta(seconds=2),
+            generation=3,
+            capabilities_delta={'set': {'free_capacity_gb': 5}})
+
+        self.assertEqual(dict(capabs, timestamp=timestamp),
+                         self.host_manager.service_states['host1'])
+
     @mock.patch(
         'cinder.scheduler.host_manager.HostManager._is_just_initialized')
     @mock.patch(
@@ -752,6 +804,61 @@ class HostManagerTestCase(test.TestCase):
                     ('non_clustered_host#_pool0', 4000)}
         self.assertSetEqual(expected, result)
 
+    @mock.patch('cinder.objects.Service.is_up', True)
+    def test_get_all_backend_states_incremental(self):
+        self.flags(scheduler_backend_state_max_age=120)
+        ctxt = context.RequestContext(fake.USER_ID, fake.PROJECT_ID, True)
+        for host in ('host1', 'host2'):
+            db.service_create(ctxt, {'host': host,
+                                     'topic': constants.VOLUME_TOPIC,
+                                     'binary': constants.VOLUME_BINARY,
+                                     'created_at': timeutils.utcnow()})
+        self.host_manager.update_service_capabilities(
+            'volume', 'host1', {'free_capacity_gb': 1000}, None, 1)
+        # host2 reports after the first load so it must invalidate the map
+        self.host_manager.get_all_backend_states(ctxt)
+        self.host_manager.update_service_capabilities(
+            'volume', 'host2', {'free_capacity_gb': 3000}, None, 1)
+
+        res = self.host_manager.get_all_backend_states(ctxt)
+        self.assertSetEqual({('host1#_pool0', 1000), ('host2#_pool0', 3000)},
+                            {(s.host, s.free_capacity_gb) for s in res})
+
+        # Known backends are updated in place without going to the DB
+        self.host_manager.update_service_capabilities(
+            'volume', 'host1', {'free_capacity_gb': 2000}, None, 2)
+        with mock.patch.object(objects.ServiceList, 'get_all') as mock_get:
+            res = self.host_manager.get_all_backend_states(ctxt)
+            mock_get.assert_not_called()
+        self.assertSetEqual({('host1#_pool0', 2000), ('host2#_pool0', 3000)},
+                            {(s.host, s.free_capacity_gb) for s in res})
+
+    @mock.patch('cinder.scheduler.host_manager.HostManager.'
+                '_update_backend_state_map')
+    def test_get_all_backend_states_max_age_expired(self, mock_update):
+        self.flags(scheduler_backend_state_max_age=120)
+        ctxt = context.get_admin_context()
+        self.host_manager._backend_state_map_updated_at = (
+            time.monotonic() - 60)
+        self.host_manager.get_all_backend_states(ctxt)
+        mock_update.assert_not_called()
+
+        self.host_manager._backend_state_map_updated_at = (
+            time.monotonic() - 180)
+        self.host_manager.get_all_backend_states(ctxt)
+        mock_update.assert_called_once_with(ctxt)
+
+    @mock.patch('cinder.scheduler.host_manager.HostManager.'
+                '_update_backend_state_map')
+    def test_refresh_backend_state_map(self, mock_update):
+        ctxt = context.get_admin_context()
+        self.host_manager.refresh_backend_state_map(ctxt)
+        mock_update.assert_not_called()
+
+        self.flags(scheduler_backend_state_max_age=120)
+        self.host_manager.refresh_backend_state_map(ctxt)
+        mock_update.assert_called_once_with(ctxt)
+
     @mock.patch('cinder.db.api.service_get_all')
     @mock.patch('cinder.objects.service.Service.is_up',
                 new_callable=mock.PropertyMock)
@@ -62,6 +62,86 @@ class SchedulerRPCAPITestCase(test.RPCAPITestCase):
                            timestamp='123')
         can_send_version.assert_called_once_with('3.3')
 
+    @mock.patch('oslo_messaging.RPCClient.can_send_version', return_value=True)
+    def test_update_service_capabilities_delta(self, can_send_version):
+        delta = {'pools': {'pool1': {'set': {'free_capacity_gb': 10}}}}
+        self._test_rpc_api('update_service_capabilities',
+                           rpc_method='cast',
+                           service_name='fake_name',
+                           host='fake_host',
+                           cluster_name='cluster_name',
+                           capabilities={'pools': []},
+                           fanout=True,
+                           version='3.14',
+                           timestamp='123',
+                           generation=2,
+                           capabilities_delta=delta,
+                           expected_kwargs_diff={'capabilities': None})
+        can_send_version.assert_called_once_with('3.14')
+
+    @mock.patch('oslo_messaging.RPCClient.can_send_version')
+    def test_update_service_capabilities_delta_old_version(self,
+                                                           can_send_version):
+        can_send_version.side_effect = lambda x: x == '3.3'
+        self._test_rpc_api('update_service_capabilities',
+                           rpc_method='cast',
+                           service_name='fake_name',
+                           host='fake_host',
+                           cluster_name='cluster_name',
+                           capabilities={'pools': []},
+                           fanout=True,
+                           version='3.3',
+                           timestamp='123',
+                           generation=2,
+                           capabilities_delta={'set': {'a': 1}})
+        can_send_version.assert_has_calls([mock.call('3.14'),
+                                           mock.call('3.3')])
+
+    @mock.patch('oslo_messaging.RPCClient.can_send_version', return_value=True)
+    def test_get_stage_stats(self, can_send_version):
+        self._test_rpc_api('get_stage_stats',
+                           rpc_method='call',
+                           server='sched1',
+                           host='sched1',
+                           version='3.15',
+                           retval={'host': 'sched1', 'stages': {}})
+        can_send_version.assert_called_once_with('3.15')
+
+    @mock.patch('oslo_messaging.RPCClient.can_send_version',
+                return_value=False)
+    def test_get_stage_stats_old_version(self, can_send_version):
+        rpcapi = scheduler_rpcapi.SchedulerAPI()
+        self.assertRaises(exception.ServiceTooOld, rpcapi.get_stage_stats,
+                          self.context)
+
+    @mock.patch('oslo_messaging.RPCClient.can_send_version', return_value=True)
+    def test_create_volumes(self, can_send_version):
+        create_worker_mock = self.mock_object(self.fake_volume,
+                                              'create_worker')
+        self._test_rpc_api('create_volumes',
+                           rpc_method='cast',
+                           volumes=[self.fake_volume],
+                           request_spec_list=[self.fake_rs_obj],
+                           filter_properties_list=[self.fake_fp_dict],
+                           image_id=fake_constants.IMAGE_ID,
+                           version='3.13')
+        create_worker_mock.assert_called_once()
+        can_send_version.assert_called_once_with('3.13')
+
+    @mock.patch('cinder.scheduler.rpcapi.SchedulerAPI.create_volume')
+    @mock.patch('oslo_messaging.RPCClient.can_send_version',
+                return_value=False)
+    def test_create_volumes_old_version(self, can_send_version,
+                                        create_volume_mock):
+        rpcapi = scheduler_rpcapi.SchedulerAPI()
+        rpcapi.create_volumes(self.context, [self.fake_volume],
+                              [self.fake_rs_obj], [self.fake_fp_dict],
+                              image_id=fake_constants.IMAGE_ID)
+        create_volume_mock.assert_called_once_with(
+            self.context, self.fake_volume, image_id=fake_constants.IMAGE_ID,
+            request_spec=self.fake_rs_obj,
+            filter_properties=self.fake_fp_dict)
+
     @ddt.data('3.0', '3.10')
     @mock.patch('oslo_messaging.RPCClient.can_send_version')
     def test_create_volume(self, version, can_send_version):
@@ -248,6 +248,14 @@ class SchedulerManagerTestCase(test.TestCase):
 
         mock_clean.assert_called_once_with(self.context)
 
+    @mock.patch('cinder.scheduler.host_manager.HostManager.'
+                'refresh_backend_state_map')
+    def test_refresh_backend_states(self, mock_refresh):
+
+        self.manager._refresh_backend_states(self.context)
+
+        mock_refresh.assert_called_once_with(self.context)
+
     @mock.patch('cinder.scheduler.driver.Scheduler.'
                 'update_service_capabilities')
     def test_update_service_capabilities_empty_dict(self, _mock_update_cap):
@@ -258,7 +266,9 @@ class SchedulerManagerTestCase(test.TestCase):
         self.manager.update_service_capabilities(self.context,
                                                  service_name=service,
                                                  host=host)
-        _mock_update_cap.assert_called_once_with(service, host, {}, None, None)
+        _mock_update_cap.assert_called_once_with(service, host, {}, None, None,
+                                                 generation=None,
+                                                 capabilities_delta=None)
 
     @mock.patch('cinder.scheduler.driver.Scheduler.'
                 'update_service_capabilities')
@@ -273,7 +283,8 @@ class SchedulerManagerTestCase(test.TestCase):
                                                  host=host,
                                                  capabilities=capabilities)
         _mock_update_cap.assert_called_once_with(service, host, capabilities,
-                                                 None, None)
+                                                 None, None, generation=None,
+                                                 capabilities_delta=None)
 
     @mock.patch('cinder.scheduler.driver.Scheduler.'
                 'notify_service_capabilities')
@@ -339,6 +350,61 @@ class SchedulerManagerTestCase(test.TestCase):
             resource_uuid=volume.id,
             exception=mock.ANY)
 
+    @mock.patch('cinder.scheduler.driver.Scheduler.schedule_create_volumes')
+    @mock.patch('cinder.message.api.API.create')
+    @mock.patch('cinder.db.api.volume_update')
+    def test_create_volumes_failure_puts_volume_in_error_state(
+            self, _mock_volume_update, _mock_message_create,
+            _mock_sched_create):
+        volumes = [fake_volume.fake_volume_obj(self.context, id=volume_id)
+                   for volume_id in (fake.VOLUME_ID, fake.VOLUME2_ID)]
+        request_specs = [
+            objects.RequestSpec.from_primitives({'volume_id': volume.id})
+            for volume in volumes]
+        _mock_sched_create.return_value = [
+            None, exception.NoValidBackend(reason="")]
+
+        self.manager.create_volumes(self.context, volumes,
+                                    request_spec_list=request_specs,
+                                    filter_properties_list=[{}, {}])
+
+        _mock_sched_create.assert_called_once_with(self.context,
+                                                   request_specs, [{}, {}])
+        _mock_volume_update.assert_called_once_with(self.context,
+                                                    fake.VOLUME2_ID,
+                                                    {'status': 'error'})
+        _mock_message_create.assert_called_once_with(
+            self.context, message_field.Action.SCHEDULE_ALLOCATE_VOLUME,
+            resource_uuid=fake.VOLUME2_ID,
+            exception=mock.ANY)
+        for request_spec in request_specs:
+            self.assertEqual('create_volume', request_spec['operation'])
+
+    @mock.patch.object(manager.LOG, 'exception')
+    @mock.patch('cinder.scheduler.driver.Scheduler.schedule_create_volumes')
+    @mock.patch('cinder.message.api.API.create')
+    @mock.patch('cinder.db.api.volume_update')
+    def test_create_volumes_failure_unset_worker_error(
+            self, _mock_volume_update, _mock_message_create,
+            _mock_sched_create, _mock_log):
+        volume = fake_volume.fake_volume_obj(self.context)
+        request_spec = objects.RequestSpec.from_primitives(
+            {'volume_id': volume.id})
+        _mock_sched_create.return_value = [exception.NoValidBackend(
+            reason="")]
+
+        with mock.patch.object(volume, 'is_cleanable', return_value=True), \
+                mock.patch.object(volume, 'set_worker'), \
+                mock.patch.object(volume, 'unset_worker',
+                                  side_effect=exception.CinderException):
+            self.manager.create_volumes(self.context, [volume],
+                                        request_spec_list=[request_spec],
+                                        filter_properties_list=[{}])
+
+        _mock_volume_update.assert_called_once_with(self.context, volume.id,
+                                                    {'status': 'error'})
+        _mock_log.assert_called_once()
+
     @mock.patch('cinder.scheduler.driver.Scheduler.schedule_create_volume')
     @mock.patch('eventlet.sleep')
     def test_create_volume_no_delay(self, _mock_sleep, _mock_sched_create):
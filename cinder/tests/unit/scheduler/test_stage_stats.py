@@ -0,0 +1,79 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for the scheduling stage statistics."""
+
+from unittest import mock
+
+from cinder.scheduler import base_filter
+from cinder.scheduler import stage_stats
+from cinder.tests.unit import test
+
+
+class FakeFilter(base_filter.BaseFilter):
+    def _filter_one(self, obj, filter_properties):
+        return obj % 2 == 0
+
+
+class StageStatsTestCase(test.TestCase):
+    def setUp(self):
+        super(StageStatsTestCase, self).setUp()
+        self.stats = stage_stats.StageStats()
+
+    def test_record(self):
+        self.stats.record(stage_stats.FILTER, 'FakeFilter', 0.0002,
+                          removed=3)
+        self.stats.record(stage_stats.FILTER, 'FakeFilter', 10, removed=1)
+        self.stats.record(stage_stats.WEIGHER, 'FakeWeigher', 0.00005)
+
+        result = self.stats.to_dict()
+
+        filter_stats = result['filter']['FakeFilter']
+        self.assertEqual(2, filter_stats['count'])
+        self.assertAlmostEqual(10.0002, filter_stats['sum'])
+        self.assertEqual(10, filter_stats['max'])
+        self.assertEqual(4, filter_stats['removed'])
+        buckets = dict((bound, count)
+                       for bound, count in filter_stats['buckets'])
+        self.assertEqual(1, buckets[0.0005])
+        self.assertEqual(1, buckets[None])
+        self.assertEqual(2, sum(buckets.values()))
+
+        weigher_stats = result['weigher']['FakeWeigher']
+        self.assertEqual([0.0001, 1], weigher_stats['buckets'][0])
+        self.assertNotIn('removed', weigher_stats)
+
+    @mock.patch('time.monotonic', side_effect=[1.0, 1.5])
+    def test_timer(self, mock_monotonic):
+        with self.stats.timer(stage_stats.RPC, 'create_volume'):
+            pass
+
+        result = self.stats.to_dict()
+        self.assertEqual(0.5, result['rpc']['create_volume']['sum'])
+
+    def test_reset(self):
+        self.stats.record(stage_stats.RPC, 'create_volume', 0.1)
+        self.stats.reset()
+        self.assertEqual({}, self.stats.to_dict())
+
+    @mock.patch.object(stage_stats, 'STATS',
+                       new_callable=stage_stats.StageStats)
+    def test_filter_handler_records_stats(self, mock_stats):
+        handler = base_filter.BaseFilterHandler(base_filter.BaseFilter,
+                                                'cinder.tests.filters')
+
+        result = handler.get_filtered_objects([FakeFilter], range(5), {})
+
+        self.assertEqual([0, 2, 4], result)
+        filter_stats = mock_stats.to_dict()['filter']['FakeFilter']
+        self.assertEqual(1, filter_stats['count'])
+        self.assertEqual(2, filter_stats['removed'])
@@ -52,3 +52,48 @@ class TestWeightHandler(test.TestCase):
         for seq, result, minval, maxval in map_:
             ret = base_weight.normalize(seq, minval=minval, maxval=maxval)
             self.assertEqual(result, tuple(ret))
+
+    def _get_weighed_objects(self, weigher_classes, obj_list, limit=None):
+        handler = base_weight.BaseWeightHandler(base_weight.BaseWeigher,
+                                                'cinder.scheduler.weights')
+        return handler.get_weighed_objects(weigher_classes, obj_list, {},
+                                           limit=limit)
+
+    def test_get_weighed_objects(self):
+        class FakeWeigher(base_weight.BaseWeigher):
+            def _weigh_object(self, obj, weight_properties):
+                return obj
+
+        weighed = self._get_weighed_objects([FakeWeigher], [20, 50, 30, 50])
+
+        self.assertEqual([50, 50, 30, 20], [w.obj for w in weighed])
+        self.assertEqual([1.0, 1.0, 1.0 / 3, 0.0],
+                         [w.weight for w in weighed])
+
+    def test_get_weighed_objects_limit(self):
+        class FakeWeigher(base_weight.BaseWeigher):
+            def _weigh_object(self, obj, weight_properties):
+                return obj
+
+        obj_list = [20, 50, 30, 40, 10]
+        weighed = self._get_weighed_objects([FakeWeigher], obj_list, limit=2)
+
+        self.assertEqual([50, 40], [w.obj for w in weighed])
+        weighed = self._get_weighed_objects([FakeWeigher], obj_list,
+                                            limit=10)
+        self.assertEqual([50, 40, 30, 20, 10], [w.obj for w in weighed])
+
+    def test_get_weighed_objects_weigh_objects_override(self):
+        class FakeWeigher(base_weight.BaseWeigher):
+            def _weigh_object(self, obj, weight_properties):
+                raise AssertionError()
+
+            def weigh_objects(self, weighed_obj_list, weight_properties):
+                self.minval = 0
+                self.maxval = 100
+                return [-w.obj for w in weighed_obj_list]
+
+        weighed = self._get_weighed_objects([FakeWeigher], [20, 50])
+
+        self.assertEqual([20, 50], [w.obj for w in weighed])
+        self.assertEqual([-0.2, -0.5], [w.weight for w in weighed])
@@ -178,7 +178,8 @@ class TestCinderSchedulerCmd(test.TestCase):
         self.assertEqual('cinder', CONF.project)
         self.assertEqual(CONF.version, version.version_string())
         log_setup.assert_called_once_with(CONF, "cinder")
-        service_create.assert_called_once_with(binary='cinder-scheduler')
+        service_create.assert_called_once_with(binary='cinder-scheduler',
+                                               coordination=False)
         service_serve.assert_called_once_with(server)
         service_wait.assert_called_once_with()
 
@@ -3575,6 +3575,39 @@ class DBAPIImageVolumeCacheEntryTestCase(BaseTest):
                                                                host=host)
         self.assertIsNone(entry)
 
+    def test_cache_entry_get_counts_hits(self):
+        host = 'abc@123#poolz'
+        image_id = 'c06764d7-54b0-4471-acce-62e79452a38b'
+        entry = db.image_volume_cache_create(self.ctxt, host, None, image_id,
+                                             datetime.datetime.utcnow(),
+                                             'vol-1', 6)
+        self.assertEqual(0, entry['hit_count'])
+        self.assertIsNotNone(entry['created_at'])
+
+        for hits in (1, 2):
+            entry = db.image_volume_cache_get_and_update_last_used(
+                self.ctxt, image_id, host=host)
+            self.assertEqual(hits, entry['hit_count'])
+
+    def test_cache_entry_get_popular_images(self):
+        image_updated_at = datetime.datetime.utcnow()
+        # Hits of image-1 on 2 backends, image-2 and image-3 on one
+        for i, (host, image_id, hits) in enumerate(
+                (('host1', 'image-1', 1), ('host2', 'image-1', 2),
+                 ('host1', 'image-2', 2), ('host1', 'image-3', 0))):
+            db.image_volume_cache_create(self.ctxt, host, None, image_id,
+                                         image_updated_at, 'vol-%s' % i, 1)
+            for _hit in range(hits):
+                db.image_volume_cache_get_and_update_last_used(
+                    self.ctxt, image_id, host=host)
+
+        self.assertEqual(
+            ['image-1', 'image-2'],
+            db.image_volume_cache_get_popular_images(self.ctxt, 5))
+        self.assertEqual(
+            ['image-1'],
+            db.image_volume_cache_get_popular_images(self.ctxt, 1))
+
     def test_cache_entry_get_by_volume_id_none(self):
         volume_id = 'e0e4f819-24bb-49e6-af1e-67fb77fc07d1'
         entry = db.image_volume_cache_get_by_volume_id(self.ctxt, volume_id)
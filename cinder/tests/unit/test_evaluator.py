@@ -144,3 +144,22 @@ class EvaluatorTestCase(test.TestCase):
         self.assertGreater(evaluator.evaluate(
             '(((1 + max(1 + (10 / 20), 2, 3)) / 100) + 1)'),
             1)
+
+    def test_compile_expression_cached(self):
+        compiled = evaluator.compile_expression('stats.iops * 2 + 1')
+        self.assertIs(compiled,
+                      evaluator.compile_expression('stats.iops * 2 + 1'))
+        self.assertEqual(201, compiled.eval({'stats': {'iops': 100}}))
+        self.assertEqual(41, compiled.eval({'stats': {'iops': 20}}))
+
+    def test_compile_expression_bad_expression(self):
+        self.assertRaises(exception.EvaluatorParseException,
+                          evaluator.compile_expression,
+                          "1/*1")
+
+    def test_compiled_expression_variables_not_shared(self):
+        compiled = evaluator.compile_expression('stats.free_space > 100')
+        self.assertTrue(compiled.eval({'stats': {'free_space': 407}}))
+        self.assertFalse(compiled.eval({'stats': {'free_space': 10}}))
+        self.assertRaises(exception.EvaluatorParseException,
+                          compiled.eval, {})
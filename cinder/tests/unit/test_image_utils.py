@@ -14,10 +14,13 @@
 
 import errno
 import math
+import os
+import struct
 from unittest import mock
 
 import cryptography
 import ddt
+import fixtures
 from oslo_concurrency import processutils
 from oslo_utils import imageutils
 from oslo_utils import units
@@ -1327,6 +1330,50 @@ class TestFetchToVolumeFormat(test.TestCase):
                                              data=data,
                                              disable_sparse=False)
 
+    @mock.patch('cinder.image.download_cache.get_cache')
+    @mock.patch('cinder.image.image_utils.convert_image')
+    @mock.patch('cinder.image.image_utils.is_xenserver_format',
+                return_value=False)
+    @mock.patch('cinder.image.image_utils.fetch')
+    @mock.patch('cinder.image.image_utils.qemu_img_info')
+    @mock.patch('cinder.image.image_utils.temporary_file')
+    def test_download_cache(self, mock_temp, mock_info, mock_fetch,
+                            mock_is_xen, mock_convert, mock_get_cache):
+        ctxt = mock.sentinel.context
+        ctxt.user_id = mock.sentinel.user_id
+        image_service = FakeImageService()
+        image_id = mock.sentinel.image_id
+        dest = mock.sentinel.dest
+        volume_format = mock.sentinel.volume_format
+        blocksize = mock.sentinel.blocksize
+
+        data = mock_info.return_value
+        data.file_format = 'raw'
+        data.backing_file = None
+        cache = mock_get_cache.return_value
+        cached = cache.get.return_value.__enter__.return_value
+
+        image_utils.fetch_to_volume_format(ctxt, image_service, image_id,
+                                           dest, volume_format, blocksize)
+
+        image_meta, download = cache.get.call_args[0]
+        self.assertEqual(image_service.show(ctxt, image_id), image_meta)
+        cache.get.return_value.__exit__.assert_called_once()
+        mock_fetch.assert_not_called()
+        mock_info.assert_called_with(cached, run_as_root=True)
+        mock_convert.assert_called_once_with(cached, dest, volume_format,
+                                             out_subformat=None,
+                                             run_as_root=True,
+                                             src_format='raw',
+                                             image_id=image_id,
+                                             data=data,
+                                             disable_sparse=False)
+
+        # The cache downloads the image with fetch
+        download(mock.sentinel.path)
+        mock_fetch.assert_called_once_with(ctxt, image_service, image_id,
+                                           mock.sentinel.path, None, None)
+
     @mock.patch('cinder.image.image_utils.check_virtual_size')
     @mock.patch('cinder.image.image_utils.check_available_space')
     @mock.patch('cinder.image.image_utils.convert_image')
@@ -2047,6 +2094,119 @@ class TestFetchToVolumeFormat(test.TestCase):
         mock_engine.decompress_img.assert_called()
 
 
+class TestStreamRawImage(test.TestCase):
+    def setUp(self):
+        super(TestStreamRawImage, self).setUp()
+        self.flags(image_stream_raw_to_volume=True)
+        tmp_dir = self.useFixture(fixtures.TempDir()).path
+        self.dest = os.path.join(tmp_dir, 'volume')
+        with open(self.dest, 'wb') as f:
+            f.truncate(16 * units.Mi)
+        self.tmp = os.path.join(tmp_dir, 'image')
+        self.ctxt = mock.Mock(user_id=fake.USER_ID)
+        self.image_service = mock.Mock()
+        # The image has no temporary copy, so it's downloaded
+        self.image_service.temp_images = None
+
+    def _set_image(self, data):
+        image_meta = {'size': len(data),
+                      'disk_format': 'raw',
+                      'container_format': 'bare',
+                      'status': 'active'}
+        self.image_service.show.return_value = image_meta
+        self.image_service.download.return_value = iter(
+            [data[i:i + 65536] for i in range(0, len(data), 65536)])
+        return image_meta
+
+    def _read(self, path, size):
+        with open(path, 'rb') as f:
+            return f.read(size)
+
+    @mock.patch('cinder.image.image_utils.fetch')
+    @mock.patch('cinder.image.image_utils.convert_image')
+    @mock.patch('cinder.image.image_utils.qemu_img_info')
+    @mock.patch('cinder.image.image_utils.temporary_file')
+    def test_fetch_to_volume_format_streams(self, mock_temp, mock_info,
+                                            mock_convert, mock_fetch):
+        data = (os.urandom(5 * units.Mi) + bytes(4 * units.Mi) +
+                os.urandom(123))
+        self._set_image(data)
+
+        image_utils.fetch_to_volume_format(self.ctxt, self.image_service,
+                                           fake.IMAGE_ID, self.dest, 'raw',
+                                           mock.sentinel.blocksize, size=1)
+
+        self.assertEqual(data, self._read(self.dest, len(data)))
+        self.image_service.download.assert_called_once_with(self.ctxt,
+                                                            fake.IMAGE_ID)
+        mock_fetch.assert_not_called()
+        mock_convert.assert_not_called()
+
+    def test_stream_not_raw(self):
+        data = (b'QFI\xfb' + struct.pack('>I', 3) + bytes(200) +
+                os.urandom(units.Mi))
+        image_meta = self._set_image(data)
+
+        result = image_utils._stream_raw_image(
+            self.ctxt, self.image_service, fake.IMAGE_ID, image_meta,
+            self.dest, self.tmp, None, False)
+
+        self.assertFalse(result)
+        self.assertEqual(data, self._read(self.tmp, len(data) + 1))
+        self.assertEqual(bytes(len(data)), self._read(self.dest, len(data)))
+
+    def test_stream_overwrites_previous_data(self):
+        with open(self.dest, 'wb') as f:
+            f.write(b'\xff' * 16 * units.Mi)
+        data = os.urandom(units.Mi) + bytes(8 * units.Mi) + os.urandom(123)
+        image_meta = self._set_image(data)
+
+        result = image_utils._stream_raw_image(
+            self.ctxt, self.image_service, fake.IMAGE_ID, image_meta,
+            self.dest, self.tmp, None, False)
+
+        self.assertTrue(result)
+        self.assertEqual(16 * units.Mi, os.path.getsize(self.dest))
+        self.assertEqual(data + bytes(16 * units.Mi - len(data)),
+                         self._read(self.dest, 16 * units.Mi))
+
+    def test_stream_not_raw_enospc(self):
+        data = (b'QFI\xfb' + struct.pack('>I', 3) + bytes(200) +
+                os.urandom(units.Mi))
+        image_meta = self._set_image(data)
+
+        with mock.patch('cinder.utils.tpool_wrap') as mock_wrap:
+            mock_wrap.return_value.write.side_effect = IOError(
+                errno.ENOSPC, 'No space left on device')
+            self.assertRaises(exception.ImageTooBig,
+                              image_utils._stream_raw_image,
+                              self.ctxt, self.image_service, fake.IMAGE_ID,
+                              image_meta, self.dest, self.tmp, None, False)
+
+    def test_stream_short_download(self):
+        image_meta = self._set_image(os.urandom(units.Mi))
+        image_meta['size'] += 1
+
+        self.assertRaises(exception.ImageDownloadFailed,
+                          image_utils._stream_raw_image,
+                          self.ctxt, self.image_service, fake.IMAGE_ID,
+                          image_meta, self.dest, self.tmp, None, False)
+
+    def test_can_stream_image(self):
+        image_meta = self._set_image(b'data')
+
+        self.assertTrue(image_utils._can_stream_image(image_meta, 'raw',
+                                                      self.dest))
+        self.assertFalse(image_utils._can_stream_image(image_meta, 'qcow2',
+                                                       self.dest))
+        self.assertFalse(image_utils._can_stream_image(
+            dict(image_meta, container_format='compressed'), 'raw',
+            self.dest))
+        self.flags(image_stream_raw_to_volume=False)
+        self.assertFalse(image_utils._can_stream_image(image_meta, 'raw',
+                                                       self.dest))
+
+
 class TestXenserverUtils(test.TestCase):
     def test_is_xenserver_format(self):
         image_meta1 = {'disk_format': 'vhd', 'container_format': 'ovf'}
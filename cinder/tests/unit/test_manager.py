@@ -54,3 +54,38 @@ class TestManager(test.TestCase):
 
         self.assertEqual(set(str(r) for r in result.objects),
                          set(str(e) for e in expected))
+
+    @mock.patch('cinder.scheduler.rpcapi.SchedulerAPI.'
+                'notify_service_capabilities')
+    @mock.patch('cinder.scheduler.rpcapi.SchedulerAPI.'
+                'update_service_capabilities')
+    def test_publish_service_capabilities_delta(self, update_mock,
+                                                notify_mock):
+        service = manager.SchedulerDependentManager(host='host1',
+                                                    service_name='volume')
+        service.full_capabilities_report_interval = 3
+        pool = {'pool_name': 'pool1', 'free_capacity_gb': 10}
+        for free in (10, 5, 1, 2):
+            service.update_service_capabilities(
+                {'pools': [dict(pool, free_capacity_gb=free)]})
+            service._publish_service_capabilities(mock.sentinel.context)
+
+        capabilities = {'pools': [dict(pool, free_capacity_gb=1)]}
+        capabilities2 = {'pools': [dict(pool, free_capacity_gb=2)]}
+        self.assertEqual(
+            [mock.call(mock.sentinel.context, 'volume', 'host1', mock.ANY,
+                       None, generation=1, capabilities_delta=None),
+             mock.call(mock.sentinel.context, 'volume', 'host1', mock.ANY,
+                       None, generation=2, capabilities_delta={
+                           'pools': {
+                               'pool1': {'set': {'free_capacity_gb': 5}}}}),
+             mock.call(mock.sentinel.context, 'volume', 'host1',
+                       capabilities, None, generation=3,
+                       capabilities_delta={
+                           'pools': {
+                               'pool1': {'set': {'free_capacity_gb': 1}}}}),
+             # Every 3 reports the full one is sent
+             mock.call(mock.sentinel.context, 'volume', 'host1',
+                       capabilities2, None, generation=4,
+                       capabilities_delta=None)],
+            update_mock.call_args_list)
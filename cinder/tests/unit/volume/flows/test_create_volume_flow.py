@@ -192,6 +192,30 @@ class CreateVolumeFlowTestCase(test.TestCase):
         consistencygroup_get_by_id.assert_called_once_with(self.ctxt, 5)
         mock_extract_host.assert_called_once_with('cluster@backend#pool')
 
+    def test_cast_create_volume_batch(self):
+        volume = fake_volume.fake_volume_obj(self.ctxt)
+        spec = {'volume_id': volume.id,
+                'volume': volume,
+                'source_volid': None,
+                'snapshot_id': None,
+                'image_id': None,
+                'consistencygroup_id': None,
+                'cgsnapshot_id': None,
+                'group_id': None,
+                'backup_id': None, }
+        scheduler_rpcapi = mock.Mock()
+        batch = []
+        task = create_volume.VolumeCastTask(
+            scheduler_rpcapi,
+            fake_volume_api.FakeVolumeAPI(spec, self),
+            fake_volume_api.FakeDb(),
+            batch=batch)
+
+        task._cast_create_volume(self.ctxt, spec, {})
+
+        self.assertEqual([(volume, spec, {})], batch)
+        scheduler_rpcapi.create_volume.assert_not_called()
+
     @mock.patch('cinder.db.api.volume_create')
     @mock.patch('cinder.objects.Volume.get_by_id')
     @mock.patch('cinder.objects.Snapshot.get_by_id')
@@ -2537,6 +2561,46 @@ class CreateVolumeFlowManagerImageCacheTestCase(test.TestCase):
                 self.mock_image_service,
                 update_cache=True)
 
+    @mock.patch('cinder.volume.flows.manager.create_volume.'
+                'CreateVolumeFromSpecTask.'
+                '_create_from_image_cache_or_download')
+    def test_prepare_image_cache_entry_pending(
+            self,
+            mock_create_from_image_cache_or_download,
+            mock_get_internal_context,
+            mock_create_from_img_dl, mock_create_from_src,
+            mock_handle_bootable, mock_fetch_img):
+        self.mock_cache.get_entry.return_value = None
+        # Another create from the image is preparing the entry
+        pending_entry = self.mock_cache.pending_entry.return_value
+        pending_entry.__enter__.return_value = False
+        volume = fake_volume.fake_volume_obj(self.ctxt,
+                                             id=fakes.VOLUME_ID,
+                                             host='host@backend#pool')
+        image_meta = {'virtual_size': '1073741824', 'size': 1073741824}
+
+        manager = create_volume_manager.CreateVolumeFromSpecTask(
+            self.mock_volume_manager,
+            self.mock_db,
+            self.mock_driver,
+            image_volume_cache=self.mock_cache
+        )
+        model_update, cloned = manager._prepare_image_cache_entry(
+            self.ctxt,
+            volume,
+            'someImageLocationStr',
+            fakes.IMAGE_ID,
+            image_meta,
+            self.mock_image_service)
+
+        # The volume is created from the entry prepared by the other one
+        self.assertIsNone(model_update)
+        self.assertFalse(cloned)
+        self.mock_cache.pending_entry.assert_called_once_with(
+            volume, fakes.IMAGE_ID, clone_across_pools=mock.ANY)
+        self.mock_cache.get_entry.assert_called_once()
+        mock_create_from_image_cache_or_download.assert_not_called()
+
     @ddt.data([], ['fake_entry'])
     @mock.patch('cinder.image.image_utils.verify_glance_image_signature')
     @mock.patch('cinder.image.image_utils.qemu_img_info')
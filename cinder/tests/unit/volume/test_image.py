@@ -38,6 +38,7 @@ from cinder.tests.unit import utils as tests_utils
 from cinder.tests.unit import volume as base
 import cinder.volume
 from cinder.volume import manager as vol_manager
+from cinder.volume import volume_types
 
 QUOTAS = quota.QUOTAS
 NON_EXISTENT_IMAGE_ID = '003f540f-ec6b-4293-a3f9-7c68646b0f5c'
@@ -486,6 +487,157 @@ class ImageVolumeCacheTestCase(base.BaseVolumeTestCase):
             key_del_mock.side_effect = Exception("Key not found")
             volume_api.delete(self.context, volume)
 
+    @mock.patch('cinder.context.get_internal_tenant_context')
+    def test_warm_image_volume_cache(self, mock_get_internal_context):
+        self.volume.image_volume_cache = mock.Mock()
+        self.volume.image_volume_cache.get_warm_images.return_value = [
+            'image1', 'image2']
+        internal_context = mock_get_internal_context.return_value
+        volume_type = {'id': fake.VOLUME_TYPE_ID}
+
+        with mock.patch.object(self.volume,
+                               '_add_to_threadpool') as mock_add, \
+                mock.patch.object(
+                    self.volume, '_get_image_volume_cache_warm_type',
+                    return_value=volume_type), \
+                mock.patch.object(
+                    self.volume, '_warm_image_volume_cache_entry',
+                    side_effect=[exception.ImageNotFound(image_id='image1'),
+                                 None]) as mock_warm:
+            self.volume._warm_image_volume_cache(self.context)
+            # The images are warmed outside of the periodic task, and only
+            # one warming runs at a time
+            mock_add.assert_called_once_with(
+                self.volume._warm_image_volume_cache_images,
+                internal_context, ['image1', 'image2'])
+            self.volume._warm_image_volume_cache(self.context)
+            mock_add.assert_called_once()
+            mock_warm.assert_not_called()
+
+            self.volume._warm_image_volume_cache_images(
+                *mock_add.call_args[0][1:])
+
+        # A failure doesn't stop the warming of the next images
+        mock_warm.assert_has_calls(
+            [mock.call(internal_context, 'image1', volume_type),
+             mock.call(internal_context, 'image2', volume_type)])
+        self.assertTrue(
+            self.volume._image_volume_cache_warming.acquire(blocking=False))
+
+    @mock.patch('cinder.context.get_internal_tenant_context')
+    def test_warm_image_volume_cache_no_type(self, mock_get_internal_context):
+        self.volume._image_volume_cache_warming.acquire()
+        with mock.patch.object(
+                self.volume, '_get_image_volume_cache_warm_type',
+                return_value=None), \
+                mock.patch.object(
+                    self.volume,
+                    '_warm_image_volume_cache_entry') as mock_warm:
+            self.volume._warm_image_volume_cache_images(self.context,
+                                                        ['image1'])
+
+        mock_warm.assert_not_called()
+        self.assertTrue(
+            self.volume._image_volume_cache_warming.acquire(blocking=False))
+
+    def _get_image_volume_cache_warm_type(self, extra_specs=None,
+                                          encrypted=False, type_name=None):
+        volume_type = {'id': fake.VOLUME_TYPE_ID, 'name': 'type1',
+                       'extra_specs': extra_specs or {}}
+        self.volume.last_capabilities = {'volume_backend_name': 'backend1'}
+        with mock.patch.object(self.volume.driver.configuration, 'safe_get',
+                               return_value=type_name), \
+                mock.patch.object(volume_types, 'get_default_volume_type',
+                                  return_value=volume_type) as mock_default, \
+                mock.patch.object(volume_types, 'get_volume_type_by_name',
+                                  return_value=volume_type) as mock_by_name, \
+                mock.patch.object(volume_types, 'is_encrypted',
+                                  return_value=encrypted):
+            result = self.volume._get_image_volume_cache_warm_type(
+                self.context)
+        if type_name:
+            mock_by_name.assert_called_once_with(self.context, type_name)
+            mock_default.assert_not_called()
+        else:
+            mock_default.assert_called_once_with(self.context)
+        return volume_type, result
+
+    def test_get_image_volume_cache_warm_type(self):
+        volume_type, result = self._get_image_volume_cache_warm_type(
+            extra_specs={'volume_backend_name': 'backend1'})
+        self.assertEqual(volume_type, result)
+
+    def test_get_image_volume_cache_warm_type_configured(self):
+        volume_type, result = self._get_image_volume_cache_warm_type(
+            type_name='type1')
+        self.assertEqual(volume_type, result)
+
+    def test_get_image_volume_cache_warm_type_encrypted(self):
+        __, result = self._get_image_volume_cache_warm_type(encrypted=True)
+        self.assertIsNone(result)
+
+    def test_get_image_volume_cache_warm_type_other_backend(self):
+        __, result = self._get_image_volume_cache_warm_type(
+            extra_specs={'volume_backend_name': 'backend2'})
+        self.assertIsNone(result)
+
+    def _warm_image_volume_cache_entry(self, pinned=True, has_space=True,
+                                       can_fit=True):
+        tests_utils.create_volume_type(self.context, self,
+                                       id=fake.VOLUME_TYPE_ID, name='type1')
+        image_service = mock.Mock()
+        image_service.show.return_value = {'id': fake.IMAGE_ID,
+                                           'size': units.Gi,
+                                           'virtual_size': 3 * units.Gi + 1}
+        self.volume.image_volume_cache = mock.Mock()
+        self.volume.image_volume_cache.has_entry.return_value = False
+        self.volume.image_volume_cache.is_pinned.return_value = pinned
+        self.volume.image_volume_cache.has_space.return_value = has_space
+        self.volume.image_volume_cache.can_fit.return_value = can_fit
+        self.volume.last_capabilities = {
+            'pools': [{'pool_name': 'pool1', 'free_capacity_gb': 10},
+                      {'pool_name': 'pool2', 'free_capacity_gb': 20}]}
+
+        with mock.patch('cinder.image.glance.get_remote_image_service',
+                        return_value=(image_service, fake.IMAGE_ID)), \
+                mock.patch.object(self.volume,
+                                  'create_volume') as mock_create, \
+                mock.patch.object(self.volume,
+                                  'delete_volume') as mock_delete:
+            self.volume._warm_image_volume_cache_entry(
+                self.context, fake.IMAGE_ID, {'id': fake.VOLUME_TYPE_ID})
+        return mock_create, mock_delete
+
+    def test_warm_image_volume_cache_entry(self):
+        mock_create, mock_delete = self._warm_image_volume_cache_entry()
+
+        volume = mock_create.call_args[0][1]
+        # The volume fits the image in the pool with the most free space
+        self.assertEqual(4, volume.size)
+        self.assertEqual(self.volume.host + '#pool2', volume.host)
+        self.assertEqual(fake.VOLUME_TYPE_ID, volume.volume_type_id)
+        self.assertEqual(
+            fake.IMAGE_ID, mock_create.call_args[1]['request_spec'].image_id)
+        mock_delete.assert_called_once_with(self.context, volume)
+
+    def test_warm_image_volume_cache_entry_full(self):
+        mock_create, mock_delete = self._warm_image_volume_cache_entry(
+            pinned=False, has_space=False)
+
+        mock_create.assert_not_called()
+        mock_delete.assert_not_called()
+
+    @mock.patch.object(vol_manager.LOG, 'warning')
+    def test_warm_image_volume_cache_entry_cannot_fit(self, mock_warning):
+        for __ in range(2):
+            mock_create, mock_delete = self._warm_image_volume_cache_entry(
+                can_fit=False)
+            mock_create.assert_not_called()
+            mock_delete.assert_not_called()
+
+        # The image is only reported once
+        mock_warning.assert_called_once()
+
 
 class ImageVolumeTestCases(base.BaseVolumeTestCase):
 
@@ -675,6 +675,32 @@ class VolumeTestCase(base.BaseVolumeTestCase):
                                    volume_type=self.vol_type)
         self.assertEqual('default-az', volume['availability_zone'])
 
+    @mock.patch('cinder.scheduler.rpcapi.SchedulerAPI.create_volumes')
+    @mock.patch('cinder.scheduler.rpcapi.SchedulerAPI.create_volume')
+    def test_create_volumes(self, mock_create_volume, mock_create_volumes):
+        volume_api = cinder.volume.api.API()
+
+        volumes = volume_api.create_volumes(self.context, 3, 1, 'name',
+                                            'description',
+                                            volume_type=self.vol_type)
+
+        self.assertEqual(3, len(volumes))
+        self.assertEqual(3, len({volume.id for volume in volumes}))
+        mock_create_volume.assert_not_called()
+        mock_create_volumes.assert_called_once_with(
+            self.context, volumes, mock.ANY, [{}, {}, {}], image_id=None)
+        request_specs = mock_create_volumes.call_args[0][2]
+        self.assertEqual([volume.id for volume in volumes],
+                         [spec['volume_id'] for spec in request_specs])
+
+    def test_create_volumes_over_max_count(self):
+        self.override_config('volume_create_max_count', 2)
+        volume_api = cinder.volume.api.API()
+
+        self.assertRaises(exception.InvalidInput,
+                          volume_api.create_volumes, self.context, 3, 1,
+                          'name', 'description', volume_type=self.vol_type)
+
     def test_create_volume_with_default_type_misconfigured(self):
         """Test volume creation with non-existent default volume type."""
         volume_api = cinder.volume.api.API()
@@ -88,12 +88,20 @@ az_cache_time_opt = cfg.IntOpt('az_cache_duration',
                                help='Cache volume availability zones in '
                                     'memory for the provided duration in '
                                     'seconds')
+volume_create_max_count_opt = cfg.IntOpt('volume_create_max_count',
+                                         default=100,
+                                         min=1,
+                                         help='Maximum number of volumes '
+                                              'that a single create request '
+                                              'can ask for with the count '
+                                              'parameter')
 
 CONF = cfg.CONF
 CONF.register_opt(allow_force_upload_opt)
 CONF.register_opt(volume_host_opt)
 CONF.register_opt(volume_same_az_opt)
 CONF.register_opt(az_cache_time_opt)
+CONF.register_opt(volume_create_max_count_opt)
 
 CONF.import_opt('glance_core_properties', 'cinder.image.glance')
 
@@ -235,7 +243,10 @@ class API(base.Base):
                group: Optional[objects.Group] = None,
                group_snapshot=None,
                source_group=None,
-               backup: Optional[objects.Backup] = None):
+               backup: Optional[objects.Backup] = None,
+               batch: Optional[list] = None):
+        # NOTE: When batch is provided the volume is not sent to the scheduler
+        # and its request is appended to the list instead, see create_volumes.
 
         if image_id:
             context.authorize(vol_policy.CREATE_FROM_IMAGE_POLICY)
@@ -358,7 +369,8 @@ class API(base.Base):
                                                  availability_zones,
                                                  create_what,
                                                  sched_rpcapi,
-                                                 volume_rpcapi)
+                                                 volume_rpcapi,
+                                                 batch=batch)
         except Exception:
             msg = _('Failed to create api volume flow.')
             LOG.exception(msg)
@@ -384,6 +396,50 @@ class API(base.Base):
                     self.list_availability_zones(enable_cache=True,
                                                  refresh_cache=True)
 
+    def create_volumes(self,
+                       context: context.RequestContext,
+                       count: int,
+                       size: Union[str, int],
+                       name: Optional[str],
+                       description: Optional[str],
+                       image_id: Optional[str] = None,
+                       volume_type: Optional[objects.VolumeType] = None,
+                       metadata: Optional[dict] = None,
+                       availability_zone: Optional[str] = None,
+                       scheduler_hints=None) -> list[objects.Volume]:
+        """Create several identical volumes with one scheduling request.
+
+        Volumes are created one by one in the database, and once all of them
+        exist they are sent to the scheduler together so it can place them
+        with a single filtering pass.  If creating one of the volumes fails
+        the ones that were already created are still scheduled before the
+        error is raised.
+        """
+        if count > CONF.volume_create_max_count:
+            msg = (_('Cannot create more than %(max)s volumes in a single '
+                     'request (requested %(count)s).') %
+                   {'max': CONF.volume_create_max_count, 'count': count})
+            raise exception.InvalidInput(reason=msg)
+
+        batch: list = []
+        try:
+            for __ in range(count):
+                self.create(context, size, name, description,
+                            image_id=image_id,
+                            volume_type=volume_type,
+                            metadata=metadata,
+                            availability_zone=availability_zone,
+                            scheduler_hints=scheduler_hints,
+                            batch=batch)
+        finally:
+            if batch:
+                volumes, request_specs, filter_properties = zip(*batch)
+                self.scheduler_rpcapi.create_volumes(
+                    context, list(volumes), list(request_specs),
+                    list(filter_properties), image_id=image_id)
+
+        return [volume for volume, __, __ in batch]
+
     def revert_to_snapshot(self,
                            context: context.RequestContext,
                            volume: objects.Volume,
@@ -373,6 +373,35 @@ image_opts = [
                default=0,
                help='Max number of entries allowed in the image volume cache. '
                     '0 => unlimited.'),
+    cfg.StrOpt('image_volume_cache_eviction_policy',
+               default='lru',
+               choices=[('lru', 'Evict the least recently used entries.'),
+                        ('cost', 'Evict first the entries with the highest '
+                                 'size over the rate of volumes created '
+                                 'from them.')],
+               help='Order in which the image volume cache entries of this '
+                    'backend are evicted to make room for new ones.'),
+    cfg.ListOpt('image_volume_cache_pinned_images',
+                default=[],
+                help='IDs of the images that are never evicted from the '
+                     'image volume cache of this backend. Their entries are '
+                     'created in advance, see '
+                     'image_volume_cache_warm_interval.'),
+    cfg.StrOpt('image_volume_cache_warm_volume_type',
+               help='Name of the volume type of the volumes created to warm '
+                    'the image volume cache of this backend. It must not be '
+                    'encrypted, and its extra specs must match this '
+                    'backend. Defaults to the default volume type, and the '
+                    'cache is not warmed if that type is encrypted or its '
+                    'volume_backend_name is another backend.'),
+    cfg.IntOpt('image_volume_cache_warm_count',
+               default=0,
+               min=0,
+               help='Number of images with the most image volume cache hits '
+                    'on all the backends whose entries are created in '
+                    'advance on this backend, while its cache has room for '
+                    'them. See image_volume_cache_warm_interval. 0 => '
+                    'disabled.'),
     cfg.BoolOpt('use_multipath_for_image_xfer',
                 default=False,
                 help='Do we attach/detach volumes in cinder using multipath '
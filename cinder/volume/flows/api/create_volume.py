@@ -792,7 +792,8 @@ class VolumeCastTask(flow_utils.CinderTask):
     created volume.
     """
 
-    def __init__(self, scheduler_rpcapi, volume_rpcapi, db) -> None:
+    def __init__(self, scheduler_rpcapi, volume_rpcapi, db,
+                 batch: Optional[list] = None) -> None:
         requires = ['image_id', 'scheduler_hints', 'snapshot_id',
                     'source_volid', 'volume_id', 'volume', 'volume_type',
                     'volume_properties', 'consistencygroup_id',
@@ -803,6 +804,10 @@ class VolumeCastTask(flow_utils.CinderTask):
         self.volume_rpcapi = volume_rpcapi
         self.scheduler_rpcapi = scheduler_rpcapi
         self.db = db
+        # When a batch is provided the cast to the scheduler is deferred and
+        # the request is appended to it instead, so several volumes can be
+        # scheduled together.
+        self.batch = batch
 
     def _cast_create_volume(self,
                             context: context.RequestContext,
@@ -844,6 +849,10 @@ class VolumeCastTask(flow_utils.CinderTask):
             request_spec['resource_backend'] = (
                 source_volume_ref.resource_backend)
 
+        if self.batch is not None:
+            self.batch.append((volume, request_spec, filter_properties))
+            return
+
         self.scheduler_rpcapi.create_volume(
             context,
             volume,
@@ -887,7 +896,7 @@ class VolumeCastTask(flow_utils.CinderTask):
 
 
 def get_flow(db_api, image_service_api, availability_zones, create_what,
-             scheduler_rpcapi=None, volume_rpcapi=None):
+             scheduler_rpcapi=None, volume_rpcapi=None, batch=None):
     """Constructs and returns the api entrypoint flow.
 
     This flow will do the following:
@@ -916,7 +925,8 @@ def get_flow(db_api, image_service_api, availability_zones, create_what,
     if scheduler_rpcapi and volume_rpcapi:
         # This will cast it out to either the scheduler or volume manager via
         # the rpc apis provided.
-        api_flow.add(VolumeCastTask(scheduler_rpcapi, volume_rpcapi, db_api))
+        api_flow.add(VolumeCastTask(scheduler_rpcapi, volume_rpcapi, db_api,
+                                    batch=batch))
 
     # Now load (but do not run) the flow using the provided initial data.
     return taskflow.engines.load(api_flow, store=create_what)
@@ -871,7 +871,6 @@ class CreateVolumeFromSpecTask(flow_utils.CinderTask):
                         'clone. Image will be downloaded from Glance.')
         return None, False
 
-    @coordination.synchronized('{image_id}')
     def _prepare_image_cache_entry(self,
                                    context: cinder_context.RequestContext,
                                    volume: objects.Volume,
@@ -891,28 +890,63 @@ class CreateVolumeFromSpecTask(flow_utils.CinderTask):
             internal_context, volume, image_id, image_meta,
             clone_across_pools=clone_across_pools)
 
-        # If the entry is in the cache then return ASAP in order to minimize
-        # the scope of the lock. If it isn't in the cache then do the work
-        # that adds it. The work is done inside the locked region to ensure
-        # only one cache entry is created.
+        # If the entry is in the cache then return ASAP.
         if cache_entry:
             LOG.debug('Found cache entry for image = '
                       '%(image_id)s on host %(host)s.',
                       {'image_id': image_id, 'host': volume.host})
             return None, False
-        else:
-            LOG.debug('Preparing cache entry for image = '
+
+        # Only the first of the concurrent creates from the image on this
+        # backend creates the entry, the others wait for it and clone it.
+        with self.image_volume_cache.pending_entry(
+                volume, image_id,
+                clone_across_pools=clone_across_pools) as first:
+            if not first:
+                return None, False
+            scope = self.image_volume_cache.get_scope(
+                volume, clone_across_pools=clone_across_pools)
+            return self._create_image_cache_entry(
+                context, internal_context, volume, image_location, image_id,
+                image_meta, image_service, clone_across_pools, scope)
+
+    @coordination.synchronized('image-cache-{image_id}-{scope}')
+    def _create_image_cache_entry(self,
+                                  context: cinder_context.RequestContext,
+                                  internal_context:
+                                  cinder_context.RequestContext,
+                                  volume: objects.Volume,
+                                  image_location: str,
+                                  image_id: str,
+                                  image_meta: dict[str, Any],
+                                  image_service,
+                                  clone_across_pools: bool,
+                                  scope: str) -> tuple[Optional[dict], bool]:
+        assert self.image_volume_cache is not None
+        # The lock serializes the services of a cluster, so the entry may
+        # have been created by another one in the meantime. The work is done
+        # inside the locked region to ensure only one cache entry is created.
+        cache_entry = self.image_volume_cache.get_entry(
+            internal_context, volume, image_id, image_meta,
+            clone_across_pools=clone_across_pools)
+        if cache_entry:
+            LOG.debug('Found cache entry for image = '
                       '%(image_id)s on host %(host)s.',
                       {'image_id': image_id, 'host': volume.host})
-            model_update = self._create_from_image_cache_or_download(
-                context,
-                volume,
-                image_location,
-                image_id,
-                image_meta,
-                image_service,
-                update_cache=True)
-            return model_update, True
+            return None, False
+
+        LOG.debug('Preparing cache entry for image = '
+                  '%(image_id)s on host %(host)s.',
+                  {'image_id': image_id, 'host': volume.host})
+        model_update = self._create_from_image_cache_or_download(
+            context,
+            volume,
+            image_location,
+            image_id,
+            image_meta,
+            image_service,
+            update_cache=True)
+        return model_update, True
 
     def _create_from_image_cache_or_download(
             self,
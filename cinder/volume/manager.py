@@ -36,6 +36,7 @@ intact.
 """
 
 import functools
+import math
 import threading
 import time
 import typing
@@ -138,6 +139,23 @@ volume_manager_opts = [
                     'from the backend.  Be aware that generating usage '
                     'statistics is expensive for some backends, so setting '
                     'this value too low may adversely affect performance.'),
+    cfg.IntOpt('backend_stats_full_report_interval',
+               default=0,
+               min=0,
+               help='Send the full backend statistics to the schedulers only '
+                    'once every this many reports, and only the statistics '
+                    'that changed in the reports in between. Schedulers that '
+                    'miss a report wait for the next full one, so this '
+                    'delays updates from newly started schedulers. Set 0 to '
+                    'always send the full statistics.'),
+    cfg.IntOpt('image_volume_cache_warm_interval',
+               default=600,
+               min=60,
+               help='Time in seconds between the creations of the image '
+                    'volume cache entries of the pinned and most used '
+                    'images that are missing, on the backends with '
+                    'image_volume_cache_pinned_images or '
+                    'image_volume_cache_warm_count set.'),
 ]
 
 volume_backend_opts = [
@@ -268,8 +286,14 @@ class VolumeManager(manager.CleanableManager,
                                                   config_group=service_name)
         self._init_pool(
             self.configuration.backend_native_threads_pool_size)
+        self.full_capabilities_report_interval = (
+            CONF.backend_stats_full_report_interval)
         self.stats: dict = {}
         self.service_uuid = None
+        # Held while the image-volume cache is being warmed
+        self._image_volume_cache_warming = threading.Lock()
+        # Images, with their size, that don't fit in the image-volume cache
+        self._image_volume_cache_unfit: set[tuple[str, int]] = set()
 
         self.cluster: str
         self.host: str
@@ -350,12 +374,21 @@ class VolumeManager(manager.CleanableManager,
                 'image_volume_cache_max_size_gb')
             max_cache_entries = self.driver.configuration.safe_get(
                 'image_volume_cache_max_count')
+            eviction_policy = self.driver.configuration.safe_get(
+                'image_volume_cache_eviction_policy') or 'lru'
+            pinned_images = self.driver.configuration.safe_get(
+                'image_volume_cache_pinned_images')
+            warm_count = self.driver.configuration.safe_get(
+                'image_volume_cache_warm_count') or 0
 
             self.image_volume_cache = image_cache.ImageVolumeCache(
                 self.db,
                 cinder_volume.API(),
                 max_cache_size,
-                max_cache_entries
+                max_cache_entries,
+                eviction_policy=eviction_policy,
+                pinned_images=pinned_images,
+                warm_count=warm_count
             )
             LOG.info('Image-volume cache enabled for host %(host)s.',
                      {'host': self.host})
@@ -1684,6 +1717,178 @@ class VolumeManager(manager.CleanableManager,
                               {'id': volume.id})
             return None
 
+    def _get_image_volume_cache_warm_host(self) -> str:
+        """Return the host, with the pool, where cache entries are warmed."""
+        capabilities = self.last_capabilities or {}
+        pools = capabilities.get('pools')
+        if pools:
+            def free_capacity(pool):
+                free = pool.get('free_capacity_gb')
+                if free == 'infinite':
+                    return float('inf')
+                return free if isinstance(free, (int, float)) else 0
+            pool_name = max(pools, key=free_capacity)['pool_name']
+        else:
+            pool_name = (capabilities.get('volume_backend_name') or
+                         volume_utils.extract_host(self.host, 'pool', True))
+        return typing.cast(str, volume_utils.append_host(self.host, pool_name))
+
+    def _get_image_volume_cache_warm_type(
+            self, ctx: context.RequestContext) -> Optional[dict]:
+        """Return the volume type of the volumes warming the cache, if any.
+
+        Encrypted volumes aren't cached, and the scheduler doesn't choose
+        the backend of these volumes, so types that are encrypted or whose
+        volume_backend_name is another backend can't be used.
+        """
+        type_name = self.driver.configuration.safe_get(
+            'image_volume_cache_warm_volume_type')
+        if type_name:
+            volume_type = volume_types.get_volume_type_by_name(ctx,
+                                                               type_name)
+        else:
+            volume_type = volume_types.get_default_volume_type(ctx)
+
+        backend_name = (volume_type.get('extra_specs') or {}).get(
+            'volume_backend_name')
+        my_backend_name = ((self.last_capabilities or {}).get(
+            'volume_backend_name') or self.driver.configuration.safe_get(
+            'volume_backend_name'))
+        if volume_types.is_encrypted(ctx, volume_type['id']):
+            reason = 'it is encrypted'
+        elif backend_name and backend_name != my_backend_name:
+            reason = 'it is for backend %s' % backend_name
+        else:
+            return volume_type
+        LOG.warning('Volume type %(type)s can not be used to warm the '
+                    'image-volume cache of %(service)s because %(reason)s. '
+                    'Set image_volume_cache_warm_volume_type to a volume '
+                    'type of this backend.',
+                    {'type': volume_type['name'],
+                     'service': self.service_topic_queue,
+                     'reason': reason})
+        return None
+
+    def _warm_image_volume_cache_entry(self,
+                                       ctx: context.RequestContext,
+                                       image_id: str,
+                                       volume_type: dict) -> None:
+        """Create the cache entry of an image if it's missing.
+
+        A volume is created from the image in the internal tenant, which
+        creates the entry like the first volume created from the image
+        would, and is then deleted.
+        """
+        assert self.image_volume_cache is not None
+        image_service, image_id = glance.get_remote_image_service(ctx,
+                                                                  image_id)
+        image_meta = image_service.show(ctx, image_id)
+        image_size = image_meta.get('virtual_size') or image_meta['size']
+        size = max(math.ceil(image_size / units.Gi),
+                   image_meta.get('min_disk') or 0, 1)
+        volume_type_id = volume_type['id']
+        volume = objects.Volume(
+            context=ctx,
+            host=self._get_image_volume_cache_warm_host(),
+            cluster_name=self.cluster,
+            availability_zone=self.availability_zone,
+            size=size,
+            volume_type_id=volume_type_id,
+            user_id=ctx.user_id,
+            project_id=ctx.project_id,
+            status='creating',
+            attach_status=fields.VolumeAttachStatus.DETACHED,
+            display_name='image-%s' % image_id)
+
+        clone_across_pools = self.driver.capabilities.get(
+            'clone_across_pools', False)
+        if self.image_volume_cache.has_entry(
+                ctx, volume, image_id, clone_across_pools=clone_across_pools):
+            return
+        # The image would be downloaded again on every run otherwise
+        if not self.image_volume_cache.can_fit(ctx, volume):
+            if (image_id, size) not in self._image_volume_cache_unfit:
+                self._image_volume_cache_unfit.add((image_id, size))
+                LOG.warning('Image %(image_id)s of %(size)s GB does not fit '
+                            'in the image-volume cache of %(service)s, it '
+                            'will not be warmed.',
+                            {'image_id': image_id, 'size': size,
+                             'service': self.service_topic_queue})
+            return
+        # Don't evict entries for images that may not be used here
+        if (not self.image_volume_cache.is_pinned(image_id) and
+                not self.image_volume_cache.has_space(ctx, volume)):
+            LOG.debug('Image-volume cache for %(service)s is full, image '
+                      '%(image_id)s is not warmed.',
+                      {'service': self.service_topic_queue,
+                       'image_id': image_id})
+            return
+
+        LOG.info('Warming the image-volume cache with image %s.', image_id)
+        reserve_opts = {'volumes': 1, 'gigabytes': size}
+        QUOTAS.add_volume_type_opts(ctx, reserve_opts, volume_type_id)
+        reservations = QUOTAS.reserve(ctx, **reserve_opts)
+        try:
+            volume.create()
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                QUOTAS.rollback(ctx, reservations)
+        QUOTAS.commit(ctx, reservations, project_id=ctx.project_id)
+
+        try:
+            self.create_volume(ctx, volume,
+                               request_spec=objects.RequestSpec(
+                                   image_id=image_id),
+                               allow_reschedule=False)
+        finally:
+            self.delete_volume(ctx, volume)
+
+    @periodic_task.periodic_task(
+        spacing=CONF.image_volume_cache_warm_interval)
+    def _warm_image_volume_cache(self, ctxt: context.RequestContext) -> None:
+        """Create the missing cache entries of pinned and popular images."""
+        if not (self.image_volume_cache and self.driver.initialized):
+            return
+        image_ids = self.image_volume_cache.get_warm_images(ctxt)
+        if not image_ids:
+            return
+        internal_context = context.get_internal_tenant_context()
+        if not internal_context:
+            LOG.info('Unable to get Cinder internal context, will not warm '
+                     'the image-volume cache.')
+            return
+
+        # Warming downloads images, so it runs outside of the periodic tasks
+        # to not delay them, and only one warming runs at a time.
+        if not self._image_volume_cache_warming.acquire(blocking=False):
+            LOG.debug('Image-volume cache warming is still running.')
+            return
+        try:
+            self._add_to_threadpool(self._warm_image_volume_cache_images,
+                                    internal_context, image_ids)
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                self._image_volume_cache_warming.release()
+
+    def _warm_image_volume_cache_images(self,
+                                        ctx: context.RequestContext,
+                                        image_ids: list[str]) -> None:
+        try:
+            volume_type = self._get_image_volume_cache_warm_type(ctx)
+            if not volume_type:
+                return
+            for image_id in image_ids:
+                try:
+                    self._warm_image_volume_cache_entry(ctx, image_id,
+                                                        volume_type)
+                except Exception:
+                    LOG.exception('Failed to warm the image-volume cache '
+                                  'with image %s.', image_id)
+        except Exception:
+            LOG.exception('Failed to warm the image-volume cache.')
+        finally:
+            self._image_volume_cache_warming.release()
+
     def _clone_image_volume_and_add_location(self, ctx, volume, image_service,
                                              image_meta) -> bool:
         """Create a cloned volume and register its location to the image."""
@@ -0,0 +1,371 @@
+#! /usr/bin/env python3
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure the throughput of the chunked backup drivers.
+
+A synthetic volume is backed up, changed and backed up again incrementally,
+and the incremental backup is restored through its chain, with:
+
+* posix: the Posix driver writing to a local directory.
+* nfs: the NFS driver with its share replaced by a local directory, tmpfs
+  by default, so that the network is left out of the measurements.
+* memory: a driver keeping its objects in memory, which stands in for the
+  Swift and S3 object stores.
+
+Throughput, CPU seconds per GiB and peak RSS are reported for every
+operation. The database is a SQLite file in the work directory, and any
+other argument is given to oslo.config, so backup options can be changed with
+--config-file, for example:
+
+    tox -e bench-backup -- --size 512 --sparsity 0.3 --config-file bench.conf
+"""
+
+import argparse
+import filecmp
+import hashlib
+import json
+import math
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+from oslo_config import cfg
+from oslo_messaging import conffixture as messaging_conffixture
+from oslo_utils import units
+
+from cinder.backup import chunkeddriver
+from cinder.backup.drivers import nfs
+from cinder.backup.drivers import posix
+from cinder.common import config  # noqa
+from cinder import context
+from cinder.db import migration
+from cinder import objects
+from cinder.objects import fields
+from cinder import rpc
+
+
+CONF = cfg.CONF
+
+# Granularity of the sparsity, compressibility and changes of the volumes
+BLOCK_SIZE = 64 * units.Ki
+
+TMPFS_PATH = '/dev/shm'
+
+
+class MemoryObjectWriter(object):
+    def __init__(self, store, key):
+        self.store = store
+        self.key = key
+        self.data = bytearray()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, data):
+        self.data += data
+
+    def close(self):
+        # Object store clients compute the MD5 of what they send
+        self.store[self.key] = bytes(self.data)
+        return hashlib.md5(self.data, usedforsecurity=False).hexdigest()
+
+
+class MemoryObjectReader(object):
+    def __init__(self, store, key):
+        self.store = store
+        self.key = key
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+    def read(self):
+        return self.store[self.key]
+
+
+class MemoryBackupDriver(chunkeddriver.ChunkedBackupDriver):
+    """Keeps the backups in memory, like an object store without network."""
+
+    def __init__(self, context):
+        super().__init__(context, CONF.backup_file_size,
+                         CONF.backup_sha_block_size_bytes,
+                         'benchmark', CONF.backup_enable_progress_timer)
+        self.store = {}
+
+    def put_container(self, container):
+        pass
+
+    def get_container_entries(self, container, prefix):
+        return [name for cont, name in self.store
+                if cont == container and name.startswith(prefix)]
+
+    def get_object_writer(self, container, object_name, extra_metadata=None):
+        return MemoryObjectWriter(self.store, (container, object_name))
+
+    def get_object_reader(self, container, object_name, extra_metadata=None):
+        return MemoryObjectReader(self.store, (container, object_name))
+
+    def delete_object(self, container, object_name):
+        self.store.pop((container, object_name), None)
+
+    def _generate_object_name_prefix(self, backup):
+        return 'volume_%s_backup_%s' % (backup.volume_id, backup.id)
+
+    def update_container_name(self, backup, container):
+        return container
+
+    def get_extra_metadata(self, backup, volume):
+        return None
+
+
+class LocalNFSBackupDriver(nfs.NFSBackupDriver):
+    """NFS driver using backup_share as a local directory."""
+
+    def _init_backup_repo_path(self):
+        return self.backup_share
+
+
+DRIVERS = {
+    'posix': posix.PosixBackupDriver,
+    'nfs': LocalNFSBackupDriver,
+    'memory': MemoryBackupDriver,
+}
+
+
+def _make_block(rnd, compressibility):
+    """Return non-zero data which compresses about as requested."""
+    random_len = int(BLOCK_SIZE * (1 - compressibility))
+    fill = bytes([rnd.randrange(1, 256)]) * (BLOCK_SIZE - random_len)
+    return rnd.randbytes(random_len) + fill
+
+
+def write_volume(path, size, sparsity, compressibility, rnd):
+    """Write a sparse file with sparsity as the ratio of zero blocks."""
+    with open(path, 'wb') as f:
+        f.truncate(size)
+        for offset in range(0, size, BLOCK_SIZE):
+            if rnd.random() >= sparsity:
+                f.seek(offset)
+                f.write(_make_block(rnd, compressibility))
+
+
+def change_volume(path, size, change_rate, compressibility, rnd):
+    """Rewrite about change_rate of the blocks of a volume."""
+    with open(path, 'r+b') as f:
+        for offset in range(0, size, BLOCK_SIZE):
+            if rnd.random() < change_rate:
+                f.seek(offset)
+                f.write(_make_block(rnd, compressibility))
+
+
+def _reset_peak_rss():
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def _get_peak_rss():
+    """Return the peak RSS in KiB since it was last reset, if supported."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def measure(results, driver_name, operation, size, func, *args):
+    _reset_peak_rss()
+    start_cpu = time.process_time()
+    start = time.monotonic()
+    func(*args)
+    elapsed = time.monotonic() - start
+    cpu = time.process_time() - start_cpu
+    result = {'driver': driver_name,
+              'operation': operation,
+              'seconds': round(elapsed, 3),
+              'mib_per_second': round(size / units.Mi / elapsed, 1),
+              'cpu_seconds_per_gib': round(cpu * units.Gi / size, 2),
+              'peak_rss_mib': round(_get_peak_rss() / units.Ki, 1)}
+    results.append(result)
+    return result
+
+
+def _create_backup(ctxt, volume, parent=None):
+    backup = objects.Backup(ctxt, volume_id=volume.id,
+                            user_id=ctxt.user_id,
+                            project_id=ctxt.project_id,
+                            status=fields.BackupStatus.CREATING,
+                            size=volume.size,
+                            parent_id=parent and parent.id)
+    backup.create()
+    return backup
+
+
+def _backup(driver, backup, volume_path):
+    with open(volume_path, 'rb') as volume_file:
+        driver.backup(backup, volume_file)
+    backup.status = fields.BackupStatus.AVAILABLE
+    backup.save()
+
+
+def _restore(driver, backup, volume, restore_path, size):
+    backup.status = fields.BackupStatus.RESTORING
+    backup.save()
+    with open(restore_path, 'wb') as volume_file:
+        # Like a new volume, the file has the volume size before the restore
+        # skips its zero ranges, so trailing zeros aren't lost.
+        volume_file.truncate(size)
+        driver.restore(backup, volume.id, volume_file, True)
+    backup.status = fields.BackupStatus.AVAILABLE
+    backup.save()
+
+
+def run(args, ctxt, driver_name, work_dir):
+    rnd = random.Random(args.seed)
+    size = args.size * units.Mi
+    volume_path = os.path.join(work_dir, 'volume')
+    restore_path = os.path.join(work_dir, 'restored')
+    write_volume(volume_path, size, args.sparsity, args.compressibility, rnd)
+
+    volume = objects.Volume(ctxt, size=math.ceil(size / units.Gi),
+                            user_id=ctxt.user_id,
+                            project_id=ctxt.project_id,
+                            status='backing-up',
+                            attach_status=fields.VolumeAttachStatus.DETACHED)
+    volume.create()
+    driver = DRIVERS[driver_name](ctxt)
+
+    results = []
+    full = _create_backup(ctxt, volume)
+    measure(results, driver_name, 'backup', size,
+            _backup, driver, full, volume_path)
+    parent = full
+    for i in range(args.incrementals):
+        change_volume(volume_path, size, args.change_rate,
+                      args.compressibility, rnd)
+        parent = _create_backup(ctxt, volume, parent)
+        measure(results, driver_name, 'incremental %d' % (i + 1), size,
+                _backup, driver, parent, volume_path)
+    measure(results, driver_name, 'restore', size,
+            _restore, driver, parent, volume, restore_path, size)
+
+    if args.verify and not filecmp.cmp(volume_path, restore_path,
+                                       shallow=False):
+        sys.exit('The restored volume of the %s driver is different from '
+                 'the original volume' % driver_name)
+    return results
+
+
+def _print_results(results):
+    headers = ('driver', 'operation', 'seconds', 'mib_per_second',
+               'cpu_seconds_per_gib', 'peak_rss_mib')
+    print('%-8s %-15s %10s %10s %12s %12s' % ('driver', 'operation', 'seconds',
+                                             'MiB/s', 'CPU s/GiB',
+                                             'peak RSS MiB'))
+    for result in results:
+        print('%-8s %-15s %10s %10s %12s %12s' %
+              tuple(result[header] for header in headers))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='backup_benchmark',
+        description='Measure the throughput of the chunked backup drivers.')
+    parser.add_argument('--drivers', default='posix,nfs,memory',
+                        help='Comma separated drivers to measure, out of %s'
+                             % ', '.join(DRIVERS))
+    parser.add_argument('--size', type=int, default=256,
+                        help='Size of the volume in MiB')
+    parser.add_argument('--sparsity', type=float, default=0.0,
+                        help='Ratio of the volume that is zeros')
+    parser.add_argument('--compressibility', type=float, default=0.5,
+                        help='Ratio of every block that is compressible')
+    parser.add_argument('--change-rate', type=float, default=0.1,
+                        help='Ratio of the volume changed before every '
+                             'incremental backup')
+    parser.add_argument('--incrementals', type=int, default=1,
+                        help='Number of incremental backups in the chain '
+                             'that is restored')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Seed of the synthetic volume data')
+    parser.add_argument('--work-dir', default=tempfile.gettempdir(),
+                        help='Directory of the volumes, the database and '
+                             'the posix backups')
+    parser.add_argument('--nfs-dir',
+                        default=(TMPFS_PATH if os.path.isdir(TMPFS_PATH)
+                                 else None),
+                        help='Directory used as the NFS share, tmpfs by '
+                             'default')
+    parser.add_argument('--no-verify', dest='verify', action='store_false',
+                        help="Don't compare the restored volume with the "
+                             "original one")
+    parser.add_argument('--json', action='store_true',
+                        help='Print the results as JSON')
+    args, conf_args = parser.parse_known_args()
+
+    drivers = args.drivers.split(',')
+    for driver_name in drivers:
+        if driver_name not in DRIVERS:
+            parser.error('Unknown driver %s' % driver_name)
+
+    work_dir = tempfile.mkdtemp(prefix='cinder-backup-benchmark-',
+                                dir=args.work_dir)
+    nfs_dir = tempfile.mkdtemp(prefix='cinder-backup-benchmark-',
+                               dir=args.nfs_dir or work_dir)
+    try:
+        CONF(conf_args, project='cinder')
+        CONF.set_override('connection', 'sqlite:///%s' %
+                          os.path.join(work_dir, 'cinder.sqlite'),
+                          group='database')
+        # The transport options are only registered when a transport is
+        # loaded, the fixture registers them first.
+        messaging_conffixture.ConfFixture(CONF).transport_url = 'fake:/'
+        CONF.set_override('backup_posix_path',
+                          os.path.join(work_dir, 'backups'))
+        CONF.set_override('backup_share', nfs_dir)
+        objects.register_all()
+        migration.db_sync()
+        rpc.init(CONF)
+        ctxt = context.RequestContext('benchmark', 'benchmark',
+                                      is_admin=True)
+
+        results = []
+        for driver_name in drivers:
+            results.extend(run(args, ctxt, driver_name, work_dir))
+    finally:
+        shutil.rmtree(nfs_dir, ignore_errors=True)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        _print_results(results)
+
+
+if __name__ == '__main__':
+    main()